@@ -1,15 +1,94 @@
 from ckeditor_uploader.widgets import CKEditorUploadingWidget
 from django import forms
 from django.contrib import admin
-from django.utils.safestring import mark_safe
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models import Q
 
+from .images import photo_html
 from .models import *
+from .pagination import EstimatedCountPaginator
+
+# префиксы search_fields: поиск по началу строки и точное совпадение, с учетом регистра,
+# чтобы использовались обычные индексы (icontains/istartswith сканируют таблицу)
+SEARCH_LOOKUPS = {'^': 'startswith', '=': 'exact'}
+
+
+class AutocompleteFilter(admin.SimpleListFilter):
+    """
+    Фильтр списка по связанному объекту с полем автодополнения вместо списка всех объектов.
+    Варианты подгружает автодополнение админки связанной модели (у нее должны быть search_fields).
+    Подкласс задает field_name - имя ForeignKey или ManyToManyField.
+    """
+    template = 'admin/blog_app/autocomplete_filter.html'
+    field_name = None
+
+    def __init__(self, request, params, model, model_admin):
+        self.parameter_name = f'{self.field_name}__id__exact'
+        field = model._meta.get_field(self.field_name)
+        self.title = field.verbose_name
+        self.form_field = forms.ModelChoiceField(
+            field.related_model._default_manager.all(), required=False,
+            widget=AutocompleteSelect(field.remote_field, model_admin.admin_site, attrs={'style': 'width: 100%'}),
+        )
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'Все',
+        }
+
+    def widget(self):
+        """Поле автодополнения с выбранным объектом (один запрос по pk)"""
+        return self.form_field.widget.render(self.parameter_name, self.value(), {'id': f'{self.parameter_name}-filter'})
+
+
+def autocomplete_filter(field_name):
+    """Класс фильтра автодополнения для list_filter"""
+    return type(f'{field_name.title()}AutocompleteFilter', (AutocompleteFilter,), {'field_name': field_name})
+
+
+class LargeTableAdminMixin:
+    """
+    Режим больших таблиц для списков админки: примерное кол-во строк без COUNT(*) по всей таблице
+    (EstimatedCountPaginator), фильтры по связанным объектам с автодополнением (autocomplete_filter)
+    и поиск только по индексируемым условиям (SEARCH_LOOKUPS, а для чисел - еще по pk).
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    @property
+    def media(self):
+        # скрипты select2 для полей фильтров автодополнения
+        return super().media + AutocompleteSelect(None, self.admin_site).media
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        # длинные числа не помещаются в bigint и не могут быть id
+        condition = Q(pk=int(term)) if term.isdigit() and len(term) <= 18 else Q()
+        for field in self.get_search_fields(request):
+            condition |= Q(**{f'{field[1:]}__{SEARCH_LOOKUPS[field[0]]}': term})
+        return queryset.filter(condition), False
 
 
 class CategoriesAdmin(admin.ModelAdmin):
     """Кастомизация модели Categories в админке"""
     prepopulated_fields = {'slug': ('title',)}
-    list_display = ('title',)
+    list_display = ('title', 'posts_count',)
     list_display_links = ('title',)
     search_fields = ('title',)
 
@@ -17,7 +96,7 @@ class CategoriesAdmin(admin.ModelAdmin):
 class TagsAdmin(admin.ModelAdmin):
     """Кастомизация модели Tags в админке"""
     prepopulated_fields = {'slug': ('title',)}
-    list_display = ('id', 'title',)
+    list_display = ('id', 'title', 'posts_count', 'views_total',)
     list_display_links = ('id', 'title',)
     search_fields = ('title',)
 
@@ -31,16 +110,18 @@ class PostsAdminForm(forms.ModelForm):
         fields = '__all__'
 
 
-class PostsAdmin(admin.ModelAdmin):
+class PostsAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Кастомизация модели Posts в админке"""
     form = PostsAdminForm  # подключение CKEditor
     save_as = True
     prepopulated_fields = {'slug': ('title',)}
     list_display = ('id', 'title', 'author', 'category', 'created_at', 'updated_at', 'is_published', 'get_miniature')
     list_display_links = ('id', 'title',)
-    search_fields = ('title', 'author',)
+    list_select_related = ('author', 'category',)
+    search_fields = ('^title', '=slug',)
     list_editable = ('is_published',)
-    list_filter = ('is_published', 'category', 'tags', 'on_main',)
+    list_filter = ('is_published', 'category', autocomplete_filter('tags'), 'on_main',)
+    autocomplete_fields = ('category', 'tags',)
     fields = ('title', 'slug', 'category', 'content', 'photo', 'show_photo',
               'is_published', 'views', 'created_at', 'updated_at', 'tags', 'on_main',)
     readonly_fields = ('show_photo', 'views', 'created_at', 'updated_at',)
@@ -48,14 +129,14 @@ class PostsAdmin(admin.ModelAdmin):
     def show_photo(self, obj):
         """Метод для просмотора добавленой фотографии во время редактирования в админке"""
         if obj.photo:
-            return mark_safe(f'<img src="{obj.photo.url}" width="300">')
+            return photo_html(obj, 'card', width='300')
         return '-'
     show_photo.short_description = 'Просмотр фото'
 
     def get_miniature(self, obj):
         """Метод для просмотра миниатюры фотографии при просмотре списка постов в админке"""
         if obj.photo:
-            return mark_safe(f'<img src="{obj.photo.url}" width="50">')
+            return photo_html(obj, 'admin', width='50')
         return '<Фото отсутствует>'
     get_miniature.short_description = 'Миниатюра'
 
@@ -66,12 +147,13 @@ class PostsAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
-class AdminComments(admin.ModelAdmin):
+class AdminComments(LargeTableAdminMixin, admin.ModelAdmin):
     """Кастомизация модели Comments в админке"""
     list_display = ('id', '__str__', 'post', 'author', 'created_at',)
     list_display_links = ('id', '__str__',)
-    search_fields = ('__str__', 'author',)
-    list_filter = ('post', 'author',)
+    list_select_related = ('post', 'author',)
+    search_fields = ('=post__slug', '=author__username',)
+    list_filter = (autocomplete_filter('post'), autocomplete_filter('author'),)
     fields = ('content', 'post', 'author',)
     readonly_fields = ('post', 'author',)
 
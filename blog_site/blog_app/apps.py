@@ -5,4 +5,8 @@ class BlogAppConfig(AppConfig):
     name = 'blog_app'
     verbose_name = 'Блог'
 
+    def ready(self):
+        from blog_app import metrics, signals  # noqa
+        metrics.install()
+
 
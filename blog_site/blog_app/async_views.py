@@ -0,0 +1,234 @@
+"""
+Асинхронные варианты представлений страниц (для запуска через ASGI, blog_site/asgi.py).
+
+Синхронное представление выполняет запросы страницы друг за другом: меню, закрепленные посты,
+сайдбар, список постов, кол-во постов, название категории. Асинхронный вариант при промахе кеша страниц
+загружает эти независимые данные одновременно в пуле потоков (BLOG_ASYNC_WORKERS), а данные тегов шаблонов,
+которые почти всегда читаются из кеша (теги берут их из контекста), - тем временем в потоке запроса,
+а затем строит страницу обычным синхронным кодом. Соединения потоков пула с БД живут, как соединения запросов:
+до и после каждой загрузки закрываются устаревшие (CONN_MAX_AGE) и непригодные после ошибок.
+Попадания в кеш страниц, POST-запросы и построение ответа выполняются так же, как в синхронных представлениях,
+поэтому асинхронные варианты работают и под WSGI (Django выполняет их через async_to_sync).
+
+Внутри открытой транзакции (например, в тестах) другие соединения не видят ее изменений,
+поэтому данные загружаются по очереди в потоке запроса.
+Включаются настройкой BLOG_ASYNC_VIEWS (см. urls.py), сравнение режимов - "manage.py benchmark_views".
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, update_wrapper
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.http import Http404
+from django.utils.decorators import classonlymethod
+
+from blog_app.models import Comments, RelatedPost
+from blog_app.page_cache import is_cacheable
+from blog_app.related import get_related_posts
+from blog_app.snapshots import get_sidebar_snapshot
+from blog_app.templatetags.featured_post import get_main_posts_list
+from blog_app.templatetags.menu import get_menu_categories
+from blog_app.views import GetPost, Home, PostsByCategory, PostsByTag, Search, get_comments_page
+
+# данные тегов шаблонов (из кеша, blog_app.caching): имя в контексте -> функция загрузки
+TAG_DATA = {
+    'menu_categories': get_menu_categories,
+    'main_posts': get_main_posts_list,
+    'sidebar_snapshot': get_sidebar_snapshot,
+}
+
+_executor_lock = threading.Lock()
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(settings, 'BLOG_ASYNC_WORKERS', 8)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='page-data')
+    return _executor
+
+
+def _fetch_in_pool(fetch):
+    # поток пула живет дольше запроса, и сигналы request_started/request_finished для него не вызываются,
+    # поэтому соединения проверяются, как в начале и в конце запроса
+    close_old_connections()
+    try:
+        return fetch()
+    finally:
+        close_old_connections()
+
+
+def _fetch_all(fetchers):
+    return [fetch() for fetch in fetchers]
+
+
+async def gather_data(fetchers, parallel=True, inline=()):
+    """
+    Выполнение независимых синхронных загрузок fetchers (имя -> функция), возвращает словарь имя -> результат.
+    Загрузки из inline (обычно из кеша) выполняются по очереди в потоке запроса одновременно с остальными.
+    parallel=False - все по очереди в потоке запроса (thread_sensitive), например внутри транзакции.
+    """
+    if not parallel:
+        return {name: await sync_to_async(fetch)() for name, fetch in fetchers.items()}
+    loop = asyncio.get_running_loop()
+    executor = _get_executor()
+    pooled = [name for name in fetchers if name not in inline]
+    local = [name for name in fetchers if name in inline]
+    # каждая загрузка в пуле выполняется в копии контекста запроса (выбор БД, blog_app.routers)
+    results = await asyncio.gather(
+        sync_to_async(_fetch_all)([fetchers[name] for name in local]),
+        *(loop.run_in_executor(executor, partial(contextvars.copy_context().run, _fetch_in_pool, fetchers[name]))
+          for name in pooled)
+    )
+    return dict(zip(local + pooled, results[0] + list(results[1:])))
+
+
+class AsyncViewMixin:
+    """
+    Миксин асинхронного варианта представления-класса.
+    Подклассы перечисляют данные тегов шаблона в tag_data и дополняют get_fetchers() своими загрузками,
+    результаты доступны в self.prefetched и добавляются в контекст шаблона.
+    """
+    tag_data = ('menu_categories',)
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        super().as_view(**initkwargs)  # проверка initkwargs
+
+        async def view(request, *args, **kwargs):
+            self = cls(**initkwargs)
+            self.setup(request, *args, **kwargs)
+            return await self.async_dispatch(request, *args, **kwargs)
+        view.view_class = cls
+        view.view_initkwargs = initkwargs
+        update_wrapper(view, cls, updated=())
+        update_wrapper(view, cls.dispatch, assigned=())
+        return view
+
+    def setup(self, request, *args, **kwargs):
+        super().setup(request, *args, **kwargs)
+        self.prefetched = {}
+        self.page_cacheable = False
+        self.parallel = False
+
+    def get_fetchers(self):
+        """Независимые загрузки страницы: имя -> функция без аргументов"""
+        return {name: TAG_DATA[name] for name in self.tag_data}
+
+    def page_cache_lookup(self):
+        """Ответ из кеша страниц или None, заодно определяется, можно ли загружать данные в других соединениях"""
+        self.parallel = not connection.in_atomic_block
+        self.page_cacheable = hasattr(self, 'get_cached_response') and is_cacheable(self.request)
+        return self.get_cached_response() if self.page_cacheable else None
+
+    async def async_dispatch(self, request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            response = await sync_to_async(self.page_cache_lookup)()
+            if response is not None:
+                return response
+            self.prefetched = await gather_data(self.get_fetchers(), self.parallel, inline=self.tag_data)
+        return await sync_to_async(self.dispatch)(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({name: self.prefetched[name] for name in self.tag_data if name in self.prefetched})
+        return context
+
+
+class AsyncListViewMixin(AsyncViewMixin):
+    """Асинхронный вариант списка постов: страница списка, дата изменения и заголовок загружаются одновременно"""
+
+    def get_page(self):
+        """Страница списка с уже выполненными запросами кол-ва и постов"""
+        queryset = self.get_queryset()
+        paginator, page, _, is_paginated = self.paginate_queryset(queryset, self.get_paginate_by(queryset))
+        page.object_list = list(page.object_list)
+        return paginator, page, page.object_list, is_paginated
+
+    def get_fetchers(self):
+        fetchers = super().get_fetchers()
+        fetchers['page'] = self.get_page
+        if self.page_cacheable:
+            fetchers['last_modified'] = super().get_last_modified
+        if hasattr(super(), 'get_title'):
+            fetchers['title'] = super().get_title
+        return fetchers
+
+    def get(self, request, *args, **kwargs):
+        if 'page' not in self.prefetched:
+            return super().get(request, *args, **kwargs)
+        self.object_list = self.prefetched['page'][2]
+        if not self.object_list and not self.get_allow_empty():
+            raise Http404('Список пуст')
+        return self.render_to_response(self.get_context_data())
+
+    def paginate_queryset(self, queryset, page_size):
+        if 'page' in self.prefetched:
+            return self.prefetched['page']
+        return super().paginate_queryset(queryset, page_size)
+
+    def get_last_modified(self):
+        if 'last_modified' in self.prefetched:
+            return self.prefetched['last_modified']
+        return super().get_last_modified()
+
+    def get_title(self):
+        """Заголовок страниц категории и тега"""
+        if 'title' in self.prefetched:
+            return self.prefetched['title']
+        return super().get_title()
+
+
+class AsyncHome(AsyncListViewMixin, Home):
+    """Асинхронный вариант главной страницы"""
+    tag_data = ('menu_categories', 'main_posts')
+
+
+class AsyncPostsByCategory(AsyncListViewMixin, PostsByCategory):
+    """Асинхронный вариант страницы категории"""
+
+
+class AsyncPostsByTag(AsyncListViewMixin, PostsByTag):
+    """Асинхронный вариант страницы тега"""
+
+
+class AsyncSearch(AsyncListViewMixin, Search):
+    """Асинхронный вариант страницы поиска"""
+
+
+class AsyncGetPost(AsyncViewMixin, GetPost):
+    """
+    Асинхронный вариант страницы поста: пост с тегами, первая страница комментариев и похожие посты
+    (по slug поста) и снимок сайдбара загружаются одновременно.
+    """
+    tag_data = ('menu_categories', 'sidebar_snapshot')
+
+    def get_fetchers(self):
+        fetchers = super().get_fetchers()
+        fetchers['object'] = super().get_object
+        slug = self.kwargs['slug']
+        fetchers['comments_page'] = lambda: get_comments_page(Comments.objects.filter(post__slug=slug))
+        fetchers['related_posts'] = lambda: get_related_posts(RelatedPost.objects.filter(post__slug=slug))
+        return fetchers
+
+    def get_object(self, queryset=None):
+        if 'object' in self.prefetched:
+            return self.prefetched['object']
+        return super().get_object(queryset)
+
+    def get_comments_page(self):
+        if 'comments_page' in self.prefetched:
+            return self.prefetched['comments_page']
+        return super().get_comments_page()
+
+    def get_related_posts(self):
+        if 'related_posts' in self.prefetched:
+            return self.prefetched['related_posts']
+        return super().get_related_posts()
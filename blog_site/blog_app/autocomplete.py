@@ -0,0 +1,229 @@
+"""
+Автодополнение строки поиска: подсказки из названий опубликованных постов, тегов и категорий.
+
+Индекс хранится в памяти процесса: отсортированный массив ключей (название с каждого его слова,
+в виде терминов поиска), подсказки по префиксу находятся двоичным поиском и ранжируются по просмотрам
+(у тегов - по сумме просмотров их постов, у категорий - по сумме просмотров их проиндексированных постов).
+Для коротких префиксов с множеством совпадений вместо ключей обходятся записи по убыванию рейтинга
+до первых limit совпадений. Результаты для префиксов запоминаются до изменения индекса.
+
+Индекс строится при первом запросе. В процессе, где сохраняются посты, теги и категории, он обновляется
+сигналами (blog_app.signals), а другие процессы замечают изменения по версиям зависимостей кеша
+(blog_app.caching), проверяя их не чаще раза в BLOG_AUTOCOMPLETE_CHECK секунд, и строят индекс заново.
+Раз в BLOG_AUTOCOMPLETE_REFRESH секунд индекс строится заново в любом случае, чтобы учесть новые просмотры.
+В индекс попадают BLOG_AUTOCOMPLETE_MAX_POSTS самых просматриваемых постов.
+"""
+import bisect
+import heapq
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
+
+from blog_app.caching import get_versions
+from blog_app.models import Categories, Posts, Tags
+from blog_app.search.text import tokenize
+
+DEPS = ('Posts(is_published)', 'Categories', 'Tags')
+MAX_MEMOIZED = 10000
+
+Entry = namedtuple('Entry', 'kind pk title url score')
+
+
+def normalize(text):
+    """Текст в виде ключа индекса: термины поиска через пробел"""
+    return ' '.join(tokenize(text))
+
+
+def _matches(text, prefix):
+    """Начинается ли с prefix одно из слов текста text (в виде ключа индекса)"""
+    return text.startswith(prefix) or f' {prefix}' in text
+
+
+def _keys(entry):
+    terms = tokenize(entry.title)
+    return [(' '.join(terms[num:]), entry.kind, entry.pk) for num in range(len(terms))]
+
+
+class PrefixIndex:
+    """
+    Отсортированный массив ключей (текст, вид, pk) с поиском по префиксу
+    и массив записей по убыванию рейтинга (-рейтинг, вид, pk)
+    """
+
+    def __init__(self, entries=(), versions=None):
+        self.entries = {(entry.kind, entry.pk): entry for entry in entries}
+        self.texts = {key: normalize(entry.title) for key, entry in self.entries.items()}
+        self.keys = sorted(key for entry in self.entries.values() for key in _keys(entry))
+        self.ranked = sorted((-entry.score, entry.kind, entry.pk) for entry in self.entries.values())
+        self.versions = versions
+        self.built_at = self.checked_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.memo = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, entry):
+        with self.lock:
+            self._remove(entry.kind, entry.pk)
+            self.entries[(entry.kind, entry.pk)] = entry
+            self.texts[(entry.kind, entry.pk)] = normalize(entry.title)
+            for key in _keys(entry):
+                bisect.insort(self.keys, key)
+            bisect.insort(self.ranked, (-entry.score, entry.kind, entry.pk))
+            self.memo.clear()
+
+    def remove(self, kind, pk):
+        with self.lock:
+            self._remove(kind, pk)
+            self.memo.clear()
+
+    def _remove(self, kind, pk):
+        entry = self.entries.pop((kind, pk), None)
+        if entry is None:
+            return
+        del self.texts[(kind, pk)]
+        for keys, key in [(self.keys, key) for key in _keys(entry)] + [(self.ranked, (-entry.score, kind, pk))]:
+            index = bisect.bisect_left(keys, key)
+            if index < len(keys) and keys[index] == key:
+                del keys[index]
+
+    def search(self, prefix, limit):
+        """limit записей с наибольшим рейтингом, одно из слов названия которых начинается с prefix"""
+        with self.lock:
+            found = self.memo.get((prefix, limit))
+            if found is not None:
+                return found
+            start = bisect.bisect_left(self.keys, (prefix,))
+            end = bisect.bisect_left(self.keys, (prefix + '\U0010ffff',), start)
+            if (end - start) ** 2 > limit * len(self.ranked):
+                # совпадений много: первые limit найдутся среди записей с наибольшим рейтингом
+                found = []
+                for _, kind, pk in self.ranked:
+                    if _matches(self.texts[(kind, pk)], prefix):
+                        found.append(self.entries[(kind, pk)])
+                        if len(found) == limit:
+                            break
+            else:
+                matched = {(kind, pk) for _, kind, pk in self.keys[start:end]}
+                found = heapq.nsmallest(limit, matched, key=lambda key: (-self.entries[key].score, key))
+                found = [self.entries[key] for key in found]
+            if len(self.memo) >= MAX_MEMOIZED:
+                self.memo.clear()
+            self.memo[(prefix, limit)] = found
+            return found
+
+
+def _url_maker(model):
+    """Построение URL объекта по slug без обхода маршрутов на каждый объект"""
+    template = model(slug='__slug__').get_absolute_url()
+    return lambda slug: template.replace('__slug__', slug)
+
+
+def build_index():
+    """Индекс по текущим данным БД"""
+    versions = get_versions(*DEPS)
+    max_posts = getattr(settings, 'BLOG_AUTOCOMPLETE_MAX_POSTS', 50000)
+    posts = list(Posts.objects.filter(is_published=True).order_by('-views').values_list(
+        'pk', 'title', 'slug', 'views', 'category_id'
+    )[:max_posts])
+    category_views = {}
+    for _, _, _, views, category_id in posts:
+        category_views[category_id] = category_views.get(category_id, 0) + views
+    post_url, tag_url, category_url = _url_maker(Posts), _url_maker(Tags), _url_maker(Categories)
+    entries = [Entry('post', pk, title, post_url(slug), views) for pk, title, slug, views, _ in posts]
+    tags = Tags.objects.filter(posts_count__gt=0).values_list('pk', 'title', 'slug', 'views_total')
+    entries += [Entry('tag', pk, title, tag_url(slug), views_total) for pk, title, slug, views_total in tags]
+    categories = Categories.objects.filter(posts_count__gt=0).values_list('pk', 'title', 'slug')
+    entries += [Entry('category', pk, title, category_url(slug), category_views.get(pk, 0))
+                for pk, title, slug in categories]
+    return PrefixIndex(entries, versions)
+
+
+_index = None
+_build_lock = threading.Lock()
+
+
+def get_index():
+    """Индекс процесса, при изменениях в других процессах или по истечении BLOG_AUTOCOMPLETE_REFRESH - новый"""
+    global _index
+    index = _index
+    now = time.monotonic()
+    refresh = getattr(settings, 'BLOG_AUTOCOMPLETE_REFRESH', 600)
+    outdated = index is None or index.versions is None or now - index.built_at > refresh
+    if not outdated and now - index.checked_at >= getattr(settings, 'BLOG_AUTOCOMPLETE_CHECK', 5):
+        index.checked_at = now
+        outdated = index.versions != get_versions(*DEPS)
+    if outdated:
+        with _build_lock:
+            if _index is index:
+                _index = build_index()
+            index = _index
+    return index
+
+
+def suggest(query, limit=None):
+    """Подсказки для строки query: список записей Entry"""
+    prefix = normalize(query)
+    if len(prefix) < getattr(settings, 'BLOG_AUTOCOMPLETE_MIN_CHARS', 2):
+        return []
+    return get_index().search(prefix, limit or getattr(settings, 'BLOG_AUTOCOMPLETE_LIMIT', 8))
+
+
+def _update(entry=None, remove=None, complete=True):
+    index = _index
+    if index is None:
+        return  # индекс еще не строился, будет построен по актуальным данным
+    if entry is not None:
+        index.add(entry)
+    if remove is not None:
+        index.remove(*remove)
+    if complete:
+        # свои изменения уже в индексе, перестраивать его из-за новых версий не нужно
+        index.versions = get_versions(*DEPS)
+    else:
+        index.versions = None  # индекс будет построен заново при следующем запросе
+
+
+def post_changed(post, deleted=False):
+    """Обновление поста в индексе (сигналы сохранения и удаления поста)"""
+    if deleted or not post.is_published:
+        # у категории могли не остаться опубликованных постов: индекс будет построен заново
+        _update(remove=('post', post.pk), complete=False)
+        return
+    index = _index
+    # пост в новой для индекса категории: ее название без запроса к БД неизвестно
+    complete = index is not None and ('category', post.category_id) in index.entries
+    _update(Entry('post', post.pk, post.title, post.get_absolute_url(), post.views), complete=complete)
+
+
+def tag_changed(tag, deleted=False):
+    """Обновление тега в индексе (сигналы сохранения и удаления тега)"""
+    if deleted or not tag.posts_count:
+        _update(remove=('tag', tag.pk))
+    else:
+        _update(Entry('tag', tag.pk, tag.title, tag.get_absolute_url(), tag.views_total))
+
+
+def category_changed(category, deleted=False):
+    """Обновление категории в индексе (сигналы сохранения и удаления категории)"""
+    index = _index
+    old = index.entries.get(('category', category.pk)) if index is not None else None
+    if deleted or not category.posts_count:
+        _update(remove=('category', category.pk))
+    else:
+        _update(Entry('category', category.pk, category.title, category.get_absolute_url(),
+                      old.score if old is not None else 0))
+
+
+def autocomplete(request):
+    """Подсказки для строки поиска: JSON {"results": [{"title", "url", "type"}, ...]}"""
+    results = [{'title': entry.title, 'url': entry.url, 'type': entry.kind}
+               for entry in suggest(request.GET.get('q', ''))]
+    response = JsonResponse({'results': results})
+    patch_cache_control(response, public=True, max_age=60)
+    return response
@@ -0,0 +1,180 @@
+"""
+Нагрузочное сравнение режимов запуска: WSGI с синхронными представлениями и ASGI с асинхронными (blog_app.async_views).
+
+Запросы выполняются внутри процесса обработчиками Django (WSGIHandler - в пуле потоков, как у многопоточного
+WSGI-сервера, ASGIHandler - конкурентными задачами в цикле событий, как у ASGI-сервера), поэтому сравнивается
+работа самого приложения без накладных расходов сети и конкретного сервера.
+Для каждого режима считаются пропускная способность (запросов в секунду) и задержки p50/p99.
+Используется командой "manage.py benchmark_views".
+"""
+import asyncio
+import importlib
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from urllib.parse import quote, unquote, unquote_to_bytes
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test.utils import override_settings
+from django.urls import clear_url_caches, reverse
+
+from blog_app.models import Posts
+
+# адрес клиента вне INTERNAL_IPS, чтобы при DEBUG не включалась панель отладки
+CLIENT_ADDR = '192.0.2.1'
+
+# режим: (обработчик, асинхронные представления)
+MODES = {
+    'wsgi': ('wsgi', False),
+    'asgi': ('asgi', True),
+    'asgi-sync': ('asgi', False),
+    'wsgi-async': ('wsgi', True),
+}
+
+
+def default_paths():
+    """Страницы для нагрузки: главная, последний пост, его категория и тег, поиск по слову из его названия"""
+    paths = [reverse('home')]
+    post = Posts.objects.filter(is_published=True).select_related('category').order_by('-created_at').first()
+    if post is not None:
+        paths += [post.get_absolute_url(), post.category.get_absolute_url()]
+        tag = post.tags.first()
+        if tag is not None:
+            paths.append(tag.get_absolute_url())
+        paths.append(reverse('search') + '?s=' + quote(post.title.split()[0]))
+    return paths
+
+
+def get_host():
+    """Хост запросов, разрешенный ALLOWED_HOSTS"""
+    return next((host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*'), 'localhost')
+
+
+def _reload_urls():
+    importlib.reload(importlib.import_module('blog_app.urls'))
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+@contextmanager
+def views_mode(async_views):
+    """Временное переключение маршрутов на асинхронные или синхронные представления (BLOG_ASYNC_VIEWS)"""
+    try:
+        with override_settings(BLOG_ASYNC_VIEWS=async_views):
+            _reload_urls()
+            yield
+    finally:
+        _reload_urls()
+
+
+def percentile(values, percent):
+    """Перцентиль отсортированного списка values"""
+    if not values:
+        return 0
+    return values[min(len(values) - 1, max(math.ceil(percent / 100 * len(values)) - 1, 0))]
+
+
+def _wsgi_request(handler, host, path):
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': unquote_to_bytes(path).decode('iso-8859-1'), 'QUERY_STRING': query,
+        'HTTP_HOST': host, 'SERVER_NAME': host, 'SERVER_PORT': '80', 'REMOTE_ADDR': CLIENT_ADDR,
+        'wsgi.input': BytesIO(),
+    }
+    setup_testing_defaults(environ)
+    status = []
+    body = handler(environ, lambda status_line, headers, exc_info=None: status.append(int(status_line[:3])))
+    try:
+        b''.join(body)
+    finally:
+        body.close()
+    return status[0]
+
+
+def run_wsgi(paths, concurrency):
+    """Выполнение запросов paths обработчиком WSGI в concurrency потоках, возвращает задержки и статусы"""
+    handler = WSGIHandler()
+    host = get_host()
+
+    def request(path):
+        started = time.perf_counter()
+        status = _wsgi_request(handler, host, path)
+        return time.perf_counter() - started, status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(request, paths))
+
+
+async def _asgi_request(handler, host, path):
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': unquote(path), 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', host.encode())], 'server': (host, 80), 'client': (CLIENT_ADDR, 0),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        return await asyncio.Future()  # клиент не отключается
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await handler(scope, receive, send)
+    return status[0]
+
+
+def run_asgi(paths, concurrency):
+    """Выполнение запросов paths обработчиком ASGI в concurrency конкурентных задачах"""
+    handler = ASGIHandler()
+    host = get_host()
+    results = [None] * len(paths)
+    queue = iter(enumerate(paths))
+
+    async def worker():
+        for index, path in queue:
+            started = time.perf_counter()
+            status = await _asgi_request(handler, host, path)
+            results[index] = (time.perf_counter() - started, status)
+
+    async def main():
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    asyncio.run(main())
+    return results
+
+
+RUNNERS = {'wsgi': run_wsgi, 'asgi': run_asgi}
+
+
+def benchmark(mode, paths, requests=200, concurrency=10, page_cache=False):
+    """
+    Нагрузка режима mode: requests запросов по кругу по paths, concurrency одновременных запросов.
+    Кеш страниц по умолчанию отключен, чтобы измерялось построение страниц, а не чтение из кеша.
+    Возвращает словарь: requests, errors, rps, p50 и p99 (в миллисекундах).
+    """
+    handler_name, async_views = MODES[mode]
+    run = RUNNERS[handler_name]
+    load = [paths[index % len(paths)] for index in range(requests)]
+    with views_mode(async_views), override_settings(BLOG_PAGE_CACHE_ENABLED=page_cache):
+        run(paths, min(concurrency, len(paths)))  # прогрев: кеши данных, шаблоны, соединения
+        started = time.perf_counter()
+        results = run(load, concurrency)
+        elapsed = time.perf_counter() - started
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    return {
+        'requests': len(results),
+        'errors': sum(status != 200 for _, status in results),
+        'rps': len(results) / elapsed if elapsed else 0,
+        'p50': percentile(latencies, 50),
+        'p99': percentile(latencies, 99),
+    }
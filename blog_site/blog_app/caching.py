@@ -0,0 +1,120 @@
+"""
+Кеширование с версионной инвалидацией по зависимостям.
+
+Закешированные данные (фрагменты шаблонов, результаты тегов) объявляют, от каких моделей зависят:
+'Posts', 'Posts(is_published)' (только набор опубликованных постов), 'Categories', 'Tags', 'Comments',
+'Search' (поисковый индекс), 'Related' (похожие посты).
+Версия каждой зависимости хранится в кеше и входит в ключ записи.
+Сигналы (blog_app.signals) увеличивают версии при изменении моделей,
+после чего старые записи становятся недостижимыми сразу, не дожидаясь истечения TTL.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from blog_app import metrics
+
+VERSION_KEY = 'blog:version:{}'
+CACHED_KEY = 'blog:cached:{}:{}:{}'
+VERSION_LOCK_KEY = 'blog:version:lock'
+# бэкенды кеша с атомарным incr, не меняющим TTL ключа
+ATOMIC_CACHE_BACKENDS = ('django.core.cache.backends.memcached.', 'django.core.cache.backends.locmem.',
+                         'django.core.cache.backends.redis.', 'django_redis.')
+
+
+def get_timeout():
+    """TTL закешированных по зависимостям данных"""
+    return getattr(settings, 'BLOG_DEPENDENT_CACHE_TIMEOUT', 60 * 60 * 6)
+
+
+def acquire_lock(cache, key, timeout=5, interval=0.01, wait=None):
+    """
+    Простейшая блокировка на cache.add, разделяемая между процессами (освобождается cache.delete(key)).
+    Блокировка упавшего процесса истекает через timeout секунд, поэтому ожидание (wait секунд) не дольше timeout.
+    Возвращает False, если блокировку получить не удалось: вызывающий код не должен выполнять защищенные ею действия.
+    """
+    deadline = time.monotonic() + (timeout if wait is None else wait)
+    while not cache.add(key, 1, timeout=timeout):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+    return True
+
+
+def _initial_version():
+    # при вытеснении ключа версии из кеша новая версия не совпадет ни с одной из старых
+    return int(time.time() * 1000)
+
+
+def get_versions(*deps):
+    """Строка с текущими версиями зависимостей (одно обращение к кешу)"""
+    keys = [VERSION_KEY.format(dep) for dep in deps]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            cache.add(key, _initial_version(), timeout=None)
+            version = cache.get(key)
+        versions.append(str(version))
+    return '.'.join(versions)
+
+
+def bump(*deps):
+    """
+    Увеличение версий зависимостей: все зависящие от них записи кеша устаревают.
+    Версии хранятся без TTL: кеши с атомарным incr (memcached, redis, locmem) сохраняют TTL ключа,
+    в остальных (например, file-based) incr перезаписывает ключ с TTL по умолчанию, поэтому там версия
+    читается и записывается под блокировкой.
+    """
+    atomic = settings.CACHES['default']['BACKEND'].startswith(ATOMIC_CACHE_BACKENDS)
+    for dep in deps:
+        key = VERSION_KEY.format(dep)
+        if atomic:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, _initial_version(), timeout=None)
+            continue
+        locked = acquire_lock(cache, VERSION_LOCK_KEY)
+        try:
+            version = cache.get(key)
+            if version is None:
+                version = _initial_version()
+            elif locked:
+                version += 1
+            else:
+                # без блокировки параллельное увеличение может дать ту же версию, поэтому не меньше текущего времени
+                version = max(version + 1, _initial_version())
+            cache.set(key, version, timeout=None)
+        finally:
+            if locked:
+                cache.delete(VERSION_LOCK_KEY)
+
+
+def make_key(name, deps, *vary_on):
+    """Ключ записи кеша с учетом версий зависимостей и дополнительных параметров"""
+    vary = hashlib.md5(repr(vary_on).encode()).hexdigest()
+    return CACHED_KEY.format(name, get_versions(*deps), vary)
+
+
+def cached(name, deps, timeout=None):
+    """
+    Декоратор для кеширования результата функции до изменения зависимостей deps.
+    Аргументы функции входят в ключ, поэтому должны иметь стабильный repr.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(name, deps, args, sorted(kwargs.items()))
+            result = cache.get(key)
+            metrics.record_cache(name, result is not None)
+            if result is None:
+                result = func(*args, **kwargs)
+                cache.set(key, result, timeout or get_timeout())
+            return result
+        return wrapper
+    return decorator
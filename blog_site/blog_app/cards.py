@@ -0,0 +1,48 @@
+"""
+Кеш HTML карточек постов в списках (главная, категория, тег, поиск).
+
+Карточка зависит только от своего поста, поэтому ключ строится из его полей, а не из версий зависимостей:
+pk, updated_at, кол-во комментариев и копии фото (обновляются без изменения updated_at), в поиске - еще сниппет.
+Страница списка получает все свои карточки одним cache.get_many, строит только отсутствующие
+и сохраняет их одним cache.set_many.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from blog_app.caching import get_timeout
+from blog_app.metrics import record_cache
+
+CARD_KEY = 'blog:card:{}:{}'
+CARD_TEMPLATE = 'inc/_post_card.html'
+
+
+def card_key(post, snippet=None):
+    """Ключ карточки поста, меняется вместе с выводимыми в ней данными"""
+    variants = post.photo_variants or {}
+    version = (post.updated_at.timestamp(), post.comments_count, post.author_id, post.photo.name,
+               variants.get('hash'), snippet)
+    return CARD_KEY.format(post.pk, hashlib.md5(repr(version).encode()).hexdigest())
+
+
+def render_cards(posts, snippets=False):
+    """
+    HTML карточек постов posts.
+    snippets=True - вместо выдержки выводится сниппет поиска (атрибут snippet, blog_app.search).
+    """
+    posts = list(posts)
+    snippet_of = (lambda post: getattr(post, 'snippet', '')) if snippets else (lambda post: None)
+    keys = [card_key(post, snippet_of(post)) for post in posts]
+    cards = cache.get_many(keys)
+    record_cache('card', True, len(cards))
+    missing = {}
+    if len(cards) < len(keys):
+        template = get_template(CARD_TEMPLATE)
+        for post, key in zip(posts, keys):
+            if key not in cards:
+                cards[key] = missing[key] = template.render({'post': post, 'snippet': snippet_of(post)})
+        record_cache('card', False, len(missing))
+        cache.set_many(missing, get_timeout())
+    return mark_safe(''.join(cards[key] for key in keys))
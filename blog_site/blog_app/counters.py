@@ -0,0 +1,265 @@
+"""
+Буферизированный счетчик просмотров постов.
+
+Просмотр поста не пишет в пост: прирост копится в буфере,
+а сброс (flush) периодически применяет накопленные приросты пачкой,
+одним UPDATE ... SET views = views + delta на пост.
+
+Буфер - кеш BLOG_VIEWS_CACHE, если он общий для процессов, увеличивает счетчики атомарно и сохраняет их без TTL
+(memcached, redis), иначе (file-based, кеш в БД, locmem) - таблица PendingViews,
+BLOG_VIEWS_BUFFER = 'cache' или 'db' выбирает буфер явно.
+Кеш должен переживать перезапуск воркеров, иначе накопленные, но не сброшенные просмотры будут потеряны,
+поэтому locmem (кеш внутри процесса, невидимый для flush_views в другом процессе) годится только явно
+выбранным буфером, например в тестах.
+
+С буфером в БД каждый просмотр - один UPDATE одной из BLOG_VIEWS_DB_SHARDS записей PendingViews поста
+(выбранной случайно), поэтому просмотры популярного поста не выстраиваются в очередь за блокировкой одной строки.
+
+Посты с несброшенными просмотрами отмечаются записями PendingViews, которые удаляются только после
+применения прироста, поэтому прерванный сброс (ошибка, SIGTERM) ничего не теряет: оставшиеся посты
+сбросит следующий сброс. Одновременно выполняется только один сброс (блокировка в кеше), а с буфером в БД
+сброс еще и забирает строки поста SELECT ... FOR UPDATE SKIP LOCKED, поэтому прирост не применяется дважды
+и при блокировке в кеше отдельного процесса (locmem).
+С буфером в кеше при падении между UPDATE и уменьшением счетчика просмотр может учесться дважды, но не потеряется.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.utils import timezone
+
+from blog_app import trending
+from blog_app.caching import acquire_lock
+from blog_app.models import PendingViews, Posts, Tags
+from blog_app.snapshots import refresh_sidebar_snapshot
+
+PENDING_KEY = 'blog:views:pending:{}'
+FLUSH_LOCK_KEY = 'blog:views:flush:lock'
+FLUSH_RUNNING_KEY = 'blog:views:flush:running'
+# бэкенды кеша, общие для процессов, с атомарным incr, не меняющим TTL ключа
+BUFFER_CACHE_BACKENDS = ('django.core.cache.backends.memcached.', 'django.core.cache.backends.redis.',
+                         'django_redis.')
+
+_flusher_lock = threading.Lock()
+_flusher_thread = None
+
+
+def get_cache():
+    """Кеш, в котором копятся несброшенные просмотры"""
+    return caches[getattr(settings, 'BLOG_VIEWS_CACHE', 'default')]
+
+
+def get_flush_interval():
+    """Интервал сброса просмотров в БД (в секундах)"""
+    return getattr(settings, 'BLOG_VIEWS_FLUSH_INTERVAL', 60)
+
+
+def get_flush_lock_timeout():
+    """Через сколько секунд блокировка сброса упавшего процесса истекает"""
+    return getattr(settings, 'BLOG_VIEWS_FLUSH_LOCK_TIMEOUT', 60 * 10)
+
+
+def get_db_shards():
+    """На сколько записей делятся несброшенные просмотры поста в буфере в БД"""
+    return getattr(settings, 'BLOG_VIEWS_DB_SHARDS', 8)
+
+
+def _pending():
+    """
+    Записи несброшенных просмотров: всегда в основной БД и без маршрутизатора, т.к. это служебная запись
+    и клиент после просмотра не должен читать основную БД (blog_app.routers)
+    """
+    return PendingViews.objects.using(DEFAULT_DB_ALIAS)
+
+
+def uses_cache():
+    """Копятся ли несброшенные просмотры в кеше (иначе - в таблице PendingViews)"""
+    buffer = getattr(settings, 'BLOG_VIEWS_BUFFER', 'auto')
+    if buffer == 'auto':
+        backend = settings.CACHES[getattr(settings, 'BLOG_VIEWS_CACHE', 'default')]['BACKEND']
+        return backend.startswith(BUFFER_CACHE_BACKENDS)
+    return buffer == 'cache'
+
+
+def _mark_pending(pk, shard=0):
+    """Отметка поста с несброшенными просмотрами (уже отмеченный пост не меняется)"""
+    _pending().bulk_create([PendingViews(post_id=pk, shard=shard)], ignore_conflicts=True)
+
+
+def _pending_totals(queryset):
+    """Несброшенные просмотры по постам из записей queryset: {pk поста: просмотры}"""
+    return dict(queryset.order_by().values('post').annotate(total=Sum('views')).values_list('post', 'total'))
+
+
+def record_view(pk):
+    """
+    Учет одного просмотра поста.
+    С буфером в кеше пост отмечается, когда его счетчик переходит из 0 в 1.
+    """
+    if uses_cache():
+        cache = get_cache()
+        key = PENDING_KEY.format(pk)
+        try:
+            pending = cache.incr(key)
+        except ValueError:
+            if cache.add(key, 1, timeout=None):
+                pending = 1
+            else:
+                pending = cache.incr(key)
+        if pending == 1:
+            _mark_pending(pk)
+    else:
+        shard = random.randrange(get_db_shards())
+        pending = _pending().filter(post=pk, shard=shard)
+        if not pending.update(views=F('views') + 1):
+            _mark_pending(pk, shard)
+            pending.update(views=F('views') + 1)
+    if getattr(settings, 'BLOG_VIEWS_FLUSH_IN_BACKGROUND', False):
+        start_background_flusher()
+
+
+def get_pending(pk):
+    """Кол-во просмотров поста, еще не сброшенных в БД"""
+    return get_pending_many([pk])[pk]
+
+
+def get_pending_many(pks):
+    """Несброшенные просмотры для нескольких постов одним обращением к кешу (или запросом к БД)"""
+    if not uses_cache():
+        found = _pending_totals(_pending().filter(post__in=pks))
+        return {pk: found.get(pk, 0) for pk in pks}
+    keys = {PENDING_KEY.format(pk): pk for pk in pks}
+    found = get_cache().get_many(keys)
+    return {pk: found.get(key, 0) for key, pk in keys.items()}
+
+
+def get_live_views(post):
+    """Актуальное кол-во просмотров: сохраненное в БД плюс несброшенное"""
+    return post.views + get_pending(post.pk)
+
+
+def _apply(pk, delta, score, moment):
+    """
+    Прирост просмотров и рейтинг популярности поста одним UPDATE: рейтинг score прочитан заранее,
+    при его параллельном изменении читается заново. Возвращает новый рейтинг или None, если поста нет
+    """
+    while True:
+        new_score = trending.add_views(score, delta, moment)
+        if Posts.objects.filter(pk=pk, trending_score=score).update(views=F('views') + delta,
+                                                                    trending_score=new_score):
+            break
+        score = Posts.objects.filter(pk=pk).values_list('trending_score', flat=True).first()
+        if score is None:
+            return None
+    Tags.objects.filter(posts__pk=pk).update(views_total=F('views_total') + delta)
+    trending.record_bucket(pk, delta, moment)
+    return new_score
+
+
+def _take_db_views(pk):
+    """
+    Вычитание несброшенных просмотров поста из буфера в БД (в транзакции сброса), возвращает их кол-во.
+    Из каждой части вычитается ровно прочитанное, поэтому просмотры, пришедшие после чтения, остаются в буфере.
+    """
+    # строки, забранные другим сбросом, пропускаются: их прирост применит он
+    rows = _pending().select_for_update(skip_locked=True).filter(post=pk, views__gt=0)
+    rows = dict(rows.values_list('pk', 'views'))
+    if rows:
+        _pending().filter(pk__in=list(rows)).update(views=F('views') - Case(
+            *(When(pk=row, then=Value(views)) for row, views in rows.items()), default=Value(0)
+        ))
+    return sum(rows.values())
+
+
+def _clear_pending(pk, use_cache):
+    """Снятие отметки поста, если все его просмотры сброшены"""
+    if not use_cache:
+        _pending().filter(post=pk, views__lte=0).delete()
+        return
+    if get_pending(pk) > 0:
+        return
+    _pending().filter(post=pk).delete()
+    # просмотр, пришедший до снятия отметки, ставит ее до него: отметка возвращается
+    if get_pending(pk) > 0:
+        _mark_pending(pk)
+
+
+def flush_views():
+    """
+    Сброс накопленных просмотров в БД (в посты, в сумму просмотров их тегов и в популярность постов,
+    см. blog_app.trending).
+    Рейтинги постов читаются одним запросом, на пост выполняется один UPDATE просмотров и рейтинга,
+    затем прирост вычитается из буфера и снимается отметка поста.
+    Возвращает словарь {pk поста: сброшенный прирост}, пустой и при уже идущем в другом месте сбросе.
+    """
+    cache = get_cache()
+    if not acquire_lock(cache, FLUSH_RUNNING_KEY, timeout=get_flush_lock_timeout(), wait=0):
+        return {}
+    try:
+        return _flush_views()
+    finally:
+        cache.delete(FLUSH_RUNNING_KEY)
+
+
+def _flush_views():
+    use_cache = uses_cache()
+    moment = timezone.now()
+    if use_cache:
+        pending = get_pending_many(list(_pending().values_list('post_id', flat=True)))
+    else:
+        pending = _pending_totals(_pending())
+    old_scores = dict(Posts.objects.filter(pk__in=list(pending)).values_list('pk', 'trending_score'))
+    flushed, scores = {}, {}
+    for pk, delta in pending.items():
+        score = None
+        if delta > 0:
+            with transaction.atomic():
+                if not use_cache:
+                    delta = _take_db_views(pk)
+                if delta > 0:
+                    score = _apply(pk, delta, old_scores.get(pk), moment)
+            if delta > 0:
+                if use_cache:
+                    get_cache().decr(PENDING_KEY.format(pk), delta)
+                flushed[pk] = delta
+        if score is not None:
+            scores[pk] = score
+        _clear_pending(pk, use_cache)
+    if scores:
+        trending.update_top(scores)
+    return flushed
+
+
+def flush_views_if_due():
+    """Сброс просмотров не чаще одного раза за интервал для всех процессов"""
+    if get_cache().add(FLUSH_LOCK_KEY, 1, timeout=get_flush_interval()):
+        return flush_views()
+    return {}
+
+
+def _flusher_loop():
+    while True:
+        time.sleep(get_flush_interval())
+        close_old_connections()
+        try:
+            if flush_views_if_due():
+                # популярные посты в сайдбаре зависят от просмотров
+                refresh_sidebar_snapshot()
+        except Exception:  # noqa
+            # сбой сброса не должен останавливать поток, просмотры останутся в кеше
+            pass
+
+
+def start_background_flusher():
+    """Запуск фонового потока сброса просмотров (один на процесс)"""
+    global _flusher_thread
+    if _flusher_thread is not None:
+        return
+    with _flusher_lock:
+        if _flusher_thread is None:
+            _flusher_thread = threading.Thread(target=_flusher_loop, name='views-flusher', daemon=True)
+            _flusher_thread.start()
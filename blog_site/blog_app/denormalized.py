@@ -0,0 +1,122 @@
+"""
+Денормализованные счетчики:
+Categories.posts_count и Tags.posts_count - кол-во опубликованных постов,
+Tags.views_total - сумма просмотров постов с тегом,
+Posts.comments_count - кол-во комментариев к посту.
+
+Счетчики меняются приращениями (UPDATE ... SET x = x + delta) из сигналов (blog_app.signals),
+расхождения исправляет команда "manage.py recount".
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from blog_app.models import Categories, Comments, Posts, Tags
+
+PostTags = Posts.tags.through
+
+
+def _change(model, pks, **deltas):
+    """Приращение счетчиков у объектов model с pk из pks"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    pks = [pk for pk in pks if pk is not None]
+    if deltas and pks:
+        model.objects.filter(pk__in=pks).update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+
+def remember_post_state(post):
+    """Запоминает сохраненное в БД состояние поста перед его изменением (pre_save)"""
+    post._counters_state = Posts.objects.filter(pk=post.pk).values(
+        'is_published', 'category_id', 'slug', 'photo'
+    ).first()
+
+
+def post_saved(post, created):
+    """Пересчет счетчиков категорий и тегов после сохранения поста"""
+    old = getattr(post, '_counters_state', None) or {'is_published': False, 'category_id': None}
+    was_published, old_category = old['is_published'], old['category_id']
+    moved = old_category != post.category_id
+    with transaction.atomic():
+        if was_published and (not post.is_published or moved):
+            _change(Categories, [old_category], posts_count=-1)
+        if post.is_published and (not was_published or moved):
+            _change(Categories, [post.category_id], posts_count=1)
+        if not created and was_published != post.is_published:
+            tag_ids = list(PostTags.objects.filter(posts_id=post.pk).values_list('tags_id', flat=True))
+            _change(Tags, tag_ids, posts_count=1 if post.is_published else -1)
+    post._counters_state = {
+        'is_published': post.is_published, 'category_id': post.category_id, 'slug': post.slug, 'photo': post.photo.name,
+    }
+
+
+def remember_post_tags(post):
+    """Запоминает теги удаляемого поста: связи удаляются без сигнала m2m_changed (pre_delete)"""
+    post._counters_tag_ids = list(PostTags.objects.filter(posts_id=post.pk).values_list('tags_id', flat=True))
+
+
+def post_deleted(post):
+    """Пересчет счетчиков категорий и тегов после удаления поста"""
+    tag_ids = getattr(post, '_counters_tag_ids', [])
+    with transaction.atomic():
+        if post.is_published:
+            _change(Categories, [post.category_id], posts_count=-1)
+        _change(Tags, tag_ids, posts_count=-int(post.is_published), views_total=-post.views)
+
+
+def remember_linked_tags(instance, reverse, pk_set, action):
+    """
+    Запоминает реально существующие связи пост-тег перед их удалением (pre_remove, pre_clear):
+    в pk_set сигнала pre_remove попадают и несвязанные объекты.
+    """
+    links = PostTags.objects.filter(tags_id=instance.pk) if reverse else PostTags.objects.filter(posts_id=instance.pk)
+    if action == 'pre_remove':
+        links = links.filter(posts_id__in=pk_set) if reverse else links.filter(tags_id__in=pk_set)
+    field = 'posts_id' if reverse else 'tags_id'
+    instance._removed_link_ids = set(links.values_list(field, flat=True))
+
+
+def tags_changed(instance, reverse, pk_set, action):
+    """Пересчет счетчиков тегов после изменения связей пост-тег (post_add, post_remove, post_clear)"""
+    if action != 'post_add':
+        pk_set = getattr(instance, '_removed_link_ids', set())
+    if not pk_set:
+        return
+    sign = 1 if action == 'post_add' else -1
+    with transaction.atomic():
+        if reverse:
+            stats = Posts.objects.filter(pk__in=pk_set).aggregate(
+                published=Count('pk', filter=Q(is_published=True)), views=Sum('views')
+            )
+            _change(Tags, [instance.pk], posts_count=sign * stats['published'],
+                    views_total=sign * (stats['views'] or 0))
+        else:
+            is_published, views = Posts.objects.filter(pk=instance.pk).values_list('is_published', 'views').get()
+            _change(Tags, pk_set, posts_count=sign * int(is_published), views_total=sign * views)
+
+
+def comment_added(comment):
+    _change(Posts, [comment.post_id], comments_count=1)
+
+
+def comment_deleted(comment):
+    _change(Posts, [comment.post_id], comments_count=-1)
+
+
+def _count(queryset, field, aggregate=None):
+    """Подзапрос со значением агрегата (по умолчанию Count) или 0"""
+    aggregate = aggregate or Count('pk')
+    subquery = queryset.order_by().values(field).annotate(value=aggregate).values('value')
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), Value(0))
+
+
+def recount():
+    """Полный пересчет всех счетчиков по данным БД"""
+    with transaction.atomic():
+        Categories.objects.update(posts_count=_count(
+            Posts.objects.filter(category=OuterRef('pk'), is_published=True), 'category'
+        ))
+        Tags.objects.update(
+            posts_count=_count(PostTags.objects.filter(tags_id=OuterRef('pk'), posts__is_published=True), 'tags_id'),
+            views_total=_count(PostTags.objects.filter(tags_id=OuterRef('pk')), 'tags_id', Sum('posts__views')),
+        )
+        Posts.objects.update(comments_count=_count(Comments.objects.filter(post=OuterRef('pk')), 'post'))
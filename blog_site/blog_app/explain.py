@@ -0,0 +1,153 @@
+"""
+Проверка планов запросов страниц: запросы каждой страницы записываются при ее построении на текущей БД,
+для каждого выполняется EXPLAIN, и отмечаются полные сканирования больших таблиц и сортировки большого кол-ва строк -
+признаки того, что запросу не хватает индекса (см. Meta.indexes моделей).
+
+Страницы строятся с отдельным пустым кешем в памяти процесса и без кеша страниц, поэтому записываются все запросы,
+а рабочий кеш не затрагивается. Поддерживаются PostgreSQL (EXPLAIN в JSON) и SQLite (EXPLAIN QUERY PLAN).
+Используется командой "manage.py explain_views".
+"""
+import json
+import re
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from blog_app.benchmark import default_paths as benchmark_paths, get_host
+
+Issue = namedtuple('Issue', 'kind table rows')
+QueryPlan = namedtuple('QueryPlan', 'sql params plan issues')
+
+SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+SQLITE_SORT_RE = re.compile(r'^USE TEMP B-TREE FOR (?:ORDER BY|GROUP BY|DISTINCT)')
+
+# запросы, полный проход которых ожидаем: их результат кешируется
+DEFAULT_IGNORE = (
+    # кол-во объектов для номеров страниц (blog_app.pagination.CachedCountPaginator)
+    r'^SELECT COUNT\(\*\) AS "__count" FROM ',
+    # статистика корпуса BM25 (blog_app.search.backends.get_corpus_stats)
+    r'^SELECT COUNT\("blog_app_searchdocument"\."post_id"\) AS "total", AVG\("blog_app_searchdocument"\."length"\)',
+)
+
+EXPLAIN_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'explain-views'}}
+
+
+def default_paths():
+    """Страницы для проверки: страницы нагрузочного теста, вторая страница главной, лента и часть карты сайта"""
+    paths = benchmark_paths()
+    return paths[:1] + [reverse('home') + '?page=2'] + paths[1:] + [
+        reverse('feed_rss'), reverse('sitemap_section', kwargs={'section': 'posts'}),
+    ]
+
+
+def capture_queries(path):
+    """SELECT-запросы (sql, params), выполненные при построении страницы path, без повторов"""
+    queries = {}
+
+    def record(execute, sql, params, many, context):
+        if sql.lstrip().upper().startswith('SELECT'):
+            queries.setdefault(sql, params)
+        return execute(sql, params, many, context)
+
+    with override_settings(CACHES=EXPLAIN_CACHES, BLOG_VIEWS_CACHE='default', BLOG_PAGE_CACHE_ENABLED=False):
+        cache.clear()
+        with connection.execute_wrapper(record):
+            response = Client(HTTP_HOST=get_host()).get(path)
+    return response.status_code, list(queries.items())
+
+
+class TableSizes:
+    """Кол-во строк таблиц (в PostgreSQL - оценка планировщика из pg_class), запоминается"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def __getitem__(self, table):
+        if table not in self.rows:
+            self.rows[table] = self._count(table)
+        return self.rows[table]
+
+    @staticmethod
+    def _count(table):
+        if table not in connection.introspection.table_names():
+            return 0  # псевдоним таблицы или подзапрос
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+            else:
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            row = cursor.fetchone()
+        return max(int(row[0]), 0) if row else 0
+
+
+def _walk(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _walk(child)
+
+
+def _postgresql_plan(sql, params, sizes):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN ' + sql, params)
+        plan = '\n'.join(row[0] for row in cursor.fetchall())
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        tree = cursor.fetchone()[0]
+    tree = json.loads(tree) if isinstance(tree, str) else tree
+    issues = []
+    for node in _walk(tree[0]['Plan']):
+        if node['Node Type'] == 'Seq Scan':
+            issues.append(Issue('seq scan', node['Relation Name'], sizes[node['Relation Name']]))
+        elif node['Node Type'] == 'Sort':
+            issues.append(Issue('sort', None, sum(child['Plan Rows'] for child in node.get('Plans', []))))
+    return plan, issues
+
+
+def _sqlite_plan(sql, params, sizes):
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        details = [row[-1] for row in cursor.fetchall()]
+    scans = [match.group(1) for match in map(SQLITE_SCAN_RE.match, details) if match]
+    sorted_in_memory = any(SQLITE_SORT_RE.match(detail) for detail in details)
+    # без сортировки строки читаются в нужном порядке, и проход с LIMIT останавливается на первых строках
+    bounded = ' LIMIT ' in sql and not sorted_in_memory
+    issues = []
+    for detail in details:
+        scan = SQLITE_SCAN_RE.match(detail)
+        if scan and ' USING ' not in detail and not bounded:
+            issues.append(Issue('seq scan', scan.group(1), sizes[scan.group(1)]))
+        elif SQLITE_SORT_RE.match(detail):
+            # SQLite не оценивает кол-во строк сортировки: берется самая большая из читаемых целиком таблиц,
+            # строки, найденные только поиском по индексу (SEARCH), не учитываются
+            issues.append(Issue('sort', None, max((sizes[table] for table in scans), default=0)))
+    return '\n'.join(details), issues
+
+
+def explain(sql, params, sizes=None, min_rows=10000, ignore=DEFAULT_IGNORE):
+    """
+    План запроса и найденные в нем проблемы на таблицах и сортировках от min_rows строк.
+    Для запросов, совпадающих с одним из регулярных выражений ignore, проблемы не отмечаются.
+    """
+    sizes = sizes if sizes is not None else TableSizes()
+    if connection.vendor == 'postgresql':
+        plan, issues = _postgresql_plan(sql, params, sizes)
+    elif connection.vendor == 'sqlite':
+        plan, issues = _sqlite_plan(sql, params, sizes)
+    else:
+        raise NotImplementedError(f'EXPLAIN для "{connection.vendor}" не поддерживается')
+    if any(re.search(pattern, sql) for pattern in ignore):
+        issues = []
+    return QueryPlan(sql, params, plan, [issue for issue in issues if issue.rows >= min_rows])
+
+
+def explain_pages(paths=None, min_rows=10000, ignore=DEFAULT_IGNORE):
+    """Проверка страниц paths: список (путь, статус ответа, планы запросов)"""
+    sizes = TableSizes()
+    reports = []
+    for path in paths or default_paths():
+        status, queries = capture_queries(path)
+        reports.append((path, status, [explain(sql, params, sizes, min_rows, ignore) for sql, params in queries]))
+    return reports
@@ -0,0 +1,103 @@
+"""
+RSS и Atom ленты опубликованных постов: всего блога, категории и тега.
+
+Ленты кешируются целиком и отдаются с ETag/Last-Modified (см. blog_app.page_cache.cache_page_view в urls.py),
+поэтому повторные опросы читалок получают 304 без обращения к БД.
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from blog_app.models import POSTS_LIST_DEFERRED, Categories, Posts, Tags
+
+
+def get_feed_size():
+    """Кол-во последних постов в ленте"""
+    return getattr(settings, 'BLOG_FEED_SIZE', 20)
+
+
+class LatestPostsFeed(Feed):
+    """RSS лента последних постов блога"""
+    title = 'Блог: последние посты'
+    description = 'Последние опубликованные посты блога'
+
+    def link(self, obj=None):
+        return obj.get_absolute_url() if obj is not None else reverse('home')
+
+    def get_posts(self, obj):
+        return Posts.objects.filter(is_published=True)
+
+    def items(self, obj=None):
+        posts = self.get_posts(obj).select_related('author').defer(*POSTS_LIST_DEFERRED)
+        return posts.order_by('-created_at', '-pk')[:get_feed_size()]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.excerpt
+
+    def item_author_name(self, item):
+        return str(item.author)
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+
+class LatestPostsAtomFeed(LatestPostsFeed):
+    """Atom лента последних постов блога"""
+    feed_type = Atom1Feed
+    subtitle = LatestPostsFeed.description
+
+
+class CategoryPostsFeed(LatestPostsFeed):
+    """RSS лента последних постов категории"""
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Categories, slug=slug)
+
+    def title(self, obj):
+        return f'Блог: {obj.title}'
+
+    def description(self, obj):
+        return f'Последние посты категории "{obj.title}"'
+
+    def get_posts(self, obj):
+        return Posts.objects.filter(is_published=True, category=obj)
+
+
+class CategoryPostsAtomFeed(CategoryPostsFeed):
+    """Atom лента последних постов категории"""
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class TagPostsFeed(LatestPostsFeed):
+    """RSS лента последних постов с тегом"""
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Tags, slug=slug)
+
+    def title(self, obj):
+        return f'Блог: тег {obj.title}'
+
+    def description(self, obj):
+        return f'Последние посты с тегом "{obj.title}"'
+
+    def get_posts(self, obj):
+        return Posts.objects.filter(is_published=True, tags=obj)
+
+
+class TagPostsAtomFeed(TagPostsFeed):
+    """Atom лента последних постов с тегом"""
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
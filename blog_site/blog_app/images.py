@@ -0,0 +1,233 @@
+"""
+Уменьшенные копии фото постов для адаптивного вывода (srcset).
+
+После загрузки фото в фоне (вне запроса) создаются копии нескольких ширин в WebP и JPEG
+и крошечная размытая заглушка (data URI), которая показывается, пока грузится фото.
+Копии хранятся по хешу содержимого фото, поэтому повторная генерация не пересоздает готовые файлы.
+Для существующих фото копии создаются командой "manage.py generate_photo_variants".
+"""
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils.html import format_html, format_html_join
+from PIL import Image, ImageFilter, ImageOps, features
+
+from blog_app import caching
+from blog_app.models import Posts
+
+VARIANT_WIDTHS = (50, 100, 200, 300, 600, 800, 1200, 1600)
+VARIANT_FORMATS = ('webp', 'jpeg')
+FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp', {'quality': 75, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+PLACEHOLDER_WIDTH = 16
+
+# место вывода фото: ширина в CSS-пикселях и атрибут sizes
+USAGES = {
+    'admin': (50, '50px'),
+    'sidebar': (100, '100px'),
+    'card': (300, '300px'),
+    'featured': (600, '(max-width: 767px) 100vw, 600px'),
+    'single': (800, '(max-width: 991px) 100vw, 800px'),
+}
+
+_executor_lock = threading.Lock()
+_executor = None
+
+
+def get_widths():
+    """Ширины создаваемых копий"""
+    return tuple(getattr(settings, 'BLOG_IMAGES_WIDTHS', VARIANT_WIDTHS))
+
+
+def get_formats():
+    """Форматы копий, поддерживаемые установленным Pillow, JPEG создается всегда (для src и старых браузеров)"""
+    formats = getattr(settings, 'BLOG_IMAGES_FORMATS', VARIANT_FORMATS)
+    formats = [fmt for fmt in formats if fmt != 'webp' or features.check('webp')]
+    return formats if 'jpeg' in formats else formats + ['jpeg']
+
+
+def variant_name(digest, width, fmt):
+    """Путь копии в хранилище: зависит только от содержимого фото, ширины и формата"""
+    return f'photos/variants/{digest[:2]}/{digest}/{width}w.{FORMATS[fmt][1]}'
+
+
+def _to_rgb(image):
+    """Приведение к RGB, прозрачный фон заменяется белым (JPEG не поддерживает прозрачность)"""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.split()[-1])
+        return background
+    return image.convert('RGB')
+
+
+def _resize(image, width):
+    height = max(round(image.height * width / image.width), 1)
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def _encode(image, fmt):
+    pil_format, _, _, options = FORMATS[fmt]
+    buffer = BytesIO()
+    image.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def make_placeholder(image):
+    """Размытая заглушка шириной PLACEHOLDER_WIDTH пикселей в виде data URI"""
+    small = _resize(image, min(PLACEHOLDER_WIDTH, image.width)).filter(ImageFilter.GaussianBlur(1))
+    buffer = BytesIO()
+    small.save(buffer, 'JPEG', quality=50)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+
+def generate_variants(photo, force=False):
+    """
+    Создание копий фото (FieldFile) всех ширин меньше исходной во всех форматах.
+    Уже существующие копии пропускаются (если не force).
+    Возвращает описание копий для Posts.photo_variants и заглушку для Posts.photo_placeholder.
+    """
+    storage = photo.storage
+    with photo.open('rb') as file:
+        data = file.read()
+    digest = hashlib.sha1(data).hexdigest()[:20]
+    image = _to_rgb(ImageOps.exif_transpose(Image.open(BytesIO(data))))
+    widths = [width for width in sorted(get_widths()) if width < image.width]
+    formats = get_formats()
+    for width in widths:
+        resized = None
+        for fmt in formats:
+            name = variant_name(digest, width, fmt)
+            if not force and storage.exists(name):
+                continue
+            if force and storage.exists(name):
+                storage.delete(name)
+            if resized is None:
+                resized = _resize(image, width)
+            storage.save(name, BytesIO(_encode(resized, fmt)))
+    variants = {
+        'hash': digest,
+        'width': image.width,
+        'height': image.height,
+        'widths': widths,
+        'formats': formats,
+    }
+    return variants, make_placeholder(image)
+
+
+def update_post_photo(pk, force=False):
+    """Создание копий фото поста и сохранение их описания в пост (без сигналов и без изменения updated_at)"""
+    post = Posts.objects.filter(pk=pk).only('pk', 'slug', 'photo', 'is_published').first()
+    if post is None or not post.photo:
+        return False
+    variants, placeholder = generate_variants(post.photo, force=force)
+    # фото могло быть заменено, пока создавались копии
+    updated = Posts.objects.filter(pk=pk, photo=post.photo.name).update(
+        photo_variants=variants, photo_placeholder=placeholder
+    )
+    if updated:
+        deps = ['Posts', f'Post:{post.slug}']
+        if post.is_published:
+            deps.append('Posts(is_published)')
+        caching.bump(*deps)
+    return bool(updated)
+
+
+def reset_stale_variants(post):
+    """При замене или удалении фото описание старых копий сбрасывается до сохранения поста (pre_save)"""
+    old = getattr(post, '_counters_state', None) or {}
+    post._photo_changed = old.get('photo', '') != post.photo.name or not getattr(post.photo, '_committed', True)
+    if post._photo_changed:
+        post.photo_variants = {}
+        post.photo_placeholder = ''
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(settings, 'BLOG_IMAGES_WORKERS', 1)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='photo-variants')
+    return _executor
+
+
+def _update_in_background(pk):
+    close_old_connections()
+    try:
+        update_post_photo(pk)
+    except Exception:  # noqa
+        # фото останется без копий и будет выводиться как есть, пока не выполнится generate_photo_variants
+        pass
+    finally:
+        connection.close()
+
+
+def schedule_variants(post):
+    """Создание копий фото поста после фиксации транзакции: в фоновом потоке или сразу (BLOG_IMAGES_ASYNC)"""
+    pk = post.pk
+    if getattr(settings, 'BLOG_IMAGES_ASYNC', True):
+        transaction.on_commit(lambda: _get_executor().submit(_update_in_background, pk))
+    else:
+        transaction.on_commit(lambda: update_post_photo(pk))
+
+
+def _get(obj, name):
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def _photo_url(obj):
+    photo = _get(obj, 'photo')
+    if not photo:
+        return ''
+    if isinstance(photo, str):
+        return Posts._meta.get_field('photo').storage.url(photo)
+    return photo.url
+
+
+def photo_html(obj, usage, **attrs):
+    """
+    HTML фото поста (или элемента снимка сайдбара) для места вывода usage:
+    <picture> с srcset копий в WebP и JPEG и размытой заглушкой на фоне,
+    если копии еще не созданы - исходное фото.
+    """
+    url = _photo_url(obj)
+    if not url:
+        return ''
+    width, sizes = USAGES[usage]
+    attrs = {'alt': _get(obj, 'title') or '', 'loading': 'lazy', 'decoding': 'async', **attrs}
+    variants = _get(obj, 'photo_variants') or {}
+    if not variants:
+        return format_html('<img src="{}"{}>', url, format_html_join('', ' {}="{}"', attrs.items()))
+    storage = Posts._meta.get_field('photo').storage
+    # копии от ширины места вывода до двойной (для экранов с высокой плотностью пикселей)
+    widths = [w for w in variants['widths'] if width <= w <= width * 2]
+    if not widths or widths[-1] < min(width * 2, variants['width']):
+        widths.append(variants['width'])
+
+    def srcset(fmt):
+        return ', '.join(
+            f'{storage.url(variant_name(variants["hash"], w, fmt)) if w in variants["widths"] else url} {w}w'
+            for w in widths
+        )
+
+    src_width = next((w for w in widths if w >= width), widths[-1])
+    src = storage.url(variant_name(variants['hash'], src_width, 'jpeg')) if src_width in variants['widths'] else url
+    placeholder = _get(obj, 'photo_placeholder')
+    if placeholder:
+        attrs['style'] = f'background: url({placeholder}) center / cover no-repeat'
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((FORMATS[fmt][2], srcset(fmt), sizes) for fmt in variants['formats'] if fmt != 'jpeg')
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        sources, src, srcset('jpeg'), sizes, format_html_join('', ' {}="{}"', attrs.items())
+    )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from blog_app.benchmark import MODES, benchmark, default_paths
+
+
+class Command(BaseCommand):
+    """Команда для сравнения пропускной способности и задержек страниц под WSGI и ASGI"""
+    help = 'Нагружает страницы блога в режимах WSGI/ASGI и выводит запросы в секунду и задержки p50/p99'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*',
+                            help='Пути страниц (по умолчанию - главная, пост, категория, тег, поиск)')
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=['wsgi', 'asgi'],
+                            help='Режимы: обработчик и вариант представлений (asgi - асинхронные представления)')
+        parser.add_argument('--requests', type=int, default=200, help='Кол-во запросов в каждом режиме')
+        parser.add_argument('--concurrency', type=int, default=10, help='Кол-во одновременных запросов')
+        parser.add_argument('--page-cache', action='store_true', help='Не отключать кеш страниц')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or default_paths()
+        self.stdout.write('Страницы: ' + ', '.join(paths))
+        self.stdout.write(f'{"режим":<12}{"запросов/с":>12}{"p50, мс":>10}{"p99, мс":>10}{"ошибок":>8}')
+        for mode in options['modes']:
+            result = benchmark(mode, paths, requests=options['requests'], concurrency=options['concurrency'],
+                               page_cache=options['page_cache'])
+            self.stdout.write(f'{mode:<12}{result["rps"]:>12.1f}{result["p50"]:>10.1f}{result["p99"]:>10.1f}'
+                              f'{result["errors"]:>8}')
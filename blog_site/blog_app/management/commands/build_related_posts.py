@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blog_app.related import build_related
+
+
+class Command(BaseCommand):
+    """Команда для полного пересчета похожих постов"""
+    help = 'Пересчитывает похожие посты всех опубликованных постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Кол-во постов в одной пачке')
+
+    def handle(self, *args, **options):
+        count = build_related(chunk_size=options['chunk_size'])
+        self.stdout.write(f'Пересчитаны похожие посты для постов: {count}')
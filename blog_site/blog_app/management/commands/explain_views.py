@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blog_app.explain import DEFAULT_IGNORE, explain_pages
+
+
+class Command(BaseCommand):
+    """Команда для проверки планов запросов страниц перед развертыванием"""
+    help = ('Строит страницы на текущей БД, выполняет EXPLAIN для их запросов и отмечает полные сканирования '
+            'и сортировки больших таблиц (с ошибкой, если они найдены)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help='Пути страниц (по умолчанию - основные страницы блога)')
+        parser.add_argument('--min-rows', type=int, default=10000,
+                            help='С какого кол-ва строк таблица или сортировка считается большой')
+        parser.add_argument('--ignore', action='append', default=[],
+                            help='Регулярное выражение для запросов, проблемы которых не отмечаются (можно несколько)')
+        parser.add_argument('--strict', action='store_true',
+                            help='Не пропускать запросы с ожидаемым полным проходом (кешируемые кол-ва и статистика)')
+
+    def handle(self, *args, **options):
+        problems = 0
+        ignore = options['ignore'] + ([] if options['strict'] else list(DEFAULT_IGNORE))
+        for path, status, plans in explain_pages(options['paths'], options['min_rows'], ignore):
+            self.stdout.write(f'{path} ({status}): запросов {len(plans)}')
+            for plan in plans:
+                if options['verbosity'] > 1 or plan.issues:
+                    self.stdout.write(f'  {plan.sql}')
+                if options['verbosity'] > 1:
+                    self.stdout.write('    ' + plan.plan.replace('\n', '\n    '))
+                for issue in plan.issues:
+                    problems += 1
+                    target = f'таблица {issue.table}' if issue.table else 'строк'
+                    self.stdout.write(self.style.WARNING(f'    {issue.kind}: {target}, ~{issue.rows} строк'))
+        if problems:
+            raise CommandError(f'Найдено проблем в планах запросов: {problems}')
+        self.stdout.write(self.style.SUCCESS('Полных сканирований и сортировок больших таблиц не найдено'))
@@ -0,0 +1,25 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog_app.transfer import export_blog
+
+
+class Command(BaseCommand):
+    """Команда для потокового экспорта категорий, тегов, постов и комментариев в JSON Lines"""
+    help = 'Экспортирует контент блога в файл JSON Lines (по умолчанию в stdout)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-', help='Путь к файлу или "-" для stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Кол-во строк, читаемых из БД за раз')
+        parser.add_argument('--photo-hashes', action='store_true', help='Добавить sha1 файлов фото постов')
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            counts = export_blog(self.stdout, options['chunk_size'], options['photo_hashes'])
+            out = sys.stderr
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                counts = export_blog(file, options['chunk_size'], options['photo_hashes'])
+            out = self.stdout
+        out.write('Экспортировано: ' + ', '.join(f'{name}: {count}' for name, count in counts.items()) + '\n')
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog_app.counters import flush_views, get_flush_interval
+from blog_app.snapshots import refresh_sidebar_snapshot
+
+
+class Command(BaseCommand):
+    """Команда для сброса накопленных в кеше просмотров постов в БД"""
+    help = 'Сбрасывает накопленные просмотры постов в БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='Сбрасывать просмотры постоянно, с интервалом BLOG_VIEWS_FLUSH_INTERVAL')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Интервал сброса в секундах (для --loop)')
+
+    def handle(self, *args, **options):
+        interval = options['interval'] or get_flush_interval()
+        while True:
+            flushed = flush_views()
+            if flushed:
+                # популярные посты в сайдбаре зависят от просмотров
+                refresh_sidebar_snapshot()
+            self.stdout.write(f'Сброшено просмотров: {sum(flushed.values())} (постов: {len(flushed)})')
+            if not options['loop']:
+                break
+            time.sleep(interval)
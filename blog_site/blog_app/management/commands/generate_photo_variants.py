@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from blog_app.images import update_post_photo
+from blog_app.models import Posts
+
+
+class Command(BaseCommand):
+    """Команда для создания уменьшенных копий и заглушек фото существующих постов"""
+    help = 'Создает уменьшенные копии (WebP/JPEG) и размытые заглушки фото постов, у которых их еще нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Пересоздать копии всех фото')
+
+    def handle(self, *args, **options):
+        posts = Posts.objects.exclude(photo='')
+        if not options['force']:
+            posts = posts.filter(photo_placeholder='')
+        count = failed = 0
+        for pk in posts.order_by('pk').values_list('pk', flat=True).iterator():
+            try:
+                count += update_post_photo(pk, force=options['force'])
+            except Exception as e:  # noqa
+                failed += 1
+                self.stderr.write(f'Пост {pk}: {e}')
+        self.stdout.write(f'Обработано фото: {count}, с ошибками: {failed}')
@@ -0,0 +1,32 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from blog_app.transfer import import_blog
+
+
+class Command(BaseCommand):
+    """Команда для потокового импорта контента блога из JSON Lines (созданного командой export_blog)"""
+    help = 'Импортирует контент блога из файла JSON Lines, обновляя существующие объекты по slug'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Путь к файлу JSON Lines')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Кол-во записей в одной пачке')
+        parser.add_argument('--checkpoint', default=None,
+                            help='Файл контрольной точки (по умолчанию <input>.checkpoint)')
+        parser.add_argument('--restart', action='store_true', help='Начать сначала, игнорируя контрольную точку')
+        parser.add_argument('--media-from', default=None,
+                            help='Каталог MEDIA_ROOT исходного окружения для копирования отсутствующих фото')
+        parser.add_argument('--no-index', action='store_true', help='Не перестраивать поисковый индекс')
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint'] or options['input'] + '.checkpoint'
+        if options['restart'] and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        with open(options['input'], encoding='utf-8') as file:
+            counts, skipped = import_blog(file, batch_size=options['batch_size'], checkpoint=checkpoint,
+                                          media_from=options['media_from'], index=not options['no_index'])
+        self.stdout.write('Импортировано: ' + ', '.join(f'{name}: {count}' for name, count in counts.items()))
+        if skipped:
+            self.stdout.write(f'Пропущено записей (нет связанных объектов или не совпал sha1 фото): {skipped}')
+        self.stdout.write('Для новых фото создайте копии командой generate_photo_variants')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from blog_app.search import get_backend
+
+
+class Command(BaseCommand):
+    """Команда для полной перестройки поискового индекса постов"""
+    help = 'Перестраивает поисковый индекс опубликованных постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Кол-во постов в одной пачке')
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        count = backend.rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(f'{backend.__class__.__name__}: проиндексировано постов: {count}')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from blog_app.trending import rebuild_scores
+
+
+class Command(BaseCommand):
+    """Команда для пересчета популярности постов по просмотрам за периоды"""
+    help = 'Пересчитывает популярность постов по сохраненным периодам и удаляет старые периоды'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=None,
+                            help='Сколько дней хранить периоды (по умолчанию BLOG_TRENDING_KEEP_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Кол-во постов в одной пачке')
+
+    def handle(self, *args, **options):
+        count = rebuild_scores(keep_days=options['keep_days'], chunk_size=options['chunk_size'])
+        self.stdout.write(f'Пересчитана популярность постов: {count}')
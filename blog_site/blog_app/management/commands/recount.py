@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog_app.denormalized import recount
+from blog_app.snapshots import refresh_sidebar_snapshot
+
+
+class Command(BaseCommand):
+    """Команда для исправления расхождений в денормализованных счетчиках"""
+    help = 'Пересчитывает кол-ва постов категорий и тегов, просмотры тегов и кол-ва комментариев постов'
+
+    def handle(self, *args, **options):
+        recount()
+        refresh_sidebar_snapshot()
+        self.stdout.write('Счетчики пересчитаны')
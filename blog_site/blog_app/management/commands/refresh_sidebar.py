@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from blog_app.snapshots import refresh_sidebar_snapshot
+
+
+class Command(BaseCommand):
+    """Команда для пересборки снимка сайдбара (запускается по расписанию)"""
+    help = 'Пересобирает снимок сайдбара: последние и популярные посты, популярность тегов'
+
+    def handle(self, *args, **options):
+        snapshot = refresh_sidebar_snapshot()
+        self.stdout.write(f'Снимок сайдбара обновлен, тегов: {len(snapshot["tags"])}')
@@ -0,0 +1,51 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from blog_app import caching
+from blog_app.cards import card_key
+from blog_app.models import Comments, Posts
+from blog_app.rendering import render_comment, render_post
+
+
+class Command(BaseCommand):
+    """Команда для заполнения подготовленных полей постов и комментариев (например, после обновления)"""
+    help = 'Пересчитывает очищенный HTML, выдержки и время чтения постов и очищенный HTML комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Кол-во объектов в одной пачке')
+
+    def process(self, queryset, render, fields, chunk_size, on_chunk=None):
+        """Обработка объектов пачками по pk, bulk_update не вызывает сигналы и не меняет updated_at"""
+        count = 0
+        last_pk = 0
+        while True:
+            chunk = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+            if not chunk:
+                return count
+            for obj in chunk:
+                render(obj)
+            queryset.model.objects.bulk_update(chunk, fields)
+            if on_chunk is not None:
+                on_chunk(chunk)
+            count += len(chunk)
+            last_pk = chunk[-1].pk
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        slugs = []
+
+        def purge_posts(chunk):
+            # сигналы не вызывались: карточки с прежней выдержкой (ключ не зависит от нее) удаляются явно
+            slugs.extend(post.slug for post in chunk)
+            cache.delete_many([card_key(post) for post in chunk])
+
+        posts = self.process(
+            Posts.objects.only('pk', 'slug', 'content', 'updated_at', 'comments_count', 'author', 'photo',
+                               'photo_variants'),
+            render_post, ['content_html', 'excerpt', 'excerpt_long', 'word_count', 'reading_time'], chunk_size,
+            on_chunk=purge_posts,
+        )
+        comments = self.process(Comments.objects.only('pk', 'content'), render_comment, ['content_html'], chunk_size)
+        # зависящие от постов и комментариев записи кеша (в т.ч. страницы) устаревают
+        caching.bump('Posts', 'Posts(is_published)', 'Comments', *(f'Post:{slug}' for slug in slugs))
+        self.stdout.write(f'Обработано постов: {posts}, комментариев: {comments}')
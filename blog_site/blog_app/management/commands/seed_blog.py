@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from blog_app.search import rebuild_index
+from blog_app.seeding import SEED_PASSWORD, seed
+
+
+class Command(BaseCommand):
+    """Команда для заполнения БД большим синтетическим набором данных (для проверки производительности)"""
+    help = 'Создает пачками пользователей, категории, теги, посты с HTML-контентом и комментарии'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Кол-во пользователей')
+        parser.add_argument('--categories', type=int, default=10, help='Кол-во категорий')
+        parser.add_argument('--tags', type=int, default=50, help='Кол-во тегов')
+        parser.add_argument('--posts', type=int, default=1000, help='Кол-во постов')
+        parser.add_argument('--comments', type=int, default=10000, help='Кол-во комментариев')
+        parser.add_argument('--tags-per-post', type=int, default=3, help='Среднее кол-во тегов поста')
+        parser.add_argument('--published-ratio', type=float, default=0.9, help='Доля опубликованных постов')
+        parser.add_argument('--days', type=int, default=3 * 365, help='За сколько дней распределить даты постов')
+        parser.add_argument('--seed', type=int, default=0, help='Seed генератора (одинаковый seed - одинаковые данные)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Кол-во объектов в одной пачке')
+        parser.add_argument('--workers', type=int, default=0,
+                            help='Кол-во процессов для генерации контента (0 - в текущем процессе)')
+        parser.add_argument('--index', action='store_true', help='Перестроить поисковый индекс после генерации')
+
+    def handle(self, *args, **options):
+        created = seed(
+            users=options['users'], categories=options['categories'], tags=options['tags'],
+            posts=options['posts'], comments=options['comments'], tags_per_post=options['tags_per_post'],
+            published_ratio=options['published_ratio'], days=options['days'], seed_value=options['seed'],
+            batch_size=options['batch_size'], workers=options['workers'], log=self.stdout.write,
+        )
+        if options['index']:
+            self.stdout.write(f'Проиндексировано постов: {rebuild_index()}')
+        self.stdout.write(', '.join(f'{name}: {count}' for name, count in created.items()))
+        self.stdout.write(f'Пароль пользователей seed_user_*: {SEED_PASSWORD}')
@@ -0,0 +1,286 @@
+"""
+Метрики работы сайта в формате Prometheus (страница /metrics).
+
+MetricsMiddleware учитывает для каждого маршрута (имени URL) время ответа, кол-во и время SQL-запросов
+и размер ответа. Время построения считается для каждого шаблона, включая шаблоны тегов (sidebar_tpl.html и т.п.),
+попадания и промахи - для кешей данных и страниц (blog_app.caching, blog_app.page_cache).
+
+Счетчики копятся в памяти процесса, без обращений к кешу на каждый запрос. Раз в BLOG_METRICS_PUBLISH_INTERVAL
+секунд процесс записывает свой снимок в кеш (BLOG_METRICS_CACHE), общий для процессов, а страница метрик
+суммирует снимки всех процессов. Снимок процесса, не обновлявшийся BLOG_METRICS_PROCESS_TTL секунд, пропадает.
+Страница метрик отключена, пока не задан токен BLOG_METRICS_TOKEN, который Prometheus передает в заголовке
+"Authorization: Bearer <токен>".
+"""
+import hmac
+import os
+import socket
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.template.base import Template
+
+from blog_app import caching
+
+PROCESSES_KEY = 'blog:metrics:processes'
+PROCESSES_LOCK_KEY = 'blog:metrics:processes:lock'
+PROCESS_KEY = 'blog:metrics:process:{}'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1000, 5000, 10000, 50000, 100000, 500000, 1000000)
+
+# имя метрики -> (тип, описание, границы гистограммы)
+METRICS = {
+    'blog_http_requests_total': ('counter', 'Кол-во запросов', None),
+    'blog_http_request_duration_seconds': ('histogram', 'Время ответа', LATENCY_BUCKETS),
+    'blog_http_response_size_bytes': ('histogram', 'Размер ответа', SIZE_BUCKETS),
+    'blog_db_queries_total': ('counter', 'Кол-во SQL-запросов', None),
+    'blog_db_query_duration_seconds_total': ('counter', 'Время SQL-запросов', None),
+    'blog_template_render_seconds': ('histogram', 'Время построения шаблона (вместе с вложенными)', LATENCY_BUCKETS),
+    'blog_cache_requests_total': ('counter', 'Обращения к кешу данных и страниц', None),
+}
+
+# статистика текущего запроса: {'queries': кол-во SQL-запросов, 'query_time': их время}, None - вне запроса.
+# Копируется в потоки загрузки данных асинхронных представлений (blog_app.async_views)
+_current = ContextVar('blog_metrics_request', default=None)
+
+
+def get_cache():
+    """Кеш, через который процессы обмениваются снимками метрик"""
+    return caches[getattr(settings, 'BLOG_METRICS_CACHE', 'default')]
+
+
+def is_enabled():
+    return getattr(settings, 'BLOG_METRICS_ENABLED', True)
+
+
+class Registry:
+    """Метрики процесса: значения счетчиков и гистограмм по (имя, метки)"""
+
+    def __init__(self, token=None):
+        self.token = token or f'{socket.gethostname()}:{os.getpid()}'
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}  # (имя, метки) -> [кол-во по корзинам..., кол-во выше последней границы, сумма]
+        self.published = 0
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        index = next((index for index, bound in enumerate(buckets) if value <= bound), len(buckets))
+        key = (name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(buckets) + 2)
+            histogram[index] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {'counters': dict(self.counters),
+                    'histograms': {key: list(value) for key, value in self.histograms.items()}}
+
+    def publish(self):
+        """Запись снимка процесса в общий кеш"""
+        cache = get_cache()
+        timeout = getattr(settings, 'BLOG_METRICS_PROCESS_TTL', 60 * 60 * 24)
+        cache.set(PROCESS_KEY.format(self.token), self.snapshot(), timeout)
+        if self.token not in cache.get(PROCESSES_KEY, set()):
+            if not caching.acquire_lock(cache, PROCESSES_LOCK_KEY):
+                return  # процесс будет добавлен в список при следующей записи
+            try:
+                tokens = cache.get(PROCESSES_KEY, set())
+                tokens.add(self.token)
+                cache.set(PROCESSES_KEY, tokens, timeout=None)
+            finally:
+                cache.delete(PROCESSES_LOCK_KEY)
+        self.published = time.monotonic()
+
+    def publish_if_due(self):
+        if time.monotonic() - self.published >= getattr(settings, 'BLOG_METRICS_PUBLISH_INTERVAL', 15):
+            self.publish()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Метрики текущего процесса (после fork процесс-потомок начинает свои)"""
+    global _registry
+    if _registry is None or _registry.pid != os.getpid():
+        with _registry_lock:
+            if _registry is None or _registry.pid != os.getpid():
+                _registry = Registry()
+    return _registry
+
+
+def record_cache(name, hit, count=1):
+    """Учет count обращений к кешу name: hit - найдены ли значения"""
+    if is_enabled() and count:
+        get_registry().inc('blog_cache_requests_total', (('cache', name), ('result', 'hit' if hit else 'miss')),
+                           count)
+
+
+def collect():
+    """Сумма снимков всех живых процессов (снимок текущего процесса предварительно обновляется)"""
+    get_registry().publish()
+    cache = get_cache()
+    tokens = cache.get(PROCESSES_KEY, set())
+    found = cache.get_many([PROCESS_KEY.format(token) for token in tokens])
+    if len(found) < len(tokens):
+        # без блокировки список не чистится: записи завершенных процессов просто не найдутся
+        if caching.acquire_lock(cache, PROCESSES_LOCK_KEY):
+            try:
+                alive = {token for token in cache.get(PROCESSES_KEY, set()) if PROCESS_KEY.format(token) in found}
+                cache.set(PROCESSES_KEY, alive | {get_registry().token}, timeout=None)
+            finally:
+                cache.delete(PROCESSES_LOCK_KEY)
+    counters, histograms = {}, {}
+    for snapshot in found.values():
+        for key, value in snapshot['counters'].items():
+            counters[key] = counters.get(key, 0) + value
+        for key, value in snapshot['histograms'].items():
+            total = histograms.setdefault(key, [0] * len(value))
+            histograms[key] = [a + b for a, b in zip(total, value)]
+    return {'counters': counters, 'histograms': histograms}
+
+
+def _format_labels(labels, *extra):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(metrics):
+    """Метрики в текстовом формате Prometheus"""
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        source = metrics['counters'] if kind == 'counter' else metrics['histograms']
+        series = sorted((labels, value) for (metric, labels), value in source.items() if metric == name)
+        if not series:
+            continue
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, ("le", bound))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def is_authorized(request):
+    """
+    Доступ к странице метрик: только с токеном BLOG_METRICS_TOKEN (заголовок "Authorization: Bearer <токен>"),
+    без настроенного токена страница отключена. Адрес клиента за обратным прокси обычно 127.0.0.1,
+    поэтому BLOG_METRICS_ALLOWED_IPS - только дополнительное ограничение (None - любые адреса).
+    """
+    token = getattr(settings, 'BLOG_METRICS_TOKEN', None)
+    if not token:
+        return False
+    allowed_ips = getattr(settings, 'BLOG_METRICS_ALLOWED_IPS', None)
+    if allowed_ips is not None and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return False
+    return hmac.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+
+
+def metrics_view(request):
+    """Страница метрик для Prometheus, доступна только с токеном (см. is_authorized)"""
+    if not is_enabled() or not is_authorized(request):
+        raise Http404()
+    return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats['queries'] += 1
+        stats['query_time'] += time.perf_counter() - started
+
+
+def _install_query_wrapper(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+def _instrument_templates():
+    render_template = Template.render
+    if getattr(render_template, 'instrumented', False):
+        return
+
+    @wraps(render_template)
+    def instrumented_render(self, context):
+        started = time.perf_counter()
+        try:
+            return render_template(self, context)
+        finally:
+            get_registry().observe('blog_template_render_seconds', (('template', self.name or '<string>'),),
+                                   time.perf_counter() - started)
+    instrumented_render.instrumented = True
+    Template.render = instrumented_render
+
+
+def install():
+    """Подключение учета SQL-запросов и построения шаблонов (вызывается при запуске приложения)"""
+    if is_enabled():
+        connection_created.connect(_install_query_wrapper, dispatch_uid='blog_metrics_queries')
+        _instrument_templates()
+
+
+class MetricsMiddleware:
+    """Учет запросов по маршрутам, ставится первым в MIDDLEWARE, чтобы время включало остальные middleware"""
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = {'queries': 0, 'query_time': 0.0}
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view = (('view', match.view_name if match is not None else '<unmatched>'),)
+        registry = get_registry()
+        registry.inc('blog_http_requests_total', view + (('method', request.method),
+                                                         ('status', str(response.status_code))))
+        registry.observe('blog_http_request_duration_seconds', view, elapsed)
+        registry.inc('blog_db_queries_total', view, stats['queries'])
+        registry.inc('blog_db_query_duration_seconds_total', view, stats['query_time'])
+        if not response.streaming:
+            registry.observe('blog_http_response_size_bytes', view, len(response.content))
+        registry.publish_if_due()
+        return response
@@ -1,4 +1,6 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.urls import reverse
 
@@ -7,6 +9,7 @@ class Categories(models.Model):
     """Модель категорий"""
     title = models.CharField(max_length=255, verbose_name='Название')
     slug = models.SlugField(max_length=255, verbose_name='URL', unique=True)
+    posts_count = models.IntegerField(default=0, editable=False, verbose_name='Кол-во опубликованных постов')
 
     def get_absolute_url(self):
         return reverse('category', kwargs={'slug': self.slug})
@@ -24,6 +27,8 @@ class Tags(models.Model):
     """Модель тегов"""
     title = models.CharField(max_length=50, verbose_name='Название')
     slug = models.SlugField(max_length=255, verbose_name='URL', unique=True)
+    posts_count = models.IntegerField(default=0, editable=False, verbose_name='Кол-во опубликованных постов')
+    views_total = models.IntegerField(default=0, editable=False, verbose_name='Сумма просмотров постов')
 
     def get_absolute_url(self):
         return reverse('tag', kwargs={'slug': self.slug})
@@ -39,18 +44,27 @@ class Tags(models.Model):
 
 class Posts(models.Model):
     """Модель постов"""
-    title = models.CharField(max_length=255, verbose_name='Название')
+    title = models.CharField(max_length=255, db_index=True, verbose_name='Название')
     slug = models.SlugField(max_length=255, verbose_name='URL', unique=True)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, verbose_name='Автор')
     content = models.TextField(blank=True, verbose_name='Контент поста')
+    content_html = models.TextField(blank=True, editable=False, verbose_name='Очищенный HTML')
+    excerpt = models.TextField(blank=True, editable=False, verbose_name='Выдержка')
+    excerpt_long = models.TextField(blank=True, editable=False, verbose_name='Длинная выдержка')
+    word_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Кол-во слов')
+    reading_time = models.PositiveIntegerField(default=1, editable=False, verbose_name='Время чтения (мин.)')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата обновления')
     photo = models.ImageField(upload_to='photos/%Y/%m/%d/', blank=True, verbose_name='Фото')
+    photo_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Копии фото')
+    photo_placeholder = models.TextField(blank=True, editable=False, verbose_name='Заглушка фото')
     views = models.IntegerField(default=0, verbose_name='Кол-во просмотров')
     category = models.ForeignKey(Categories, on_delete=models.PROTECT, verbose_name='Категория', related_name='posts')
     tags = models.ManyToManyField(Tags, blank=True, verbose_name='Теги', related_name='posts')
     is_published = models.BooleanField(default=False, verbose_name='Публикация')
     on_main = models.BooleanField(default=False, verbose_name='Закрепленно')
+    comments_count = models.IntegerField(default=0, editable=False, verbose_name='Кол-во комментариев')
+    trending_score = models.FloatField(default=0, editable=False, verbose_name='Рейтинг популярности')
 
     def get_absolute_url(self):
         return reverse('post', kwargs={'slug': self.slug})
@@ -62,12 +76,36 @@ class Posts(models.Model):
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ['-created_at', ]
+        indexes = [
+            # частичные индексы под запросы опубликованных постов (проверка планов - "manage.py explain_views"):
+            # главная страница
+            models.Index(fields=['-created_at', '-id'], name='posts_home_created_idx',
+                         condition=models.Q(is_published=True, on_main=False)),
+            # ленты, сайдбар, закрепленные посты, страницы тегов
+            models.Index(fields=['-created_at', '-id'], name='posts_pub_created_idx',
+                         condition=models.Q(is_published=True)),
+            # страницы категорий
+            models.Index(fields=['category', '-created_at', '-id'], name='posts_cat_pub_created_idx',
+                         condition=models.Q(is_published=True)),
+            # популярные посты сайдбара
+            models.Index(fields=['-views'], name='posts_pub_views_idx', condition=models.Q(is_published=True)),
+            # популярные сейчас посты (blog_app.trending)
+            models.Index(fields=['-trending_score'], name='posts_pub_trending_idx',
+                         condition=models.Q(is_published=True)),
+            # дата изменения страниц списков (Last-Modified)
+            models.Index(fields=['-updated_at'], name='posts_pub_updated_idx', condition=models.Q(is_published=True)),
+        ]
+
+
+# поля, не нужные для вывода карточек постов в списках
+POSTS_LIST_DEFERRED = ('content', 'content_html', 'excerpt_long')
 
 
 class Comments(models.Model):
     """Модель комментариев к постам"""
     post = models.ForeignKey(Posts, on_delete=models.PROTECT, verbose_name='Пост')
     content = models.TextField(blank='True', verbose_name='Текст')
+    content_html = models.TextField(blank=True, editable=False, verbose_name='Очищенный HTML')
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, verbose_name='Автор')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
 
@@ -78,5 +116,107 @@ class Comments(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['-created_at', ]
+        indexes = [
+            # курсорная пагинация комментариев поста
+            models.Index(fields=['post', '-created_at', '-id'], name='comments_post_created_idx'),
+        ]
+
+
+class VectorIndex(GinIndex):
+    """GIN-индекс PostgreSQL, на других БД (SQLite в тестах) - обычный индекс"""
+
+    def create_sql(self, model, schema_editor, using='', **kwargs):
+        if schema_editor.connection.vendor != 'postgresql':
+            return models.Index.create_sql(self, model, schema_editor, using=using, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+
+class SearchDocument(models.Model):
+    """Документ поискового индекса: опубликованный пост, приведенный к простому тексту"""
+    post = models.OneToOneField(Posts, on_delete=models.CASCADE, primary_key=True,
+                                related_name='search_document', verbose_name='Пост')
+    text = models.TextField(blank=True, verbose_name='Текст для сниппетов')
+    length = models.PositiveIntegerField(default=0, verbose_name='Кол-во термов')
+    vector = SearchVectorField(null=True, verbose_name='tsvector')  # только для PostgresSearchBackend
+
+    def __str__(self):
+        return str(self.post_id)
+
+    class Meta:
+        verbose_name = 'Поисковый документ'
+        verbose_name_plural = 'Поисковые документы'
+        indexes = [
+            VectorIndex(fields=['vector'], name='search_document_vector_idx'),  # для PostgresSearchBackend
+        ]
+
+
+class SearchPosting(models.Model):
+    """Запись инвертированного индекса: терм и его частота в документе"""
+    term = models.CharField(max_length=100, verbose_name='Терм')
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE,
+                                 related_name='postings', verbose_name='Документ')
+    frequency = models.PositiveIntegerField(verbose_name='Частота')
+
+    def __str__(self):
+        return self.term
+
+    class Meta:
+        verbose_name = 'Запись индекса'
+        verbose_name_plural = 'Записи индекса'
+        unique_together = ('term', 'document')
+
+
+class PendingViews(models.Model):
+    """
+    Несброшенные просмотры поста (blog_app.counters): записи удаляются только после сброса просмотров в БД.
+    Если буфер просмотров - БД, просмотры поста копятся в BLOG_VIEWS_DB_SHARDS записях (shard), чтобы
+    одновременные просмотры популярного поста не ждали блокировки одной строки. Иначе просмотры копятся в кеше,
+    а запись с shard=0 только отмечает пост.
+    """
+    post = models.ForeignKey(Posts, on_delete=models.CASCADE, related_name='+', verbose_name='Пост')
+    shard = models.PositiveSmallIntegerField(default=0, verbose_name='Часть счетчика')
+    views = models.IntegerField(default=0, verbose_name='Кол-во просмотров')
+
+    def __str__(self):
+        return f'{self.post_id}/{self.shard}: {self.views}'
+
+    class Meta:
+        verbose_name = 'Несброшенные просмотры'
+        verbose_name_plural = 'Несброшенные просмотры'
+        unique_together = ('post', 'shard')
+
+
+class PostViews(models.Model):
+    """Просмотры поста за период (час, BLOG_TRENDING_BUCKET), записываются при сбросе просмотров"""
+    post = models.ForeignKey(Posts, on_delete=models.CASCADE, related_name='views_buckets', verbose_name='Пост')
+    start = models.DateTimeField(verbose_name='Начало периода')
+    views = models.IntegerField(default=0, verbose_name='Кол-во просмотров')
+
+    def __str__(self):
+        return f'{self.post_id} {self.start:%Y-%m-%d %H:%M}: {self.views}'
+
+    class Meta:
+        verbose_name = 'Просмотры за период'
+        verbose_name_plural = 'Просмотры по периодам'
+        unique_together = ('post', 'start')
+        indexes = [
+            models.Index(fields=['start'], name='post_views_start_idx'),
+        ]
 
 
+class RelatedPost(models.Model):
+    """Похожий пост: заранее рассчитанные по тегам и категории похожие посты (blog_app.related)"""
+    post = models.ForeignKey(Posts, on_delete=models.CASCADE, related_name='related_links', verbose_name='Пост')
+    related = models.ForeignKey(Posts, on_delete=models.CASCADE, related_name='+', verbose_name='Похожий пост')
+    score = models.FloatField(verbose_name='Сходство')
+
+    def __str__(self):
+        return f'{self.post_id} -> {self.related_id}'
+
+    class Meta:
+        verbose_name = 'Похожий пост'
+        verbose_name_plural = 'Похожие посты'
+        unique_together = ('post', 'related')
+        indexes = [
+            models.Index(fields=['post', '-score'], name='related_post_score_idx'),
+        ]
@@ -0,0 +1,148 @@
+"""
+Кеширование страниц целиком для анонимных пользователей.
+
+Ключ страницы - путь с параметрами запроса, меняющими страницу (PAGE_PARAMS), и версии зависимостей страницы
+(blog_app.caching), поэтому метки вроде utm_source не плодят копий страницы в кеше, а страницы сбрасываются
+сразу при публикации или изменении постов, категорий и тегов.
+Ответы отдаются с ETag и Last-Modified (по Posts.updated_at), повторные запросы получают 304.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from blog_app.caching import get_timeout, make_key
+from blog_app.metrics import record_cache
+
+VIEWS_RE = re.compile(rb'(<span class="views-count">)\d+(</span>)')
+# параметры запроса, от которых зависит страница: номер страницы, курсоры ленты, поисковый запрос, страница sitemap
+PAGE_PARAMS = ('page', 'after', 'before', 's', 'p')
+
+
+def is_cacheable(request):
+    """Кешируются только GET/HEAD-запросы анонимных пользователей без сообщений"""
+    return (
+        getattr(settings, 'BLOG_PAGE_CACHE_ENABLED', True)
+        and request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not len(get_messages(request))
+    )
+
+
+def replace_views(content, views):
+    """Подстановка актуального кол-ва просмотров в закешированную страницу поста"""
+    return VIEWS_RE.sub(rb'\g<1>' + str(views).encode() + rb'\g<2>', content)
+
+
+def get_page_key(request, deps):
+    """Ключ страницы в кеше: путь и значения PAGE_PARAMS в фиксированном порядке, остальные параметры не учитываются"""
+    params = tuple((name, request.GET.getlist(name)) for name in PAGE_PARAMS if name in request.GET)
+    return make_key('page', deps, request.path, params)
+
+
+def _conditional_response(request, entry, response):
+    response['ETag'] = entry['etag']
+    if entry['last_modified']:
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    patch_vary_headers(response, ('Cookie',))
+    return get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified'], response=response
+    )
+
+
+def _hit_response(request, entry, on_hit=None):
+    content = on_hit(entry) if on_hit is not None else entry['content']
+    return _conditional_response(request, entry, HttpResponse(content, content_type=entry['content_type']))
+
+
+def get_cached_response(request, deps, on_hit=None):
+    """Ответ из кеша страниц, None - если страницы нет в кеше или запрос не кешируется"""
+    if not is_cacheable(request):
+        return None
+    entry = cache.get(get_page_key(request, deps))
+    record_cache('page', entry is not None)
+    return _hit_response(request, entry, on_hit) if entry is not None else None
+
+
+def cached_response(request, deps, get_response, get_last_modified=None, get_extra=None, on_hit=None):
+    """
+    Ответ из кеша страниц или get_response() с сохранением в кеш и поддержкой условных запросов.
+    get_last_modified() - дата изменения страницы (по умолчанию - из заголовка Last-Modified ответа),
+    get_extra() - дополнительные данные записи кеша, on_hit(entry) - содержимое ответа при попадании в кеш.
+    """
+    if not is_cacheable(request):
+        return get_response()
+    key = get_page_key(request, deps)
+    entry = cache.get(key)
+    record_cache('page', entry is not None)
+    if entry is not None:
+        return _hit_response(request, entry, on_hit)
+    response = get_response()
+    if response.status_code != 200 or response.streaming:
+        return response
+    if hasattr(response, 'render'):
+        response.render()
+    if get_last_modified is not None:
+        last_modified = get_last_modified()
+        last_modified = int(last_modified.timestamp()) if last_modified else None
+    else:
+        last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+    entry = {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'etag': quote_etag(hashlib.md5(f'{key}:{last_modified}'.encode()).hexdigest()),
+        'last_modified': last_modified,
+        'extra': get_extra() if get_extra is not None else {},
+    }
+    cache.set(key, entry, get_timeout())
+    return _conditional_response(request, entry, response)
+
+
+def cache_page_view(deps):
+    """Декоратор для представлений-функций (ленты, sitemap): кеширование страницы с зависимостями deps"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return cached_response(request, deps, lambda: view(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+class PageCacheMixin:
+    """
+    Миксин для представлений-классов: кеширование страницы для анонимных пользователей
+    с поддержкой условных запросов (ETag/Last-Modified).
+    """
+    page_cache_deps = ('Posts(is_published)', 'Categories', 'Tags')
+
+    def get_page_cache_deps(self):
+        """Зависимости страницы: при их изменении страница сбрасывается"""
+        return self.page_cache_deps
+
+    def get_last_modified(self):
+        """Дата последнего изменения страницы, вычисляется при промахе кеша"""
+        raise NotImplementedError
+
+    def get_page_cache_extra(self):
+        """Дополнительные данные, сохраняемые вместе со страницей"""
+        return {}
+
+    def page_cache_hit(self, entry):
+        """Обработка попадания в кеш, возвращает содержимое страницы для ответа"""
+        return entry['content']
+
+    def get_cached_response(self):
+        """Ответ из кеша без построения страницы (используется асинхронными представлениями)"""
+        return get_cached_response(self.request, self.get_page_cache_deps(), on_hit=self.page_cache_hit)
+
+    def dispatch(self, request, *args, **kwargs):
+        return cached_response(
+            request, self.get_page_cache_deps(), lambda: super(PageCacheMixin, self).dispatch(request, *args, **kwargs),
+            get_last_modified=self.get_last_modified, get_extra=self.get_page_cache_extra, on_hit=self.page_cache_hit,
+        )
@@ -0,0 +1,238 @@
+"""
+Пагинация списков постов.
+
+CachedCountPaginator - постраничная навигация с номерами, COUNT(*) кешируется
+до следующего изменения набора опубликованных постов (см. blog_app.caching).
+KeysetPaginator - курсорная навигация "вперед/назад" по (created_at, id),
+стоимость страницы не зависит от ее глубины.
+EstimatedCountPaginator - пагинатор админки для больших таблиц, кол-во строк без фильтров
+берется из статистики планировщика БД.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.http import Http404
+from django.utils.functional import cached_property
+
+from blog_app.caching import get_timeout, make_key
+from blog_app.metrics import record_cache
+
+COUNT_DEPS = ('Posts(is_published)',)
+
+
+def get_max_numbered_page():
+    """Последний номер страницы, на который ведут ссылки, дальше списки листаются по курсорам"""
+    return getattr(settings, 'BLOG_PAGINATION_MAX_NUMBERED', 10)
+
+
+class WindowPage(Page):
+    """
+    Страница, которая знает ближайшие к ней номера страниц.
+    У списков-QuerySet переходы вперед/назад ведут на курсорные страницы (KeysetPaginator),
+    а номера страниц выводятся только до get_max_numbered_page(), чтобы ссылки не вели на глубокие OFFSET.
+    """
+    radius = 2
+
+    @property
+    def has_cursors(self):
+        return isinstance(self.paginator.object_list, QuerySet)
+
+    @property
+    def last_numbered(self):
+        """Последний номер страницы со ссылкой"""
+        if self.has_cursors:
+            return min(self.paginator.num_pages, get_max_numbered_page())
+        return self.paginator.num_pages
+
+    @property
+    def last_page_linked(self):
+        """Ведет ли ссылка по номеру на последнюю страницу"""
+        return self.last_numbered == self.paginator.num_pages
+
+    @property
+    def window(self):
+        """Номера страниц не дальше radius от текущей (без обхода всего page_range)"""
+        start = max(self.number - self.radius, 1)
+        end = min(self.number + self.radius, self.last_numbered)
+        return range(start, end + 1)
+
+    @property
+    def next_cursor(self):
+        """Курсор следующей страницы в курсорном режиме (и для бесконечной прокрутки)"""
+        if self.has_next() and self.has_cursors:
+            return encode_cursor(self[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        """Курсор предыдущей страницы в курсорном режиме"""
+        if self.has_previous() and self.has_cursors:
+            return encode_cursor(self[0])
+        return None
+
+
+class CachedCountPaginator(Paginator):
+    """Пагинатор, кеширующий кол-во объектов под ключом count_key"""
+
+    def __init__(self, *args, count_key=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        key = make_key('count', COUNT_DEPS, self.count_key)
+        count = cache.get(key)
+        record_cache('count', count is not None)
+        if count is None:
+            count = super().count
+            cache.set(key, count, get_timeout())
+        return count
+
+    def _get_page(self, *args, **kwargs):
+        return WindowPage(*args, **kwargs)
+
+
+def estimate_count(queryset):
+    """
+    Примерное кол-во строк таблицы модели queryset по статистике планировщика
+    (PostgreSQL - pg_class.reltuples, SQLite - sqlite_stat1 после ANALYZE), None - статистики нет
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # первое число stat - кол-во строк таблицы
+            cursor.execute("SELECT substr(stat, 1, instr(stat || ' ', ' ') - 1) FROM sqlite_stat1 WHERE tbl = %s",
+                           [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or int(row[0]) < 0:  # таблица еще не анализировалась
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для списков админки: кол-во строк таблицы без фильтров, если по статистике их больше
+    BLOG_ADMIN_ESTIMATED_COUNT_THRESHOLD, не считается COUNT(*), а берется из статистики планировщика.
+    Отфильтрованные списки и небольшие таблицы считаются точно.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimate_count(queryset)
+            if estimate is not None and estimate > getattr(settings, 'BLOG_ADMIN_ESTIMATED_COUNT_THRESHOLD', 10000):
+                return estimate
+        return super().count
+
+
+def encode_cursor(post):
+    value = f'{post.created_at.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, binascii.Error, UnicodeError):
+        raise Http404('Неверный курсор')
+
+
+class KeysetPage:
+    """Страница курсорной пагинации"""
+    is_keyset = True
+    number = None
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """Курсорный пагинатор по убыванию (created_at, id)"""
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def page(self, after=None, before=None):
+        if before:
+            created_at, pk = decode_cursor(before)
+            items = list(
+                self.queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk))
+                .order_by('created_at', 'pk')[:self.per_page + 1]
+            )
+            has_previous = len(items) > self.per_page
+            items = items[:self.per_page][::-1]
+            has_next = True
+        else:
+            queryset = self.queryset
+            if after:
+                created_at, pk = decode_cursor(after)
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+            items = list(queryset.order_by('-created_at', '-pk')[:self.per_page + 1])
+            has_next = len(items) > self.per_page
+            items = items[:self.per_page]
+            has_previous = bool(after)
+        return KeysetPage(
+            items,
+            encode_cursor(items[-1]) if has_next and items else None,
+            encode_cursor(items[0]) if has_previous and items else None,
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    Миксин для ListView: при параметрах after/before в запросе включается курсорная пагинация,
+    иначе постраничная с номерами и закешированным кол-вом постов.
+    """
+    paginator_class = CachedCountPaginator
+
+    def get_count_cache_key(self):
+        """Ключ кеша кол-ва объектов списка, None - не кешировать"""
+        return self.request.path
+
+    def get_paginator(self, queryset, per_page, orphans=0, allow_empty_first_page=True, **kwargs):
+        return self.paginator_class(queryset, per_page, orphans=orphans, allow_empty_first_page=allow_empty_first_page,
+                                    count_key=self.get_count_cache_key(), **kwargs)
+
+    def paginate_queryset(self, queryset, page_size):
+        after = self.request.GET.get('after')
+        before = self.request.GET.get('before')
+        if (after or before) and isinstance(queryset, QuerySet):
+            page = KeysetPaginator(queryset, page_size).page(after=after, before=before)
+            return None, page, page.object_list, page.has_other_pages()
+        return super().paginate_queryset(queryset, page_size)
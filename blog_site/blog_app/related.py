@@ -0,0 +1,208 @@
+"""
+Похожие посты по общим тегам и категории.
+
+Пост представляется разреженным вектором тегов с весами idf = log(1 + N / df) (N - кол-во опубликованных постов,
+df - кол-во постов с тегом), сходство постов - косинус их векторов, к нему прибавляется
+BLOG_RELATED_CATEGORY_BOOST, если посты из одной категории. Если постов с общими тегами меньше K,
+список дополняется последними постами той же категории.
+
+Кандидаты находятся через обратный индекс тег -> посты, теги популярнее BLOG_RELATED_MAX_TAG_POSTS постов
+кандидатов не дают (их вклад в сходство мал, а перебор их постов дорог), но учитываются в сходстве.
+Для каждого поста в таблицу RelatedPost сохраняются BLOG_RELATED_COUNT похожих, страница поста читает
+только их. Полный пересчет - командой "manage.py build_related_posts", при изменении тегов, категории
+или публикации поста его список пересчитывается сигналами (blog_app.signals), а сам пост вставляется в списки
+постов с общими тегами (update_post).
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+
+from blog_app import caching
+from blog_app.models import Categories, Posts, RelatedPost, Tags
+
+PostTags = Posts.tags.through
+
+RELATED_DEPS = ('Related',)
+
+
+def get_count():
+    return getattr(settings, 'BLOG_RELATED_COUNT', 5)
+
+
+def _settings():
+    return (getattr(settings, 'BLOG_RELATED_CATEGORY_BOOST', 0.1),
+            getattr(settings, 'BLOG_RELATED_MAX_TAG_POSTS', 5000))
+
+
+def idf(df, total):
+    return math.log(1 + total / df) if df else 0.0
+
+
+def rank(post_id, category_id, dots, norm, norms, categories, recent, count, boost):
+    """
+    count похожих постов: список пар (id, сходство) по убыванию сходства.
+    dots - скалярные произведения векторов с кандидатами, norms и categories - нормы векторов и категории
+    кандидатов, recent - последние посты категории поста для дополнения списка.
+    """
+    scores = {}
+    for other, dot in dots.items():
+        if other == post_id:
+            continue
+        score = dot / (norm * norms[other]) if norm and norms.get(other) else 0.0
+        scores[other] = score + (boost if categories.get(other) == category_id else 0.0)
+    for other in recent:
+        if len(scores) >= count:
+            break
+        if other != post_id:
+            scores.setdefault(other, boost)
+    return heapq.nlargest(count, scores.items(), key=lambda item: (item[1], item[0]))
+
+
+class TagMatrix:
+    """Разреженная матрица пост x тег опубликованных постов в памяти"""
+
+    def __init__(self):
+        posts = Posts.objects.filter(is_published=True).order_by('-created_at', '-pk')
+        self.categories = {}
+        self.recent = defaultdict(list)  # категория -> последние посты
+        for pk, category_id in posts.values_list('pk', 'category_id').iterator():
+            self.categories[pk] = category_id
+            if len(self.recent[category_id]) <= get_count():
+                self.recent[category_id].append(pk)
+        self.post_tags = defaultdict(set)
+        self.tag_posts = defaultdict(list)
+        links = PostTags.objects.filter(posts__is_published=True).values_list('posts_id', 'tags_id')
+        for post_id, tag_id in links.iterator():
+            self.post_tags[post_id].add(tag_id)
+            self.tag_posts[tag_id].append(post_id)
+        total = len(self.categories)
+        self.weights = {tag_id: idf(len(posts), total) ** 2 for tag_id, posts in self.tag_posts.items()}
+        self.norms = {post_id: math.sqrt(sum(self.weights[tag_id] for tag_id in tags))
+                      for post_id, tags in self.post_tags.items()}
+
+    def related(self, post_id, count, boost, max_tag_posts):
+        tags = self.post_tags.get(post_id, set())
+        dots = defaultdict(float)
+        popular = []
+        for tag_id in tags:
+            if len(self.tag_posts[tag_id]) > max_tag_posts:
+                popular.append(tag_id)
+                continue
+            for other in self.tag_posts[tag_id]:
+                dots[other] += self.weights[tag_id]
+        for other in dots:
+            dots[other] += sum(self.weights[tag_id] for tag_id in popular if tag_id in self.post_tags[other])
+        category_id = self.categories[post_id]
+        return rank(post_id, category_id, dots, self.norms.get(post_id, 0.0), self.norms, self.categories,
+                    self.recent[category_id], count, boost)
+
+
+def _save(related):
+    """Замена списков похожих постов: related - словарь id поста -> [(id, сходство), ...]"""
+    with transaction.atomic():
+        RelatedPost.objects.filter(post_id__in=list(related)).delete()
+        RelatedPost.objects.bulk_create(
+            RelatedPost(post_id=post_id, related_id=other, score=score)
+            for post_id, pairs in related.items() for other, score in pairs
+        )
+
+
+def build_related(chunk_size=1000):
+    """Полный пересчет похожих постов, возвращает кол-во обработанных постов"""
+    count = get_count()
+    boost, max_tag_posts = _settings()
+    matrix = TagMatrix()
+    RelatedPost.objects.exclude(post__is_published=True).delete()
+    chunk = {}
+    for post_id in matrix.categories:
+        chunk[post_id] = matrix.related(post_id, count, boost, max_tag_posts)
+        if len(chunk) >= chunk_size:
+            _save(chunk)
+            chunk = {}
+    if chunk:
+        _save(chunk)
+    caching.bump(*RELATED_DEPS)
+    return len(matrix.categories)
+
+
+def _rank_post(post, count, boost, max_tag_posts):
+    """
+    Похожие посты одного поста по данным БД (без загрузки всей матрицы): список count пар (id, сходство)
+    и сходство со всеми кандидатами, найденными по генерирующим тегам поста (словарь id -> сходство)
+    """
+    total = Categories.objects.aggregate(total=Sum('posts_count'))['total'] or 1
+    dfs = dict(Tags.objects.filter(posts__pk=post.pk).values_list('pk', 'posts_count'))
+    weights = {tag_id: idf(df, total) ** 2 for tag_id, df in dfs.items()}
+    generating = [tag_id for tag_id, df in dfs.items() if df <= max_tag_posts]
+    dots = defaultdict(float)
+    links = PostTags.objects.filter(tags_id__in=generating, posts__is_published=True)
+    for other, tag_id in links.values_list('posts_id', 'tags_id'):
+        dots[other] += weights[tag_id]
+    # точное сходство считается для лучших по скалярному произведению кандидатов
+    dots = dict(heapq.nlargest(count * 10, ((other, dot) for other, dot in dots.items() if other != post.pk),
+                               key=lambda item: item[1]))
+    norms = defaultdict(float)
+    rows = PostTags.objects.filter(posts_id__in=list(dots))
+    for other, tag_id, df in rows.values_list('posts_id', 'tags_id', 'tags__posts_count'):
+        norms[other] += idf(df, total) ** 2
+        if tag_id in weights and tag_id not in generating:
+            dots[other] += weights[tag_id]
+    norms = {other: math.sqrt(value) for other, value in norms.items()}
+    norm = math.sqrt(sum(weights.values()))
+    categories = dict(Posts.objects.filter(pk__in=list(dots)).values_list('pk', 'category_id'))
+    recent = Posts.objects.filter(is_published=True, category=post.category_id).order_by('-created_at', '-pk')
+    recent = list(recent.values_list('pk', flat=True)[:count + 1])
+    pairs = rank(post.pk, post.category_id, dots, norm, norms, categories, recent, count, boost)
+    return pairs, dict(rank(post.pk, post.category_id, dots, norm, norms, categories, (), len(dots), boost))
+
+
+def _merge_reverse(post_id, scores, count):
+    """
+    Вставка поста post_id в списки похожих постов кандидатов scores (id -> сходство, оно симметрично)
+    и обновление его сходства в списках, где он уже есть. Возвращает словарь измененных списков
+    и id постов, из списков которых пост выпал (их списки нужно пересчитать)
+    """
+    listing = set(RelatedPost.objects.filter(related=post_id).values_list('post_id', flat=True))
+    lists = defaultdict(dict)
+    rows = RelatedPost.objects.filter(post_id__in=list(set(scores) | listing))
+    for other, related_id, score in rows.values_list('post_id', 'related_id', 'score'):
+        lists[other][related_id] = score
+    changed = {}
+    for other, score in scores.items():
+        pairs = heapq.nlargest(count, {**lists[other], post_id: score}.items(), key=lambda item: (item[1], item[0]))
+        if dict(pairs) != lists[other]:
+            changed[other] = pairs
+    return changed, listing - set(scores)
+
+
+def update_post(post):
+    """
+    Пересчет похожих постов одного поста и обновление списков его соседей - лучших кандидатов, найденных
+    по генерирующим тегам поста: пост вставляется в их списки, если похож на них сильнее последнего в списке.
+    Списки, из которых пост выпал (общих тегов больше нет), пересчитываются.
+    Неопубликованный пост удаляется из списков.
+    """
+    if not post.is_published:
+        RelatedPost.objects.filter(post=post.pk).delete()
+        RelatedPost.objects.filter(related=post.pk).delete()
+        return
+    count = get_count()
+    boost, max_tag_posts = _settings()
+    pairs, scores = _rank_post(post, count, boost, max_tag_posts)
+    changed, dropped = _merge_reverse(post.pk, scores, count)
+    changed[post.pk] = pairs
+    for other in Posts.objects.filter(pk__in=list(dropped), is_published=True).only('pk', 'category_id'):
+        changed[other.pk] = _rank_post(other, count, boost, max_tag_posts)[0]
+    _save(changed)
+    slugs = Posts.objects.filter(pk__in=list(changed)).values_list('slug', flat=True)
+    caching.bump(*(f'Post:{slug}' for slug in slugs))
+
+
+def get_related_posts(links):
+    """Похожие опубликованные посты по записям RelatedPost links (например, filter(post=pk)), один запрос"""
+    links = links.filter(related__is_published=True).select_related('related').only('related__title', 'related__slug')
+    return [link.related for link in links.order_by('-score')[:get_count()]]
@@ -0,0 +1,120 @@
+"""
+Подготовка HTML постов и комментариев при сохранении.
+
+Контент из CKEditor очищается от опасных тегов и атрибутов (белый список),
+для карточек постов заранее готовятся выдержки, считаются кол-во слов и время чтения,
+чтобы шаблоны выводили готовые поля, а не разбирали HTML на каждом запросе.
+"""
+import math
+import re
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+from django.utils.text import Truncator
+
+from blog_app.search.text import html_to_text
+
+EXCERPT_WORDS = 50
+EXCERPT_LONG_WORDS = 100
+WORDS_PER_MINUTE = 200
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'caption', 'code', 'div', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre', 's', 'small', 'span',
+    'strike', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'u', 'ul',
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'textarea', 'select', 'button'}
+ALLOWED_ATTRS = {
+    '*': {'class', 'style', 'title', 'dir', 'lang'},
+    'a': {'href', 'target', 'rel', 'name'},
+    'img': {'src', 'alt', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+    'ol': {'start'},
+}
+URL_ATTRS = {'href', 'src'}
+ALLOWED_SCHEMES = {'', 'http', 'https', 'mailto'}
+UNSAFE_STYLE_RE = re.compile(r'expression|javascript|vbscript|url\s*\(|@import|behavior', re.IGNORECASE)
+
+
+class _Sanitizer(HTMLParser):
+    """Парсер, пропускающий только разрешенные теги и атрибуты"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.result = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def _attrs(self, tag, attrs):
+        allowed = ALLOWED_ATTRS['*'] | ALLOWED_ATTRS.get(tag, set())
+        result = []
+        for name, value in attrs:
+            value = value or ''
+            if name not in allowed:
+                continue
+            if name in URL_ATTRS and urlparse(value.strip()).scheme.lower() not in ALLOWED_SCHEMES:
+                continue
+            if name == 'style' and UNSAFE_STYLE_RE.search(value):
+                continue
+            result.append(f' {name}="{escape(value, quote=True)}"')
+        return ''.join(result)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        self.result.append(f'<{tag}{self._attrs(tag, attrs)}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in self.open_tags and tag not in VOID_TAGS and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # незакрытые внутри теги закрываются, чтобы не сломать разметку страницы
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.result.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.result.append(escape(data, quote=False))
+
+    def get_html(self):
+        self.close()
+        return ''.join(self.result) + ''.join(f'</{tag}>' for tag in reversed(self.open_tags))
+
+
+def sanitize_html(value):
+    """Очистка HTML по белому списку тегов и атрибутов"""
+    parser = _Sanitizer()
+    parser.feed(value or '')
+    return parser.get_html()
+
+
+def render_post(post):
+    """Заполнение подготовленных полей поста по его контенту"""
+    post.content_html = sanitize_html(post.content)
+    post.excerpt = Truncator(post.content_html).words(EXCERPT_WORDS, html=True)
+    post.excerpt_long = Truncator(post.content_html).words(EXCERPT_LONG_WORDS, html=True)
+    post.word_count = len(html_to_text(post.content_html).split())
+    post.reading_time = max(math.ceil(post.word_count / WORDS_PER_MINUTE), 1)
+
+
+def render_comment(comment):
+    """Заполнение подготовленного HTML комментария"""
+    comment.content_html = sanitize_html(comment.content)
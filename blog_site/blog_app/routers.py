@@ -0,0 +1,172 @@
+"""
+Чтение с реплик БД: маршрутизатор отправляет запросы чтения ORM на реплики (BLOG_DB_REPLICAS), запись - на основную БД.
+
+Реплика выбирается случайно с учетом весов среди доступных: доступность проверяется запросом к реплике
+не чаще раза в BLOG_DB_HEALTH_INTERVAL секунд, недоступная (или отстающая больше BLOG_DB_REPLICA_MAX_LAG секунд
+в PostgreSQL) реплика исключается на BLOG_DB_REPLICA_RETRY секунд. Без доступных реплик читается основная БД.
+
+Реплики отстают от основной БД, поэтому чтение своих изменений гарантируется так: после первой записи в запросе
+все его дальнейшие чтения идут в основную БД, а ReplicaStickinessMiddleware ставит клиенту cookie,
+и его запросы следующие BLOG_DB_STICKY_SECONDS секунд тоже читают основную БД (комментарий, новый пост,
+регистрация сразу видны автору после перенаправления). Вне запросов (команды manage.py, фоновые задачи)
+чтение тоже идет в основную БД: они часто читают то, что затем записывают.
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+STICKY_COOKIE = 'blog_primary'
+
+# состояние запроса: {'primary': читать основную БД, 'written': в запросе была запись}, None - вне запроса.
+# Словарь общий для копий контекста (sync_to_async, потоки blog_app.async_views), поэтому запись в любом из
+# потоков запроса переключает на основную БД и остальные его чтения
+_request_state = ContextVar('blog_db_request_state', default=None)
+_primary_block = ContextVar('blog_db_primary_block', default=False)
+
+
+def get_replicas():
+    """Реплики из настроек: псевдоним в DATABASES -> вес"""
+    return getattr(settings, 'BLOG_DB_REPLICAS', None) or {}
+
+
+class ReplicaSelector:
+    """
+    Взвешенный случайный выбор реплики с проверкой доступности.
+    check(alias) выполняет проверку и вызывает исключение DatabaseError, если реплика недоступна.
+    """
+
+    def __init__(self, check=None, clock=time.monotonic, rng=None):
+        self.check = check or check_replica
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.lock = threading.Lock()
+        self.checked = {}  # псевдоним -> время последней успешной проверки
+        self.down = {}  # псевдоним -> время, до которого реплика исключена
+
+    def is_available(self, alias):
+        now = self.clock()
+        with self.lock:
+            if self.down.get(alias, now) > now:
+                return False
+            interval = getattr(settings, 'BLOG_DB_HEALTH_INTERVAL', 5)
+            if alias in self.checked and now - self.checked[alias] < interval:
+                return True
+        try:
+            self.check(alias)
+        except DatabaseError:
+            self.mark_down(alias)
+            return False
+        with self.lock:
+            self.checked[alias] = now
+            self.down.pop(alias, None)
+        return True
+
+    def mark_down(self, alias):
+        """Исключение реплики на BLOG_DB_REPLICA_RETRY секунд"""
+        with self.lock:
+            self.down[alias] = self.clock() + getattr(settings, 'BLOG_DB_REPLICA_RETRY', 30)
+            self.checked.pop(alias, None)
+
+    def choose(self, replicas=None):
+        """Псевдоним доступной реплики или None"""
+        candidates = dict(get_replicas() if replicas is None else replicas)
+        while candidates:
+            aliases = list(candidates)
+            alias = self.rng.choices(aliases, weights=[candidates[name] for name in aliases])[0]
+            if self.is_available(alias):
+                return alias
+            del candidates[alias]
+        return None
+
+
+def check_replica(alias):
+    """Проверка реплики запросом, в PostgreSQL заодно сравнивается отставание с BLOG_DB_REPLICA_MAX_LAG"""
+    connection = connections[alias]
+    max_lag = getattr(settings, 'BLOG_DB_REPLICA_MAX_LAG', None)
+    try:
+        with connection.cursor() as cursor:
+            if max_lag is not None and connection.vendor == 'postgresql':
+                cursor.execute('SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())')
+                lag = cursor.fetchone()[0]
+                if lag is not None and lag > max_lag:
+                    raise DatabaseError(f'Реплика "{alias}" отстает на {lag:.1f} с')
+            else:
+                cursor.execute('SELECT 1')
+    except DatabaseError:
+        connection.close()
+        raise
+
+
+selector = ReplicaSelector()
+
+
+def is_pinned():
+    """Читает ли текущий код основную БД"""
+    state = _request_state.get()
+    if state is None or state['primary'] or _primary_block.get():
+        return True
+    return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+@contextmanager
+def use_primary():
+    """Чтение основной БД внутри блока (например, перед записью, зависящей от прочитанного)"""
+    token = _primary_block.set(True)
+    try:
+        yield
+    finally:
+        _primary_block.reset(token)
+
+
+class ReplicaRouter:
+    """Маршрутизатор БД: чтение - реплика (см. модуль), запись и миграции - основная БД"""
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or is_pinned():
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db  # связанные объекты читаются из той же БД, что и объект
+        return selector.choose(replicas) or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.update(primary=True, written=True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # реплики содержат те же данные, что и основная БД
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False  # схема приходит на реплики репликацией
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Состояние маршрутизации на время запроса: клиент с cookie недавней записи читает основную БД,
+    после записи в запросе cookie ставится (продлевается) на BLOG_DB_STICKY_SECONDS секунд.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'primary': STICKY_COOKIE in request.COOKIES, 'written': False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state['written'] and get_replicas():
+            response.set_cookie(STICKY_COOKIE, '1', max_age=getattr(settings, 'BLOG_DB_STICKY_SECONDS', 15),
+                                httponly=True, samesite='Lax')
+        return response
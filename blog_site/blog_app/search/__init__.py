@@ -0,0 +1,116 @@
+"""
+Полнотекстовый поиск по постам.
+
+Бэкенд задается настройкой BLOG_SEARCH_BACKEND (путь к классу),
+по умолчанию для PostgreSQL используется PostgresSearchBackend, для остальных БД - InvertedIndexBackend.
+Индекс поддерживается в актуальном состоянии сигналами (blog_app.signals),
+полная перестройка - командой "manage.py rebuild_search_index".
+
+Упорядоченный список id найденных постов кешируется для нормализованного запроса (text.normalize_query),
+поэтому следующие страницы результатов - срез списка и один in_bulk. Каждое изменение индекса
+увеличивает версию зависимости 'Search', и закешированные результаты устаревают.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from blog_app import caching
+from blog_app.metrics import record_cache
+from blog_app.models import POSTS_LIST_DEFERRED, Posts
+from .text import normalize_query
+
+SEARCH_DEPS = ('Search',)
+
+_backends = {}
+
+
+def get_backend():
+    """Экземпляр поискового бэкенда из настроек"""
+    path = getattr(settings, 'BLOG_SEARCH_BACKEND', None)
+    if not path:
+        if connection.vendor == 'postgresql':
+            path = 'blog_app.search.backends.PostgresSearchBackend'
+        else:
+            path = 'blog_app.search.backends.InvertedIndexBackend'
+    if path not in _backends:
+        _backends[path] = import_string(path)()
+    return _backends[path]
+
+
+def get_result_ids(query, backend=None):
+    """
+    Id найденных постов по убыванию релевантности (не больше BLOG_SEARCH_MAX_RESULTS),
+    кешируются до изменения поискового индекса. query - нормализованный запрос.
+    """
+    if not query:
+        return []
+    backend = backend or get_backend()
+    key = caching.make_key('search', SEARCH_DEPS, type(backend).__name__, query)
+    ids = cache.get(key)
+    record_cache('search', ids is not None)
+    if ids is None:
+        limit = getattr(settings, 'BLOG_SEARCH_MAX_RESULTS', 1000)
+        ids = [post_id for post_id, _ in backend.search(query, limit)]
+        cache.set(key, ids, caching.get_timeout())
+    return ids
+
+
+class SearchResults:
+    """
+    Ленивый список результатов поиска для Paginator.
+    Ранжирование выполняется один раз (список id кешируется), а посты и сниппеты загружаются
+    только для запрошенного среза.
+    """
+
+    def __init__(self, query, backend=None):
+        self.query = normalize_query(query)
+        self.backend = backend or get_backend()
+        self._ids = None
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = get_result_ids(self.query, self.backend)
+        return self._ids
+
+    def count(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        ids = self.ids[index]
+        posts = Posts.objects.filter(is_published=True).select_related('author').defer(*POSTS_LIST_DEFERRED)
+        posts = posts.in_bulk(ids)
+        snippets = self.backend.snippets(ids, self.query)
+        page = []
+        for post_id in ids:
+            if post_id in posts:
+                post = posts[post_id]
+                post.snippet = snippets.get(post_id, '')
+                page.append(post)
+        return page
+
+
+def search(query):
+    return SearchResults(query or '')
+
+
+def index_post(post):
+    get_backend().index_post(post)
+    caching.bump(*SEARCH_DEPS)
+
+
+def remove_post(post_id):
+    get_backend().remove_post(post_id)
+    caching.bump(*SEARCH_DEPS)
+
+
+def rebuild_index():
+    count = get_backend().rebuild()
+    caching.bump('Posts', *SEARCH_DEPS)  # статистика корпуса BM25 (backends.get_corpus_stats) и результаты
+    return count
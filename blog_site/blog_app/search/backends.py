@@ -0,0 +1,174 @@
+"""
+Бэкенды полнотекстового поиска по постам.
+
+InvertedIndexBackend - инвертированный индекс в таблицах SearchDocument/SearchPosting
+с ранжированием BM25 на Python, работает на любой БД (в т.ч. SQLite в тестах).
+PostgresSearchBackend - tsvector + GIN-индекс (SearchDocument.Meta.indexes) средствами PostgreSQL.
+"""
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db import transaction
+from django.db.models import Avg, Count, F, TextField, Value
+from django.utils.html import escape
+
+from blog_app.caching import cached
+from blog_app.models import Posts, SearchDocument, SearchPosting
+from .text import html_to_text, make_snippet, tokenize
+
+TITLE_WEIGHT = 3
+TAGS_WEIGHT = 2
+BODY_WEIGHT = 1
+
+
+class BaseSearchBackend:
+    """Общий интерфейс поисковых бэкендов"""
+
+    def get_document(self, post):
+        """Части поста, попадающие в индекс: название, теги и текст без HTML"""
+        tags = ' '.join(tag.title for tag in post.tags.all())
+        return post.title, tags, html_to_text(post.content)
+
+    def index_post(self, post):
+        """Добавление или обновление поста в индексе, неопубликованные посты из индекса удаляются"""
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        """Удаление поста из индекса"""
+        SearchDocument.objects.filter(pk=post_id).delete()
+
+    def search(self, query, limit=None):
+        """Список пар (id поста, релевантность) по убыванию релевантности, не больше limit"""
+        raise NotImplementedError
+
+    def snippets(self, post_ids, query):
+        """Словарь {id поста: сниппет с подсвеченными термами запроса}"""
+        terms = tokenize(query)
+        texts = SearchDocument.objects.filter(pk__in=post_ids).values_list('pk', 'text')
+        return {pk: make_snippet(text, terms) for pk, text in texts}
+
+    def rebuild(self, chunk_size=500):
+        """Полная перестройка индекса, возвращает кол-во проиндексированных постов"""
+        SearchDocument.objects.all().delete()
+        count = 0
+        posts = Posts.objects.filter(is_published=True).prefetch_related('tags').order_by('pk')
+        # prefetch_related работает с iterator() только с Django 4.1, поэтому пачками по pk
+        last_pk = 0
+        while True:
+            chunk = list(posts.filter(pk__gt=last_pk)[:chunk_size])
+            if not chunk:
+                break
+            for post in chunk:
+                self.index_post(post)
+            count += len(chunk)
+            last_pk = chunk[-1].pk
+        return count
+
+
+@cached('search_stats', deps=('Posts',))
+def get_corpus_stats():
+    """Кол-во документов и средняя длина документа для BM25 (полный проход по индексу, поэтому кешируется)"""
+    return SearchDocument.objects.aggregate(total=Count('pk'), avg_length=Avg('length'))
+
+
+class InvertedIndexBackend(BaseSearchBackend):
+    """Инвертированный индекс в БД с ранжированием BM25"""
+    k1 = 1.2
+    b = 0.75
+
+    def index_post(self, post):
+        if not post.is_published:
+            self.remove_post(post.pk)
+            return
+        title, tags, body = self.get_document(post)
+        frequencies = Counter()
+        for text, weight in ((title, TITLE_WEIGHT), (tags, TAGS_WEIGHT), (body, BODY_WEIGHT)):
+            for term in tokenize(text):
+                frequencies[term] += weight
+        with transaction.atomic():
+            document, _ = SearchDocument.objects.update_or_create(
+                post=post, defaults={'text': f'{title}. {body}', 'length': sum(frequencies.values())}
+            )
+            document.postings.all().delete()
+            SearchPosting.objects.bulk_create(
+                SearchPosting(term=term, document=document, frequency=frequency)
+                for term, frequency in frequencies.items()
+            )
+
+    def search(self, query, limit=None):
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        postings = defaultdict(list)
+        lengths = {}
+        rows = SearchPosting.objects.filter(term__in=terms).values_list(
+            'term', 'document_id', 'frequency', 'document__length'
+        )
+        for term, doc_id, frequency, length in rows:
+            postings[term].append((doc_id, frequency))
+            lengths[doc_id] = length
+        if not postings:
+            return []
+        stats = get_corpus_stats()
+        total = stats['total']
+        avg_length = stats['avg_length'] or 1
+        scores = defaultdict(float)
+        for term, docs in postings.items():
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, frequency in docs:
+                norm = self.k1 * (1 - self.b + self.b * lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Полнотекстовый поиск PostgreSQL по полю SearchDocument.vector с GIN-индексом"""
+    start_sel = '\x02'
+    stop_sel = '\x03'
+
+    @property
+    def config(self):
+        return getattr(settings, 'BLOG_SEARCH_PG_CONFIG', 'russian')
+
+    def index_post(self, post):
+        if not post.is_published:
+            self.remove_post(post.pk)
+            return
+        title, tags, body = self.get_document(post)
+        with transaction.atomic():
+            SearchDocument.objects.update_or_create(
+                post=post, defaults={'text': f'{title}. {body}', 'length': len(tokenize(body))}
+            )
+            vector = (
+                SearchVector(Value(title, output_field=TextField()), weight='A', config=self.config)
+                + SearchVector(Value(tags, output_field=TextField()), weight='B', config=self.config)
+                + SearchVector(Value(body, output_field=TextField()), weight='C', config=self.config)
+            )
+            SearchDocument.objects.filter(pk=post.pk).update(vector=vector)
+
+    def get_query(self, query):
+        return SearchQuery(query, config=self.config)
+
+    def search(self, query, limit=None):
+        if not tokenize(query):
+            return []
+        search_query = self.get_query(query)
+        return list(
+            SearchDocument.objects.filter(vector=search_query)
+            .annotate(rank=SearchRank(F('vector'), search_query))
+            .order_by('-rank', '-post_id')
+            .values_list('post_id', 'rank')[:limit]
+        )
+
+    def snippets(self, post_ids, query):
+        headlines = SearchDocument.objects.filter(pk__in=post_ids).annotate(
+            headline=SearchHeadline('text', self.get_query(query), config=self.config,
+                                    start_sel=self.start_sel, stop_sel=self.stop_sel, max_words=30)
+        ).values_list('pk', 'headline')
+        # текст документа не HTML, поэтому экранируется, а маркеры меняются на <mark> уже после
+        return {
+            pk: escape(headline).replace(self.start_sel, '<mark>').replace(self.stop_sel, '</mark>')
+            for pk, headline in headlines
+        }
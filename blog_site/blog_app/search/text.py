@@ -0,0 +1,76 @@
+"""Подготовка текста постов и запросов для поиска"""
+import html
+import re
+import unicodedata
+
+from django.utils.html import escape, strip_tags
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+MAX_TERM_LENGTH = 100
+
+# слова, не влияющие на результаты поиска, убираются из запроса перед кешированием результатов
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'в', 'во', 'да', 'для', 'до', 'же', 'за', 'и', 'из', 'или', 'к', 'как', 'ко', 'ли', 'на',
+    'над', 'не', 'ни', 'но', 'о', 'об', 'от', 'по', 'под', 'при', 'про', 'с', 'со', 'то', 'у', 'что', 'это',
+    'a', 'an', 'and', 'are', 'as', 'at', 'by', 'for', 'in', 'is', 'of', 'on', 'or', 'the', 'to', 'with',
+))
+
+
+def html_to_text(value):
+    """Перевод HTML из CKEditor в простой текст"""
+    text = html.unescape(strip_tags(value or ''))
+    return ' '.join(text.split())
+
+
+def normalize_term(word):
+    """Приведение слова к виду, в котором оно хранится в индексе"""
+    return word.lower().replace('ё', 'е')[:MAX_TERM_LENGTH]
+
+
+def tokenize(text):
+    """Разбиение текста на термы"""
+    return [normalize_term(word) for word in TOKEN_RE.findall(text or '')]
+
+
+def normalize_query(query):
+    """
+    Запрос в каноническом виде: Unicode NFKC, термы в нижнем регистре без стоп-слов, без повторов, по алфавиту.
+    Бэкенды не учитывают порядок слов, поэтому "Django  tips" и "tips django" - один и тот же запрос.
+    Если запрос состоит только из стоп-слов, они остаются.
+    """
+    terms = tokenize(unicodedata.normalize('NFKC', query or ''))
+    return ' '.join(sorted(set(term for term in terms if term not in STOP_WORDS) or set(terms)))
+
+
+def make_snippet(text, terms, words=30):
+    """
+    Сниппет для результата поиска: окно из words слов вокруг первого найденного терма,
+    найденные термы обернуты в <mark>. Возвращает экранированный HTML.
+    """
+    tokens = text.split()
+    if not tokens:
+        return ''
+    terms = set(terms)
+    start = 0
+    for num, token in enumerate(tokens):
+        if any(normalize_term(word) in terms for word in TOKEN_RE.findall(token)):
+            start = max(num - words // 3, 0)
+            break
+    window = tokens[start:start + words]
+
+    def highlight(token):
+        parts, last = [], 0
+        for match in TOKEN_RE.finditer(token):
+            parts.append(escape(token[last:match.start()]))
+            word = escape(match.group())
+            parts.append(f'<mark>{word}</mark>' if normalize_term(match.group()) in terms else word)
+            last = match.end()
+        parts.append(escape(token[last:]))
+        return ''.join(parts)
+
+    snippet = ' '.join(highlight(token) for token in window)
+    if start > 0:
+        snippet = '... ' + snippet
+    if start + words < len(tokens):
+        snippet += ' ...'
+    return snippet
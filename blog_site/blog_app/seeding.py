@@ -0,0 +1,238 @@
+"""
+Генерация больших синтетических наборов данных для воспроизведения проблем масштабирования.
+
+Объекты создаются через bulk_create пачками, без сигналов: pk назначаются заранее (продолжая существующие),
+поэтому связи пост-тег и комментарии строятся без перечитывания созданных объектов.
+Каждая пачка генерируется своим random.Random от (seed, вид объектов, номер пачки),
+поэтому результат не зависит от кол-ва процессов, в которых генерируется контент.
+После генерации пересчитываются счетчики и обновляются версии кеша.
+Используется командой "manage.py seed_blog".
+"""
+import random
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from blog_app import caching
+from blog_app.denormalized import recount
+from blog_app.models import Categories, Comments, Posts, Tags
+from blog_app.rendering import render_comment, render_post
+
+WORDS = (
+    'блог база данных запрос индекс кеш сервер страница пост тег категория автор комментарий просмотр '
+    'скорость нагрузка память процессор диск сеть задержка ответ пользователь система модель шаблон '
+    'поиск текст заголовок список таблица поле значение ключ версия сборка тест профиль метрика график '
+    'django python postgres redis nginx docker очередь задача поток процесс транзакция блокировка реплика '
+    'быстрый медленный большой маленький новый старый простой сложный важный полезный удобный надежный '
+    'делать искать читать писать хранить считать строить проверять запускать оптимизировать кешировать '
+    'сегодня вчера всегда иногда часто редко потом сначала снова очень почти только уже еще также'
+).split()
+SEED_PASSWORD = 'seed_password'
+
+
+def _task_random(seed, kind, index):
+    return random.Random(f'{seed}:{kind}:{index}')
+
+
+def _sentence(rng, min_words=6, max_words=16):
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return ' '.join(words).capitalize() + '.'
+
+
+def _paragraph(rng):
+    sentences = [_sentence(rng) for _ in range(rng.randint(2, 7))]
+    if rng.random() < 0.3:
+        index = rng.randrange(len(sentences))
+        sentences[index] = f'<strong>{sentences[index]}</strong>'
+    if rng.random() < 0.15:
+        sentences.append(f'<a href="https://example.com/{rng.choice(WORDS)}/">{rng.choice(WORDS)}</a>.')
+    return '<p>' + ' '.join(sentences) + '</p>'
+
+
+def make_content(rng, paragraphs=(3, 12)):
+    """HTML поста похожий на вывод CKEditor: абзацы, подзаголовки, списки"""
+    parts = []
+    for num in range(rng.randint(*paragraphs)):
+        if num and rng.random() < 0.2:
+            parts.append(f'<h2>{_sentence(rng, 2, 5)[:-1]}</h2>')
+        if rng.random() < 0.1:
+            items = ''.join(f'<li>{_sentence(rng, 2, 6)}</li>' for _ in range(rng.randint(2, 5)))
+            parts.append(f'<ul>{items}</ul>')
+        parts.append(_paragraph(rng))
+    return '\n'.join(parts)
+
+
+def skewed_views(rng):
+    """Просмотры с распределением Парето: большинство постов почти не читают, единицы - очень популярны"""
+    return min(int(rng.paretovariate(1.2) * 10) - 10, 10 ** 7)
+
+
+def _created_at(rng, offset, total, start, span):
+    """Дата создания растет вместе с pk (как в реальном блоге) с небольшим разбросом"""
+    seconds = span * (offset + rng.random()) / max(total, 1)
+    return start + timedelta(seconds=seconds)
+
+
+def generate_posts(task):
+    """Поля постов пачки (с подготовленным HTML и выдержками) и их связи с тегами"""
+    seed, index, first_pk, count, options = task
+    rng = _task_random(seed, 'posts', index)
+    posts, links = [], []
+    for pk in range(first_pk, first_pk + count):
+        post = Posts(
+            pk=pk,
+            title=_sentence(rng, 3, 8)[:-1][:255],
+            slug=f'seed-post-{pk}',
+            author_id=rng.choice(options['user_ids']),
+            content=make_content(rng),
+            category_id=rng.choice(options['category_ids']),
+            is_published=rng.random() < options['published_ratio'],
+            on_main=rng.random() < 0.001,
+            views=skewed_views(rng),
+            created_at=_created_at(rng, pk - options['first_post_pk'], options['posts'], options['start'],
+                                   options['span']),
+        )
+        post.updated_at = post.created_at
+        render_post(post)
+        row = {field.attname: getattr(post, field.attname) for field in Posts._meta.concrete_fields}
+        row['photo'] = ''
+        posts.append(row)
+        tags_count = min(rng.randint(0, options['tags_per_post'] * 2), len(options['tag_ids']))
+        # популярные теги встречаются чаще (первые по списку)
+        tag_ids = {options['tag_ids'][int(len(options['tag_ids']) * rng.random() ** 2)] for _ in range(tags_count)}
+        links.extend((pk, tag_id) for tag_id in sorted(tag_ids))
+    return posts, links
+
+
+def generate_comments(task):
+    """Поля комментариев пачки: больше комментариев получают посты из начала диапазона"""
+    seed, index, count, options = task
+    rng = _task_random(seed, 'comments', index)
+    first_pk, posts = options['first_post_pk'], options['posts']
+    comments = []
+    for _ in range(count):
+        offset = int(posts * rng.random() ** 3)
+        comment = Comments(
+            post_id=first_pk + offset,
+            author_id=rng.choice(options['user_ids']),
+            content=' '.join(_sentence(rng) for _ in range(rng.randint(1, 4))),
+            created_at=_created_at(rng, offset, posts, options['start'], options['span'])
+            + timedelta(hours=rng.randint(0, 24 * 30)),
+        )
+        render_comment(comment)
+        comments.append({field.attname: getattr(comment, field.attname)
+                         for field in Comments._meta.concrete_fields if field.attname != 'id'})
+    return comments
+
+
+def _batches(total, batch_size):
+    for index, start in enumerate(range(0, total, batch_size)):
+        yield index, start, min(batch_size, total - start)
+
+
+def _run(func, tasks, workers):
+    """Результаты func по задачам в исходном порядке, в пуле процессов не более 2 * workers задач одновременно"""
+    if not workers:
+        yield from map(func, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+        pending = []
+        for task in tasks:
+            pending.append(executor.submit(func, task))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def _next_pk(model):
+    return (model.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0) + 1
+
+
+@contextmanager
+def explicit_dates(*models):
+    """Отключение auto_now/auto_now_add, чтобы bulk_create сохранял сгенерированные даты"""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def seed(users=20, categories=10, tags=50, posts=1000, comments=10000, tags_per_post=3, published_ratio=0.9,
+         days=3 * 365, seed_value=0, batch_size=2000, workers=0, log=None):
+    """Создание набора данных, возвращает кол-во созданных объектов по моделям"""
+    log = log or (lambda message: None)
+    rng = _task_random(seed_value, 'base', 0)
+    first_user_pk = _next_pk(User)
+    password = make_password(SEED_PASSWORD)
+    User.objects.bulk_create(
+        (User(pk=pk, username=f'seed_user_{pk}', password=password)
+         for pk in range(first_user_pk, first_user_pk + users)),
+        batch_size=batch_size,
+    )
+    first_category_pk = _next_pk(Categories)
+    Categories.objects.bulk_create(
+        Categories(pk=pk, title=_sentence(rng, 1, 2)[:-1], slug=f'seed-category-{pk}')
+        for pk in range(first_category_pk, first_category_pk + categories)
+    )
+    first_tag_pk = _next_pk(Tags)
+    Tags.objects.bulk_create(
+        (Tags(pk=pk, title=rng.choice(WORDS)[:50], slug=f'seed-tag-{pk}')
+         for pk in range(first_tag_pk, first_tag_pk + tags)),
+        batch_size=batch_size,
+    )
+    log(f'Пользователей: {users}, категорий: {categories}, тегов: {tags}')
+    end = timezone.now()
+    options = {
+        'user_ids': list(range(first_user_pk, first_user_pk + users)),
+        'category_ids': list(range(first_category_pk, first_category_pk + categories)),
+        'tag_ids': list(range(first_tag_pk, first_tag_pk + tags)),
+        'first_post_pk': _next_pk(Posts),
+        'posts': posts,
+        'tags_per_post': tags_per_post,
+        'published_ratio': published_ratio,
+        'start': end - timedelta(days=days),
+        'span': timedelta(days=days).total_seconds(),
+    }
+    PostTags = Posts.tags.through
+    with explicit_dates(Posts, Comments):
+        tasks = ((seed_value, index, options['first_post_pk'] + start, count, options)
+                 for index, start, count in _batches(posts, batch_size))
+        created = 0
+        for rows, links in _run(generate_posts, tasks, workers):
+            with transaction.atomic():
+                Posts.objects.bulk_create([Posts(**row) for row in rows])
+                PostTags.objects.bulk_create(
+                    [PostTags(posts_id=post_id, tags_id=tag_id) for post_id, tag_id in links]
+                )
+            created += len(rows)
+            log(f'Постов: {created} из {posts}')
+        tasks = ((seed_value, index, count, options)
+                 for index, _, count in _batches(comments if posts else 0, batch_size))
+        created = 0
+        for rows in _run(generate_comments, tasks, workers):
+            Comments.objects.bulk_create([Comments(**row) for row in rows])
+            created += len(rows)
+            log(f'Комментариев: {created} из {comments}')
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [User, Categories, Tags, Posts, Comments]):
+            cursor.execute(sql)
+    recount()
+    caching.bump('Posts', 'Posts(is_published)', 'Categories', 'Tags', 'Comments')
+    return {'users': users, 'categories': categories, 'tags': tags, 'posts': posts,
+            'comments': comments if posts else 0}
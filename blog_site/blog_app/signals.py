@@ -0,0 +1,137 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from blog_app import autocomplete, caching, denormalized, images, related, rendering, search
+from blog_app.models import Categories, Comments, Posts, Tags
+
+
+def bump_post_versions(post, was_published=False, old_slug=None):
+    """
+    Устаревание кеша, зависящего от постов, от самого поста (в т.ч. по прежнему slug),
+    и от опубликованных постов, если пост был или стал опубликован
+    """
+    deps = ['Posts', f'Post:{post.slug}']
+    if old_slug and old_slug != post.slug:
+        deps.append(f'Post:{old_slug}')
+    if post.is_published or was_published:
+        deps.append('Posts(is_published)')
+    caching.bump(*deps)
+
+
+@receiver(pre_save, sender=Posts)
+def render_post_on_save(sender, instance, raw, **kwargs):
+    """
+    Подготовка HTML и выдержек поста, сохранение его предыдущего состояния для пересчета счетчиков
+    и сброс копий замененного фото
+    """
+    if not raw:
+        rendering.render_post(instance)
+        denormalized.remember_post_state(instance)
+        images.reset_stale_variants(instance)
+
+
+@receiver(post_save, sender=Posts)
+def index_post_on_save(sender, instance, created, raw, **kwargs):
+    """Обновление счетчиков, поискового индекса и версий кеша при сохранении поста, создание копий нового фото"""
+    if raw:
+        return
+    old_state = getattr(instance, '_counters_state', None) or {}
+    denormalized.post_saved(instance, created)
+    search.index_post(instance)
+    bump_post_versions(instance, old_state.get('is_published', False), old_state.get('slug'))
+    autocomplete.post_changed(instance)
+    if (instance.is_published, instance.category_id) != (old_state.get('is_published', False),
+                                                         old_state.get('category_id', instance.category_id)):
+        related.update_post(instance)
+    if instance.photo and getattr(instance, '_photo_changed', False):
+        images.schedule_variants(instance)
+
+
+@receiver(pre_delete, sender=Posts)
+def remember_post_tags(sender, instance, **kwargs):
+    """Сохранение тегов удаляемого поста для пересчета счетчиков"""
+    denormalized.remember_post_tags(instance)
+
+
+@receiver(post_delete, sender=Posts)
+def remove_post_on_delete(sender, instance, **kwargs):
+    """Обновление счетчиков, удаление поста из поискового индекса и обновление версий кеша"""
+    denormalized.post_deleted(instance)
+    search.remove_post(instance.pk)
+    bump_post_versions(instance)
+    autocomplete.post_changed(instance, deleted=True)
+
+
+@receiver(m2m_changed, sender=Posts.tags.through)
+def index_post_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Обновление счетчиков тегов, переиндексация постов, пересчет их похожих постов
+    и обновление версий кеша при изменении тегов постов
+    """
+    if action in ('pre_remove', 'pre_clear'):
+        # после удаления связей уже не узнать, какие из них существовали
+        denormalized.remember_linked_tags(instance, reverse, pk_set, action)
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    denormalized.tags_changed(instance, reverse, pk_set, action)
+    caching.bump('Posts', 'Posts(is_published)', 'Tags')
+    if not reverse:
+        caching.bump(f'Post:{instance.slug}')
+        search.index_post(instance)
+        related.update_post(instance)
+        return
+    if action != 'post_add':
+        pk_set = getattr(instance, '_removed_link_ids', None)
+    if pk_set:
+        for post in Posts.objects.filter(pk__in=pk_set).prefetch_related('tags'):
+            search.index_post(post)
+            related.update_post(post)
+
+
+@receiver(post_save, sender=Tags)
+def index_posts_on_tag_save(sender, instance, created, **kwargs):
+    """Обновление версии кеша тегов, автодополнения и переиндексация постов при переименовании тега"""
+    caching.bump('Tags')
+    autocomplete.tag_changed(instance)
+    if created:
+        return
+    for post in instance.posts.filter(is_published=True).prefetch_related('tags'):
+        search.index_post(post)
+
+
+@receiver(post_delete, sender=Tags)
+def bump_version_on_tag_delete(sender, instance, **kwargs):
+    """Обновление версии кеша тегов и автодополнения при удалении тега"""
+    caching.bump('Tags')
+    autocomplete.tag_changed(instance, deleted=True)
+
+
+@receiver(post_save, sender=Categories)
+@receiver(post_delete, sender=Categories)
+def bump_version_on_category_change(sender, instance, signal, **kwargs):
+    """Обновление версии кеша категорий и автодополнения"""
+    caching.bump('Categories')
+    autocomplete.category_changed(instance, deleted=signal is post_delete)
+
+
+@receiver(pre_save, sender=Comments)
+def render_comment_on_save(sender, instance, raw, **kwargs):
+    """Подготовка очищенного HTML комментария"""
+    if not raw:
+        rendering.render_comment(instance)
+
+
+@receiver(post_save, sender=Comments)
+def count_comment_on_save(sender, instance, created, raw, **kwargs):
+    """Увеличение счетчика комментариев поста и обновление версии кеша комментариев"""
+    if created and not raw:
+        denormalized.comment_added(instance)
+    caching.bump('Comments', f'Post:{instance.post.slug}')
+
+
+@receiver(post_delete, sender=Comments)
+def count_comment_on_delete(sender, instance, **kwargs):
+    """Уменьшение счетчика комментариев поста и обновление версии кеша комментариев"""
+    denormalized.comment_deleted(instance)
+    caching.bump('Comments', f'Post:{instance.post.slug}')
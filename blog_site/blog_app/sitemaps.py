@@ -0,0 +1,97 @@
+"""
+Карта сайта: индекс со ссылками на разделы (посты, категории, теги), каждый раздел разбит на части по
+BLOG_SITEMAP_CHUNK адресов, поэтому большой архив отдается частями, а не одним огромным запросом и ответом.
+Части выбираются по pk (WHERE pk >= начало части), без OFFSET: начала частей раздела вычисляются одним
+проходом по pk и кешируются до изменения зависимостей (KeysetSitemapPaginator),
+сами части кешируются как страницы (urls.py).
+"""
+from django.conf import settings
+from django.contrib.sitemaps import Sitemap
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+from blog_app.caching import get_timeout, make_key
+from blog_app.metrics import record_cache
+from blog_app.models import Categories, Posts, Tags
+
+SITEMAP_DEPS = ('Posts(is_published)', 'Categories', 'Tags')
+
+
+class KeysetSitemapPaginator(Paginator):
+    """
+    Пагинатор раздела карты сайта по pk: хранит в кеше (под ключом chunks_key) pk первых объектов частей,
+    часть N - это per_page объектов, начиная с N-го из них. object_list должен быть упорядочен по pk
+    """
+
+    def __init__(self, *args, chunks_key=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chunks_key = chunks_key
+
+    @cached_property
+    def chunk_starts(self):
+        key = make_key('sitemap-chunks', SITEMAP_DEPS, self.chunks_key)
+        starts = cache.get(key)
+        record_cache('sitemap-chunks', starts is not None)
+        if starts is None:
+            # выбираются только pk, каждый per_page-й - начало части
+            pks = self.object_list.values_list('pk', flat=True).iterator()
+            starts = [pk for index, pk in enumerate(pks) if index % self.per_page == 0]
+            cache.set(key, starts, get_timeout())
+        return starts
+
+    @cached_property
+    def num_pages(self):
+        if not self.chunk_starts and not self.allow_empty_first_page:
+            return 0
+        return max(len(self.chunk_starts), 1)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        object_list = self.object_list.none()
+        if self.chunk_starts:
+            object_list = self.object_list.filter(pk__gte=self.chunk_starts[number - 1])[:self.per_page]
+        return self._get_page(object_list, number, self)
+
+
+class ChunkedSitemap(Sitemap):
+    """Раздел карты сайта, разбитый на части по pk"""
+    name = None
+
+    @property
+    def limit(self):
+        return getattr(settings, 'BLOG_SITEMAP_CHUNK', 5000)
+
+    @property
+    def paginator(self):
+        return KeysetSitemapPaginator(self.items(), self.limit, chunks_key=self.name)
+
+
+class PostsSitemap(ChunkedSitemap):
+    name = 'posts'
+    changefreq = 'weekly'
+
+    def items(self):
+        return Posts.objects.filter(is_published=True).only('slug', 'updated_at').order_by('pk')
+
+    def lastmod(self, item):
+        return item.updated_at
+
+
+class CategoriesSitemap(ChunkedSitemap):
+    name = 'categories'
+    changefreq = 'daily'
+
+    def items(self):
+        return Categories.objects.filter(posts_count__gt=0).only('slug').order_by('pk')
+
+
+class TagsSitemap(ChunkedSitemap):
+    name = 'tags'
+    changefreq = 'daily'
+
+    def items(self):
+        return Tags.objects.filter(posts_count__gt=0).only('slug').order_by('pk')
+
+
+SITEMAPS = {sitemap.name: sitemap for sitemap in (PostsSitemap, CategoriesSitemap, TagsSitemap)}
@@ -0,0 +1,71 @@
+"""
+Снимок данных сайдбара: последние посты, популярные сейчас (blog_app.trending) и за все время посты
+и популярность тегов.
+
+Снимок хранится в кеше целиком, поэтому вывод сайдбара - одно чтение из кеша без SQL.
+Ключ снимка зависит от версий опубликованных постов и тегов (blog_app.caching), поэтому при их изменении
+снимок пересобирается при следующем выводе, а для учета новых просмотров периодически пересобирается
+командой "manage.py refresh_sidebar" (и после сброса просмотров командой flush_views).
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from blog_app.caching import get_timeout, make_key
+from blog_app.metrics import record_cache
+from blog_app.models import POSTS_LIST_DEFERRED, Posts, Tags
+from blog_app.trending import get_trending_ids
+
+SIDEBAR_DEPS = ('Posts(is_published)', 'Tags')
+
+
+def get_sidebar_size():
+    """Сколько постов каждого списка хранится в снимке"""
+    return getattr(settings, 'BLOG_SIDEBAR_SIZE', 10)
+
+
+def _post_item(post):
+    return {
+        'title': post.title,
+        'url': post.get_absolute_url(),
+        'photo': post.photo.name,
+        'photo_variants': post.photo_variants,
+        'photo_placeholder': post.photo_placeholder,
+        'author': str(post.author),
+        'created_at': post.created_at,
+    }
+
+
+def build_sidebar_snapshot():
+    """Сборка снимка сайдбара (4 простых запроса к БД, популярные сейчас посты берутся из кеша по pk)"""
+    size = get_sidebar_size()
+    published = Posts.objects.filter(is_published=True).select_related('author').defer(
+        *POSTS_LIST_DEFERRED, 'excerpt'
+    )
+    recent = published.order_by('-created_at')[:size]
+    popular = published.order_by('-views')[:size]
+    trending_ids = get_trending_ids(size)
+    trending = published.in_bulk(trending_ids) if trending_ids else {}
+    tags = Tags.objects.order_by('-views_total')
+    return {
+        'recent': [_post_item(post) for post in recent],
+        'popular': [_post_item(post) for post in popular],
+        'trending': [_post_item(trending[pk]) for pk in trending_ids if pk in trending],
+        'tags': [{'title': tag.title, 'url': tag.get_absolute_url(), 'score': tag.views_total} for tag in tags],
+    }
+
+
+def refresh_sidebar_snapshot():
+    """Пересборка снимка сайдбара и сохранение его в кеш"""
+    snapshot = build_sidebar_snapshot()
+    cache.set(make_key('sidebar', SIDEBAR_DEPS), snapshot, get_timeout())
+    return snapshot
+
+
+def get_sidebar_snapshot():
+    """Снимок сайдбара из кеша, при отсутствии собирается заново"""
+    snapshot = cache.get(make_key('sidebar', SIDEBAR_DEPS))
+    record_cache('sidebar', snapshot is not None)
+    if snapshot is None:
+        snapshot = refresh_sidebar_snapshot()
+    return snapshot
+
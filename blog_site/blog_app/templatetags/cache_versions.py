@@ -0,0 +1,17 @@
+from django import template
+
+from blog_app.caching import get_versions
+
+register = template.Library()
+
+
+@register.simple_tag
+def cache_version(*deps):
+    """
+    Кастомный тег для получения версии зависимостей фрагмента,
+    используется как vary_on во встроенном теге cache:
+    {% cache_version 'Categories' 'Posts(is_published)' as version %}
+    {% cache 21600 footer version %}...{% endcache %}
+    :param deps: модели, от которых зависит фрагмент
+    """
+    return get_versions(*deps)
@@ -0,0 +1,14 @@
+from django import template
+
+from blog_app.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, snippets=False):
+    """
+    Кастомный тег для вывода карточек постов списка, карточки берутся из кеша (blog_app.cards).
+    :param snippets: выводить сниппеты поиска вместо выдержек
+    """
+    return render_cards(posts, snippets)
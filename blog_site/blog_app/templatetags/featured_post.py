@@ -1,13 +1,23 @@
 from django import template
 
+from blog_app.caching import cached
 from blog_app.models import Posts
 
 register = template.Library()
 
 
-@register.inclusion_tag('blog_app/featured_post_tpl.html')
-def get_main_posts():
-    """Кастомный тег для вывода закрепелнных и опубликованных постов на главной странице"""
-    main_posts = Posts.objects.filter(is_published=True, on_main=True).select_related('author')
-    return {'main_posts': main_posts}
+@cached('main_posts', deps=('Posts(is_published)',))
+def get_main_posts_list():
+    """Закрепленные опубликованные посты, кешируются до изменения опубликованных постов"""
+    return list(Posts.objects.filter(is_published=True, on_main=True).select_related('author').defer(
+        'content', 'content_html', 'excerpt'
+    ))
 
+
+@register.inclusion_tag('blog_app/featured_post_tpl.html', takes_context=True)
+def get_main_posts(context):
+    """
+    Кастомный тег для вывода закрепелнных и опубликованных постов на главной странице.
+    Посты берутся из контекста, если их заранее загрузило асинхронное представление (blog_app.async_views)
+    """
+    return {'main_posts': context['main_posts'] if 'main_posts' in context else get_main_posts_list()}
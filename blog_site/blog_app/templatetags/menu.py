@@ -1,17 +1,24 @@
 from django import template
+
+from blog_app.caching import cached
 from blog_app.models import *
-from django.db.models import *
 
 register = template.Library()
 
 
-@register.inclusion_tag('blog_app/menu_tpl.html')
-def show_menu(menu_class='menu', request=None):
+@cached('menu', deps=('Categories', 'Posts(is_published)'))
+def get_menu_categories():
+    """Категории с опубликованными постами, кешируются до изменения категорий или постов"""
+    return list(Categories.objects.filter(posts_count__gt=0))
+
+
+@register.inclusion_tag('blog_app/menu_tpl.html', takes_context=True)
+def show_menu(context, menu_class='menu', request=None):
     """
-    Кастомный тег для вывода футера и хедера
+    Кастомный тег для вывода футера и хедера.
+    Категории берутся из контекста, если их заранее загрузило асинхронное представление (blog_app.async_views)
     :param menu_class: аргумент, определяющий класс меню тега "div" в шаблоне
     :param request: для передачи данных о запросе пользователя
     """
-    categories = Categories.objects.annotate(cnt=Count('posts')).filter(cnt__gt=0)
+    categories = context['menu_categories'] if 'menu_categories' in context else get_menu_categories()
     return {'categories': categories, 'menu_class': menu_class, 'request': request}
-
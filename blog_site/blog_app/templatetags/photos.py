@@ -0,0 +1,11 @@
+from django import template
+
+from blog_app.images import photo_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def photo(obj, usage, **attrs):
+    """Кастомный тег для вывода фото поста с srcset уменьшенных копий под место вывода (card, sidebar, ...)"""
+    return photo_html(obj, usage, **attrs)
@@ -1,24 +1,26 @@
 from django import template
-from django.db.models import Count, Sum
 
-from blog_app.models import Posts, Tags
+from blog_app.snapshots import get_sidebar_snapshot
 
 register = template.Library()
 
 
-@register.inclusion_tag('blog_app/sidebar_tpl.html')
-def get_sidebar_data(cnt=3):
+def get_sidebar_data(cnt=3, snapshot=None):
     """
-    Кастомный тег для вывода последних постов,
-    популярных постов и тегов(в порядке популярности) на сайдбар
+    Данные сайдбара: последние посты, популярные посты и теги (в порядке популярности).
+    Выводятся тегом {% get_sidebar_data %} (sidebar_tag), который передает сюда снимок из контекста.
+    Популярные - популярные сейчас посты (blog_app.trending), пока их нет - популярные за все время.
+    Данные берутся из снимка сайдбара в кеше (blog_app.snapshots).
     :param cnt: кол-во выводимых постов
+    :param snapshot: снимок, заранее загруженный асинхронным представлением (blog_app.async_views)
     """
-    recent = Posts.objects.filter(is_published=True).order_by('-created_at')[:cnt].select_related('author')
-    popular = Posts.objects.filter(is_published=True).order_by('-views')[:cnt].select_related('author')
-    tags = Tags.objects.annotate(sum=Sum('posts__views')).order_by('-sum')
-    return {'recent': recent, 'popular': popular, 'tags': tags}
-
-
-
+    if snapshot is None:
+        snapshot = get_sidebar_snapshot()
+    popular = snapshot['trending'] or snapshot['popular']
+    return {'recent': snapshot['recent'][:cnt], 'popular': popular[:cnt], 'tags': snapshot['tags']}
 
 
+@register.inclusion_tag('blog_app/sidebar_tpl.html', takes_context=True, name='get_sidebar_data')
+def sidebar_tag(context, cnt=3):
+    """{% get_sidebar_data %}: снимок берется из контекста, если его загрузило асинхронное представление"""
+    return get_sidebar_data(cnt, context.get('sidebar_snapshot'))
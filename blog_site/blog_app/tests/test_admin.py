@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from blog_app.models import *
+from blog_app.pagination import EstimatedCountPaginator, estimate_count
+
+
+class LargeTableAdminTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='admin', password='admin_password')
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        cls.tag = Tags.objects.create(title='Test tag', slug='test-tag')
+        for num in range(3):
+            post = Posts.objects.create(title=f'Test post {num}', slug=f'test-post-{num}', author=cls.user,
+                                        category=cls.category, is_published=True)
+            Comments.objects.create(post=post, content=f'Test comment {num}', author=cls.user)
+        post.tags.add(cls.tag)
+        cls.post = post
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def titles(self, response):
+        return sorted(str(obj) for obj in response.context['cl'].result_list)
+
+    def test_changelists_without_n_plus_one(self):
+        for name in ('admin:blog_app_posts_changelist', 'admin:blog_app_comments_changelist'):
+            url = reverse(name)
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEquals(response.status_code, 200)
+            Posts.objects.create(title='Extra post', slug=f'extra-{name}', author=self.admin, category=self.category)
+            Comments.objects.create(post=self.post, content='Extra comment', author=self.admin)
+            with self.assertNumQueries(len(context.captured_queries)):
+                self.client.get(url)
+
+    def test_index_friendly_search(self):
+        url = reverse('admin:blog_app_posts_changelist')
+        self.assertEquals(self.titles(self.client.get(url, {'q': 'Test post'})),
+                          ['Test post 0', 'Test post 1', 'Test post 2'])
+        self.assertEquals(self.titles(self.client.get(url, {'q': 'test-post-1'})), ['Test post 1'])
+        self.assertEquals(self.titles(self.client.get(url, {'q': str(self.post.pk)})), ['Test post 2'])
+        self.assertEquals(self.titles(self.client.get(url, {'q': '9' * 30})), [])
+        self.assertEquals(self.titles(self.client.get(url, {'q': 'post'})), [])
+        response = self.client.get(reverse('admin:blog_app_comments_changelist'), {'q': 'test-post-0'})
+        self.assertEquals(self.titles(response), ['Test comment 0'])
+
+    def test_autocomplete_filters(self):
+        url = reverse('admin:blog_app_posts_changelist')
+        response = self.client.get(url)
+        self.assertContains(response, 'id="tags__id__exact-filter"')
+        self.assertContains(response, 'select2')
+        self.assertNotContains(response, '?tags__id__exact=')
+        response = self.client.get(url, {'tags__id__exact': self.tag.pk})
+        self.assertEquals(self.titles(response), ['Test post 2'])
+        self.assertContains(response, f'<option value="{self.tag.pk}" selected>Test tag</option>', html=True)
+        response = self.client.get(reverse('admin:blog_app_comments_changelist'),
+                                   {'post__id__exact': self.post.pk, 'author__id__exact': self.user.pk})
+        self.assertEquals(self.titles(response), ['Test comment 2'])
+        response = self.client.get(reverse('admin:blog_app_posts_autocomplete'), {'term': 'Test post 1'})
+        self.assertEquals([item['text'] for item in response.json()['results']], ['Test post 1'])
+
+    def test_estimated_count(self):
+        queryset = Posts.objects.all()
+        self.assertIsNone(estimate_count(queryset))
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEquals(estimate_count(queryset), 3)
+        with override_settings(BLOG_ADMIN_ESTIMATED_COUNT_THRESHOLD=2):
+            Posts.objects.create(title='Extra post', slug='extra', author=self.admin, category=self.category)
+            with self.assertNumQueries(2):  # без COUNT(*)
+                self.assertEquals(EstimatedCountPaginator(queryset, 10).count, 3)
+            self.assertEquals(EstimatedCountPaginator(queryset.filter(is_published=False), 10).count, 1)
+        self.assertEquals(EstimatedCountPaginator(queryset, 10).count, 4)
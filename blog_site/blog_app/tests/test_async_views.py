@@ -0,0 +1,140 @@
+import threading
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from blog_app.async_views import gather_data
+from blog_app.benchmark import benchmark, default_paths, views_mode
+from blog_app.models import *
+
+
+def create_posts(cls):
+    cls.user = User.objects.create_user(username='test_user', password='test_password')
+    cls.category = Categories.objects.create(title='Test category', slug='test-category')
+    cls.tag = Tags.objects.create(title='Test tag', slug='test-tag')
+    Posts.objects.create(title='Main post', slug='main-post', author=cls.user, category=cls.category,
+                         is_published=True, on_main=True)
+    for num in range(5):
+        cls.post = Posts.objects.create(title=f'Test post {num}', slug=f'test-post-{num}', author=cls.user,
+                                        content=f'Test content {num}', category=cls.category, is_published=True)
+        cls.post.tags.add(cls.tag)
+    Comments.objects.create(post=cls.post, content='Test comment content', author=cls.user)
+
+
+class AsyncViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        create_posts(cls)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, *args, **kwargs):
+        with views_mode(True):
+            return self.client.get(*args, **kwargs)
+
+    def test_pages_match_sync_views(self):
+        urls = [
+            reverse('home'), reverse('home') + '?page=2', reverse('category', kwargs={'slug': 'test-category'}),
+            reverse('tag', kwargs={'slug': 'test-tag'}), reverse('search') + '?s=Test',
+        ]
+        for url in urls:
+            cache.clear()
+            expected = self.client.get(url)
+            cache.clear()
+            response = self.get(url)
+            self.assertEquals(response.status_code, 200)
+            self.assertEquals(response.content, expected.content, url)
+
+    def test_tag_data_in_context(self):
+        response = self.get(reverse('home'))
+        self.assertEquals([c.slug for c in response.context['menu_categories']], ['test-category'])
+        self.assertEquals([p.slug for p in response.context['main_posts']], ['main-post'])
+        self.assertContains(response, 'Main post')
+        self.assertEquals(response.context['title'], 'Главная')
+        self.assertEquals(len(response.context['posts']), 4)
+
+    def test_post_page(self):
+        response = self.get(self.post.get_absolute_url())
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.context['post_item'], self.post)
+        self.assertEquals(list(response.context['comments']), list(Comments.objects.all()))
+        self.assertIn('recent', response.context['sidebar_snapshot'])
+        self.assertContains(response, 'Test comment content')
+        self.assertContains(response, 'Test tag')
+
+    def test_missing_pages(self):
+        self.assertEquals(self.get(reverse('category', kwargs={'slug': 'missing'})).status_code, 404)
+        self.assertEquals(self.get(reverse('post', kwargs={'slug': 'missing'})).status_code, 404)
+
+    def test_page_cache_hit(self):
+        etag = self.get(reverse('home'))['ETag']
+        with self.assertNumQueries(0):
+            response = self.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 304)
+
+    def test_post_comment(self):
+        self.client.login(username='test_user', password='test_password')
+        with views_mode(True):
+            response = self.client.post(self.post.get_absolute_url(), {'content': 'Async comment'})
+        self.assertRedirects(response, self.post.get_absolute_url())
+        self.assertTrue(Comments.objects.filter(content='Async comment').exists())
+
+
+class GatherDataTest(TestCase):
+
+    def test_fetchers_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        fetchers = {name: (lambda name=name: barrier.wait() is not None and name) for name in ('a', 'b', 'c')}
+        self.assertEquals(async_to_sync(gather_data)(fetchers), {'a': 'a', 'b': 'b', 'c': 'c'})
+
+    def test_inline_in_request_thread(self):
+        thread = threading.get_ident()
+        fetchers = {'cached': threading.get_ident, 'pooled': threading.get_ident}
+        result = async_to_sync(gather_data)(fetchers, inline=('cached',))
+        self.assertEquals(result['cached'], thread)
+        self.assertNotEquals(result['pooled'], thread)
+
+    def test_pool_connections_checked(self):
+        with mock.patch('blog_app.async_views.close_old_connections') as close:
+            result = async_to_sync(gather_data)({'calls': lambda: close.call_count})
+        self.assertEquals(result, {'calls': 1})
+        self.assertEquals(close.call_count, 2)
+
+    def test_sequential_in_request_thread(self):
+        thread = threading.get_ident()
+        result = async_to_sync(gather_data)({'thread': threading.get_ident}, parallel=False)
+        self.assertEquals(result, {'thread': thread})
+
+
+class ParallelAsyncViewsTest(TransactionTestCase):
+    """Без открытой транзакции данные загружаются в потоках пула, у каждого свое соединение с БД"""
+
+    def setUp(self):
+        cache.clear()
+        create_posts(self)
+
+    def test_home_and_post(self):
+        with views_mode(True):
+            response = self.client.get(reverse('home'))
+            self.assertContains(response, 'Test post 4')
+            self.assertContains(response, 'Main post')
+            response = self.client.get(self.post.get_absolute_url())
+            self.assertContains(response, 'Test comment content')
+
+    def test_benchmark(self):
+        paths = default_paths()
+        self.assertEquals(len(paths), 5)
+        for mode in ('wsgi', 'asgi'):
+            result = benchmark(mode, paths, requests=10, concurrency=3)
+            self.assertEquals((result['requests'], result['errors']), (10, 0))
+            self.assertLessEqual(result['p50'], result['p99'])
+        out = StringIO()
+        call_command('benchmark_views', reverse('home'), requests=2, concurrency=1, modes=['asgi-sync'], stdout=out)
+        self.assertIn('asgi-sync', out.getvalue())
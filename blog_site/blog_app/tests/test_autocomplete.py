@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog_app import autocomplete, caching
+from blog_app.autocomplete import Entry, PrefixIndex, suggest
+from blog_app.models import *
+
+
+class PrefixIndexTest(TestCase):
+
+    def test_add_remove_search(self):
+        index = PrefixIndex([Entry('post', 1, 'Learning Python', '/1/', 10), Entry('post', 2, 'Python', '/2/', 20)])
+        self.assertEquals([e.pk for e in index.search('pyth', 5)], [2, 1])
+        self.assertEquals([e.pk for e in index.search('learning py', 5)], [1])
+        index.add(Entry('post', 1, 'Learning Django', '/1/', 30))
+        self.assertEquals([e.pk for e in index.search('pyth', 5)], [2])
+        self.assertEquals([e.pk for e in index.search('', 5)], [1, 2])
+        index.remove('post', 2)
+        self.assertEquals(index.search('pyth', 5), [])
+        self.assertEquals(index.keys, [('django', 'post', 1), ('learning django', 'post', 1)])
+        self.assertEquals(index.ranked, [(-30, 'post', 1)])
+
+    def test_many_matches_by_rating(self):
+        entries = [Entry('post', pk, f'Python {pk}', f'/{pk}/', pk % 7) for pk in range(100)]
+        entries.append(Entry('post', 100, 'Django', '/100/', 10))
+        index = PrefixIndex(entries)
+        expected = sorted(entries[:100], key=lambda entry: (-entry.score, entry.pk))[:3]
+        self.assertEquals(index.search('py', 3), expected)  # обход записей по рейтингу
+        self.assertEquals(index.search('python 9', 3), [entries[90], entries[97], entries[96]])
+        self.assertEquals(index.search('dj', 3), [entries[100]])
+
+
+class AutocompleteTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Python category', slug='python-category')
+        cls.tag = Tags.objects.create(title='Python', slug='python')
+        for num, (title, views) in enumerate((('Python tips', 10), ('Advanced Python tricks', 50), ('Django', 5))):
+            post = Posts.objects.create(title=title, slug=f'post-{num}', author=cls.user, category=cls.category,
+                                        is_published=True, views=views)
+            post.tags.add(cls.tag)
+        Posts.objects.create(title='Python draft', slug='draft', author=cls.user, category=cls.category)
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(autocomplete, '_index', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def titles(self, query):
+        return [entry.title for entry in suggest(query)]
+
+    def test_endpoint_ranked_by_views(self):
+        Tags.objects.filter(pk=self.tag.pk).update(views_total=30)
+        response = self.client.get(reverse('autocomplete'), {'q': 'Pyth'})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.json()['results'], [
+            {'title': 'Python category', 'url': '/category/python-category/', 'type': 'category'},
+            {'title': 'Advanced Python tricks', 'url': '/post/post-1/', 'type': 'post'},
+            {'title': 'Python', 'url': '/tag/python/', 'type': 'tag'},
+            {'title': 'Python tips', 'url': '/post/post-0/', 'type': 'post'},
+        ])
+        self.assertEquals(self.titles('tri'), ['Advanced Python tricks'])
+        self.assertEquals(self.titles('p'), [])
+
+    def test_lookups_without_database(self):
+        self.titles('py')
+        with self.assertNumQueries(0):
+            for query in ('py', 'pyt', 'dj', 'missing'):
+                self.titles(query)
+
+    def test_incremental_updates(self):
+        self.titles('py')
+        index = autocomplete._index
+        post = Posts.objects.create(title='Python news', slug='news', author=self.user, category=self.category,
+                                    is_published=True, views=100)
+        with self.assertNumQueries(0):
+            self.assertEquals(self.titles('python n'), ['Python news'])
+        post.title = 'Django news'
+        post.save()
+        self.assertEquals(self.titles('news'), ['Django news'])
+        Tags.objects.create(title='Empty tag', slug='empty-tag')
+        self.assertEquals(self.titles('empty'), [])
+        self.assertIs(autocomplete._index, index)
+        post.delete()  # у категории могли не остаться постов, индекс строится заново
+        self.assertEquals(self.titles('news'), [])
+        self.assertIsNot(autocomplete._index, index)
+
+    def test_rebuilt_after_changes_elsewhere(self):
+        self.titles('py')
+        index = autocomplete._index
+        Posts.objects.filter(title='Django').update(title='Flask')
+        caching.bump('Posts(is_published)')  # изменение в другом процессе
+        with self.assertNumQueries(0):  # версии проверяются не на каждом запросе
+            self.assertEquals(self.titles('flask'), [])
+        with override_settings(BLOG_AUTOCOMPLETE_CHECK=0):
+            self.assertEquals(self.titles('flask'), ['Flask'])
+        self.assertIsNot(autocomplete._index, index)
@@ -0,0 +1,93 @@
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog_app import caching
+from blog_app.models import *
+from blog_app.templatetags.menu import get_menu_categories
+
+
+class CachingTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_changes_versions(self):
+        versions = caching.get_versions('Posts', 'Tags')
+        self.assertEquals(caching.get_versions('Posts', 'Tags'), versions)
+        caching.bump('Tags')
+        self.assertNotEquals(caching.get_versions('Posts', 'Tags'), versions)
+
+    def test_bump_without_ttl_on_file_cache(self):
+        file_cache = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                                  'LOCATION': tempfile.mkdtemp()}}
+        with override_settings(CACHES=file_cache):
+            caching.bump('Tags')
+            version = caching.get_versions('Tags')
+            caching.bump('Tags')
+            self.assertEquals(int(caching.get_versions('Tags')), int(version) + 1)
+            with mock.patch('django.core.cache.backends.filebased.time.time', return_value=time.time() + 3600):
+                self.assertEquals(int(caching.get_versions('Tags')), int(version) + 1)
+            cache.clear()
+
+    def test_cached_decorator(self):
+        calls = []
+
+        @caching.cached('test', deps=('Tags',))
+        def func(value):
+            calls.append(value)
+            return value * 2
+
+        self.assertEquals(func(2), 4)
+        self.assertEquals(func(2), 4)
+        self.assertEquals(func(3), 6)
+        self.assertEquals(calls, [2, 3])
+        caching.bump('Tags')
+        func(2)
+        self.assertEquals(calls, [2, 3, 2])
+
+
+class DependentCacheInvalidationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_menu_invalidated_on_publish(self):
+        self.assertEquals(get_menu_categories(), [])
+        with self.assertNumQueries(0):
+            get_menu_categories()
+        Posts.objects.create(title='Test post', slug='test-post', author=self.user, category=self.category,
+                             is_published=True)
+        self.assertEquals(get_menu_categories(), [self.category])
+
+    def test_menu_invalidated_on_category_change(self):
+        Posts.objects.create(title='Test post', slug='test-post', author=self.user, category=self.category,
+                             is_published=True)
+        get_menu_categories()
+        Categories.objects.filter(pk=self.category.pk).update(title='Renamed')
+        self.assertEquals(get_menu_categories()[0].title, 'Test category')
+        category = Categories.objects.get(pk=self.category.pk)
+        category.save()
+        self.assertEquals(get_menu_categories()[0].title, 'Renamed')
+
+    def test_unpublished_post_keeps_published_version(self):
+        versions = caching.get_versions('Posts(is_published)')
+        Posts.objects.create(title='Draft', slug='draft', author=self.user, category=self.category)
+        self.assertEquals(caching.get_versions('Posts(is_published)'), versions)
+
+    def test_footer_fragment_invalidated(self):
+        response = self.client.get(reverse('home'))
+        self.assertNotContains(response, 'Test category')
+        Posts.objects.create(title='Test post', slug='test-post', author=self.user, category=self.category,
+                             is_published=True)
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Test category', count=2)
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.test import TestCase, override_settings
+
+from blog_app.cards import card_key, render_cards
+from blog_app.models import *
+
+
+@override_settings(BLOG_PAGE_CACHE_ENABLED=False)
+class CardsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        for num in range(3):
+            cls.post = Posts.objects.create(title=f'Test post {num}', slug=f'test-post-{num}', author=cls.user,
+                                            content=f'<p>Test content {num}</p>', category=cls.category,
+                                            is_published=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_posts(self):
+        return list(Posts.objects.select_related('author').order_by('pk'))
+
+    def render(self, posts, **kwargs):
+        with mock.patch('blog_app.cards.get_template', wraps=get_template) as loader, \
+                mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many:
+            html = render_cards(posts, **kwargs)
+        self.assertEquals(get_many.call_count, 1)
+        return html, loader.call_count
+
+    def test_cards_cached(self):
+        html, rendered = self.render(self.get_posts())
+        self.assertEquals(rendered, 1)
+        self.assertEquals(html.count('class="single-post"'), 3)
+        self.assertIn('Test content 2', html)
+        self.assertEquals(self.render(self.get_posts()), (html, 0))
+
+    def test_card_changes_with_post(self):
+        html, _ = self.render(self.get_posts())
+        Comments.objects.create(post=self.post, content='Test comment', author=self.user)
+        posts = self.get_posts()
+        self.assertNotEqual(card_key(posts[-1]), card_key(self.post))
+        self.assertIn('Комментарии: 1', self.render(posts)[0])
+        post = Posts.objects.get(pk=self.post.pk)
+        post.title = 'Edited post'
+        post.save()
+        self.assertIn('Edited post', self.render(self.get_posts())[0])
+        post.photo_variants = {'hash': 'abc'}
+        self.assertNotEqual(card_key(post), card_key(Posts.objects.get(pk=post.pk)))
+
+    def test_search_snippets(self):
+        posts = self.get_posts()
+        for post in posts:
+            post.snippet = f'<b>match</b> {post.pk}'
+        html, _ = self.render(posts, snippets=True)
+        self.assertIn(f'<p><b>match</b> {posts[0].pk}</p>', html)
+        self.assertNotIn('Test content', html)
+        posts[0].snippet = 'other query'
+        html, rendered = self.render(posts, snippets=True)
+        self.assertIn('<p>other query</p>', html)
+        self.assertEquals(rendered, 1)
+
+    def test_list_pages(self):
+        self.client.get(reverse('home'))
+        with mock.patch('blog_app.cards.get_template', wraps=get_template) as loader:
+            response = self.client.get(reverse('home'))
+            self.assertContains(response, 'Test post 2')
+            response = self.client.get(reverse('category', kwargs={'slug': 'test-category'}))
+            self.assertContains(response, 'Test post 0')
+        self.assertEquals(loader.call_count, 0)
+        response = self.client.get(reverse('search') + '?s=missing')
+        self.assertContains(response, 'Поиск не дал результатов')
@@ -0,0 +1,52 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog_app.models import *
+
+
+@override_settings(BLOG_COMMENTS_PER_PAGE=3)
+class CommentsPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        cls.post = Posts.objects.create(title='Test post', slug='test-post', author=cls.user,
+                                        category=cls.category, is_published=True)
+        for num in range(7):
+            Comments.objects.create(post=cls.post, content=f'Comment {num}', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_inline(self):
+        response = self.client.get(reverse('post', kwargs={'slug': self.post.slug}))
+        self.assertEquals([c.content for c in response.context['comments']], ['Comment 6', 'Comment 5', 'Comment 4'])
+        self.assertContains(response, 'Комментарии (7)')
+        self.assertContains(response, 'comments-more')
+
+    def test_next_pages_endpoint(self):
+        page = self.client.get(reverse('post', kwargs={'slug': self.post.slug})).context['comments_page']
+        contents = []
+        while page.has_next():
+            url = reverse('post_comments', kwargs={'slug': self.post.slug}) + f'?after={page.next_cursor}'
+            response = self.client.get(url)
+            self.assertEquals(response.status_code, 200)
+            page = response.context['comments_page']
+            contents += [c.content for c in page]
+        self.assertEquals(contents, ['Comment 3', 'Comment 2', 'Comment 1', 'Comment 0'])
+
+    def test_endpoint_uses_one_query(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse('post_comments', kwargs={'slug': self.post.slug}))
+
+    def test_endpoint_invalidated_on_new_comment(self):
+        url = reverse('post_comments', kwargs={'slug': self.post.slug})
+        self.client.get(url)
+        Comments.objects.create(post=self.post, content='New comment', author=self.user)
+        self.assertContains(self.client.get(url), 'New comment')
+
+    def test_bad_cursor(self):
+        response = self.client.get(reverse('post_comments', kwargs={'slug': self.post.slug}) + '?after=bad')
+        self.assertEquals(response.status_code, 404)
@@ -0,0 +1,116 @@
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from blog_app import counters
+from blog_app.counters import flush_views, get_live_views, get_pending, record_view, uses_cache
+from blog_app.models import *
+
+
+@override_settings(BLOG_VIEWS_BUFFER='cache')
+class ViewsCounterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        cls.post = Posts.objects.create(
+            title='Test post',
+            slug='test-post',
+            author=cls.user,
+            content='Test content',
+            category=cls.category,
+            is_published=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_record_view_is_pending(self):
+        record_view(self.post.pk)
+        record_view(self.post.pk)
+        self.assertEquals(get_pending(self.post.pk), 2)
+        self.post.refresh_from_db()
+        self.assertEquals(self.post.views, 0)
+        self.assertEquals(get_live_views(self.post), 2)
+
+    def test_flush_views(self):
+        updated_at = self.post.updated_at
+        for _ in range(3):
+            record_view(self.post.pk)
+        self.assertEquals(flush_views(), {self.post.pk: 3})
+        self.post.refresh_from_db()
+        self.assertEquals(self.post.views, 3)
+        self.assertEquals(self.post.updated_at, updated_at)
+        self.assertEquals(get_pending(self.post.pk), 0)
+        self.assertEquals(get_live_views(self.post), 3)
+
+    def test_views_after_flush_are_not_lost(self):
+        record_view(self.post.pk)
+        flush_views()
+        record_view(self.post.pk)
+        self.assertEquals(flush_views(), {self.post.pk: 1})
+        self.post.refresh_from_db()
+        self.assertEquals(self.post.views, 2)
+
+    def test_flush_views_command(self):
+        record_view(self.post.pk)
+        call_command('flush_views', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.assertEquals(self.post.views, 1)
+
+    def test_interrupted_flush_keeps_pending(self):
+        other = Posts.objects.create(title='Other post', slug='other-post', author=self.user, category=self.category,
+                                     is_published=True)
+        for pk in (self.post.pk, other.pk, other.pk):
+            record_view(pk)
+        with mock.patch.object(counters.trending, 'record_bucket', side_effect=[None, KeyboardInterrupt]):
+            with self.assertRaises(KeyboardInterrupt):
+                flush_views()
+        self.assertEquals(flush_views(), {other.pk: 2})
+        self.assertEquals(flush_views(), {})
+        self.assertEquals(Posts.objects.get(pk=other.pk).views, 2)
+        self.assertFalse(PendingViews.objects.exists())
+
+    def test_concurrent_flush_skipped(self):
+        record_view(self.post.pk)
+        cache.add(counters.FLUSH_RUNNING_KEY, 1)  # сброс в другом процессе
+        self.assertEquals(flush_views(), {})
+        cache.delete(counters.FLUSH_RUNNING_KEY)
+        self.assertEquals(flush_views(), {self.post.pk: 1})
+        self.assertEquals(Posts.objects.get(pk=self.post.pk).views, 1)
+
+    def test_buffer_backend(self):
+        self.assertTrue(uses_cache())
+        with override_settings(BLOG_VIEWS_BUFFER='auto'):
+            self.assertFalse(uses_cache())  # locmem не виден другим процессам
+            memcached = {'default': {'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache'}}
+            with override_settings(CACHES=memcached):
+                self.assertTrue(uses_cache())
+
+
+@override_settings(BLOG_VIEWS_BUFFER='db')
+class DatabaseViewsBufferTest(ViewsCounterTest):
+    """Те же проверки с буфером просмотров в таблице PendingViews"""
+
+    def test_buffer_backend(self):
+        self.assertFalse(uses_cache())
+        record_view(self.post.pk)
+        self.assertEquals(PendingViews.objects.get(post=self.post).views, 1)
+        self.assertEquals(cache.get(counters.PENDING_KEY.format(self.post.pk)), None)
+
+    @override_settings(BLOG_VIEWS_DB_SHARDS=4)
+    def test_views_spread_over_shards(self):
+        for shard in range(4):
+            with mock.patch.object(counters.random, 'randrange', return_value=shard):
+                record_view(self.post.pk)
+                with self.assertNumQueries(1):  # одна строка части, без общей блокировки поста
+                    record_view(self.post.pk)
+        self.assertEquals(PendingViews.objects.filter(post=self.post).count(), 4)
+        self.assertEquals(get_pending(self.post.pk), 8)
+        self.assertEquals(flush_views(), {self.post.pk: 8})
+        self.assertFalse(PendingViews.objects.exists())
@@ -0,0 +1,90 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from blog_app.counters import flush_views, record_view
+from blog_app.models import *
+
+
+class DenormalizedCountersTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category_1 = Categories.objects.create(title='Test category 1', slug='test-category-1')
+        cls.category_2 = Categories.objects.create(title='Test category 2', slug='test-category-2')
+        cls.tag_1 = Tags.objects.create(title='Test tag 1', slug='test-tag-1')
+        cls.tag_2 = Tags.objects.create(title='Test tag 2', slug='test-tag-2')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Posts.objects.create(
+            title='Test post', slug='test-post', author=self.user, category=self.category_1,
+            is_published=True, views=10,
+        )
+
+    def assertCounts(self, obj, **counts):
+        obj.refresh_from_db()
+        for field, value in counts.items():
+            self.assertEquals(getattr(obj, field), value, field)
+
+    def test_category_posts_count(self):
+        self.assertCounts(self.category_1, posts_count=1)
+        self.post.category = self.category_2
+        self.post.save()
+        self.assertCounts(self.category_1, posts_count=0)
+        self.assertCounts(self.category_2, posts_count=1)
+        self.post.is_published = False
+        self.post.save()
+        self.assertCounts(self.category_2, posts_count=0)
+
+    def test_tags_counters(self):
+        self.post.tags.add(self.tag_1, self.tag_2)
+        self.assertCounts(self.tag_1, posts_count=1, views_total=10)
+        self.post.tags.remove(self.tag_2, self.tag_2)
+        self.assertCounts(self.tag_2, posts_count=0, views_total=0)
+        self.post.is_published = False
+        self.post.save()
+        self.assertCounts(self.tag_1, posts_count=0, views_total=10)
+        self.post.tags.clear()
+        self.assertCounts(self.tag_1, posts_count=0, views_total=0)
+
+    def test_reverse_tags_counters(self):
+        self.tag_1.posts.add(self.post)
+        self.assertCounts(self.tag_1, posts_count=1, views_total=10)
+        self.tag_1.posts.clear()
+        self.assertCounts(self.tag_1, posts_count=0, views_total=0)
+
+    def test_flushed_views_go_to_tags(self):
+        self.post.tags.add(self.tag_1)
+        record_view(self.post.pk)
+        flush_views()
+        self.assertCounts(self.tag_1, views_total=11)
+
+    def test_post_delete(self):
+        self.post.tags.add(self.tag_1)
+        self.post.delete()
+        self.assertCounts(self.category_1, posts_count=0)
+        self.assertCounts(self.tag_1, posts_count=0, views_total=0)
+
+    def test_comments_count(self):
+        comment = Comments.objects.create(post=self.post, content='Test comment', author=self.user)
+        self.assertCounts(self.post, comments_count=1)
+        comment.delete()
+        self.assertCounts(self.post, comments_count=0)
+
+    def test_recount_command(self):
+        self.post.tags.add(self.tag_1)
+        Comments.objects.create(post=self.post, content='Test comment', author=self.user)
+        Categories.objects.update(posts_count=42)
+        Tags.objects.update(posts_count=42, views_total=42)
+        Posts.objects.update(comments_count=42)
+        call_command('recount', stdout=StringIO())
+        self.assertCounts(self.category_1, posts_count=1)
+        self.assertCounts(self.category_2, posts_count=0)
+        self.assertCounts(self.tag_1, posts_count=1, views_total=10)
+        self.assertCounts(self.tag_2, posts_count=0, views_total=0)
+        self.assertCounts(self.post, comments_count=1)
@@ -0,0 +1,52 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase
+
+from blog_app.explain import capture_queries, explain
+from blog_app.models import *
+
+
+class ExplainTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='test_user', password='test_password')
+        category = Categories.objects.create(title='Test category', slug='test-category')
+        tag = Tags.objects.create(title='Test tag', slug='test-tag')
+        for num in range(6):
+            post = Posts.objects.create(title=f'Test post {num}', slug=f'test-post-{num}', author=user,
+                                        category=category, is_published=True)
+            post.tags.add(tag)
+
+    def test_posts_indexes_created(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Posts._meta.db_table)
+        for name in ('posts_home_created_idx', 'posts_pub_created_idx', 'posts_cat_pub_created_idx',
+                     'posts_pub_views_idx', 'posts_pub_updated_idx'):
+            self.assertIn(name, constraints)
+
+    def test_list_queries_use_indexes(self):
+        status, queries = capture_queries(reverse('home'))
+        self.assertEquals(status, 200)
+        plans = [explain(sql, params, min_rows=0) for sql, params in queries if 'LIMIT' in sql]
+        self.assertTrue(plans)
+        for plan in plans:
+            self.assertEquals(plan.issues, [], plan.plan)
+
+    def test_unindexed_query_flagged(self):
+        sql, params = Tags.objects.order_by('-views_total').query.sql_with_params()
+        plan = explain(sql, params, min_rows=0)
+        self.assertEquals({issue.kind for issue in plan.issues}, {'seq scan', 'sort'})
+        self.assertEquals(explain(sql, params, min_rows=100).issues, [])
+        self.assertEquals(explain(sql, params, min_rows=0, ignore=['blog_app_tags']).issues, [])
+
+    def test_command(self):
+        out = StringIO()
+        call_command('explain_views', reverse('home'), stdout=out)
+        self.assertIn('запросов', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('explain_views', reverse('post', kwargs={'slug': 'test-post-0'}), min_rows=0, strict=True,
+                         stdout=StringIO())
@@ -0,0 +1,102 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from blog_app.models import *
+
+
+class BaseFeedsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        cls.other_category = Categories.objects.create(title='Other category', slug='other-category')
+        cls.tag = Tags.objects.create(title='Test tag', slug='test-tag')
+        cls.post = Posts.objects.create(title='Test post', slug='test-post', author=cls.user, content='<p>Body</p>',
+                                        category=cls.category, is_published=True)
+        cls.post.tags.add(cls.tag)
+        Posts.objects.create(title='Other post', slug='other-post', author=cls.user, category=cls.other_category,
+                             is_published=True)
+        Posts.objects.create(title='Draft post', slug='draft-post', author=cls.user, category=cls.category)
+
+    def setUp(self):
+        cache.clear()
+
+
+class FeedsTest(BaseFeedsTest):
+
+    def test_site_feeds(self):
+        response = self.client.get(reverse('feed_rss'))
+        self.assertEquals(response.status_code, 200)
+        self.assertContains(response, '<rss')
+        self.assertContains(response, 'Test post')
+        self.assertContains(response, 'Other post')
+        self.assertNotContains(response, 'Draft post')
+        response = self.client.get(reverse('feed_atom'))
+        self.assertContains(response, '<feed')
+        self.assertContains(response, 'Test post')
+
+    def test_category_and_tag_feeds(self):
+        response = self.client.get(reverse('category_feed_atom', kwargs={'slug': 'test-category'}))
+        self.assertContains(response, 'Test post')
+        self.assertNotContains(response, 'Other post')
+        response = self.client.get(reverse('tag_feed_rss', kwargs={'slug': 'test-tag'}))
+        self.assertContains(response, 'Test post')
+        self.assertNotContains(response, 'Other post')
+        response = self.client.get(reverse('tag_feed_rss', kwargs={'slug': 'missing'}))
+        self.assertEquals(response.status_code, 404)
+
+    def test_feed_cached_and_conditional(self):
+        response = self.client.get(reverse('feed_rss'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('feed_rss'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEquals(response.status_code, 304)
+        response = self.client.get(reverse('feed_rss'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEquals(response.status_code, 304)
+
+    def test_feed_invalidated_on_edit(self):
+        etag = self.client.get(reverse('feed_rss'))['ETag']
+        post = Posts.objects.get(pk=self.post.pk)
+        post.title = 'Edited post'
+        post.save()
+        response = self.client.get(reverse('feed_rss'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+        self.assertContains(response, 'Edited post')
+
+
+@override_settings(BLOG_SITEMAP_CHUNK=1)
+class SitemapTest(BaseFeedsTest):
+
+    def test_index_lists_chunks(self):
+        response = self.client.get(reverse('sitemap'))
+        self.assertEquals(response.status_code, 200)
+        self.assertContains(response, '/sitemap-posts.xml</loc>')
+        self.assertContains(response, '/sitemap-posts.xml?p=2</loc>')
+        self.assertNotContains(response, '/sitemap-posts.xml?p=3</loc>')
+        self.assertContains(response, '/sitemap-tags.xml</loc>')
+
+    def test_section_chunk(self):
+        response = self.client.get(reverse('sitemap_section', kwargs={'section': 'posts'}) + '?p=2')
+        self.assertEquals(response.status_code, 200)
+        self.assertContains(response, '<loc>', count=1)
+        self.assertTrue(response.has_header('Last-Modified'))
+        response = self.client.get(reverse('sitemap_section', kwargs={'section': 'posts'}) + '?p=2',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEquals(response.status_code, 304)
+        response = self.client.get(reverse('sitemap_section', kwargs={'section': 'posts'}) + '?p=3')
+        self.assertEquals(response.status_code, 404)
+
+    def test_section_chunk_by_pk(self):
+        url = reverse('sitemap_section', kwargs={'section': 'posts'}) + '?p=2'
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertContains(response, '/post/other-post/</loc>')
+        self.assertFalse(any('OFFSET' in query['sql'] for query in queries))
+        Posts.objects.filter(slug='test-post').delete()
+        response = self.client.get(reverse('sitemap_section', kwargs={'section': 'posts'}))
+        self.assertContains(response, '/post/other-post/</loc>')
+        self.assertEquals(self.client.get(url).status_code, 404)
@@ -0,0 +1,108 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from blog_app import images
+from blog_app.models import *
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_photo(name='photo.png', size=(700, 400), color=(200, 30, 30)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, BLOG_IMAGES_FORMATS=('jpeg',))
+class PhotoVariantsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Posts.objects.create(title='Test post', slug='test-post', author=self.user,
+                                         category=self.category, photo=make_photo(), is_published=True)
+
+    def test_variants_generated(self):
+        self.assertEquals(self.post.photo_variants, {})
+        self.assertTrue(images.update_post_photo(self.post.pk))
+        post = Posts.objects.get(pk=self.post.pk)
+        variants = post.photo_variants
+        self.assertEquals(variants['widths'], [50, 100, 200, 300, 600])
+        self.assertEquals((variants['width'], variants['height']), (700, 400))
+        self.assertTrue(post.photo_placeholder.startswith('data:image/jpeg;base64,'))
+        storage = post.photo.storage
+        name = images.variant_name(variants['hash'], 300, 'jpeg')
+        self.assertTrue(storage.exists(name))
+        with storage.open(name) as file:
+            self.assertEquals(Image.open(file).size, (300, 171))
+
+    def test_generation_idempotent(self):
+        variants, _ = images.generate_variants(self.post.photo)
+        name = images.variant_name(variants['hash'], 100, 'jpeg')
+        mtime = self.post.photo.storage.get_modified_time(name)
+        self.assertEquals(images.generate_variants(self.post.photo)[0], variants)
+        self.assertEquals(self.post.photo.storage.get_modified_time(name), mtime)
+
+    def test_replaced_photo_resets_variants(self):
+        images.update_post_photo(self.post.pk)
+        post = Posts.objects.get(pk=self.post.pk)
+        post.photo = make_photo('other.png', color=(0, 0, 200))
+        post.save()
+        post.refresh_from_db()
+        self.assertEquals(post.photo_variants, {})
+        self.assertEquals(post.photo_placeholder, '')
+
+    def test_unchanged_photo_keeps_variants(self):
+        images.update_post_photo(self.post.pk)
+        post = Posts.objects.get(pk=self.post.pk)
+        post.title = 'Renamed'
+        post.save()
+        post.refresh_from_db()
+        self.assertNotEquals(post.photo_variants, {})
+
+    def test_srcset_tag(self):
+        images.update_post_photo(self.post.pk)
+        post = Posts.objects.get(pk=self.post.pk)
+        html = Template("{% load photos %}{% photo post 'card' %}").render(Context({'post': post}))
+        hash_ = post.photo_variants['hash']
+        self.assertIn(f'src="/media/photos/variants/{hash_[:2]}/{hash_}/300w.jpg"', html)
+        self.assertIn(f'/media/photos/variants/{hash_[:2]}/{hash_}/600w.jpg 600w', html)
+        self.assertNotIn('50w', html)
+        self.assertIn('sizes="300px"', html)
+        self.assertIn('alt="Test post"', html)
+        self.assertIn('background: url(data:image/jpeg;base64,', html)
+
+    def test_tag_without_variants_outputs_original(self):
+        html = Template("{% load photos %}{% photo post 'sidebar' %}").render(Context({'post': self.post}))
+        self.assertIn(f'src="{self.post.photo.url}"', html)
+        self.assertNotIn('srcset', html)
+
+    def test_sidebar_snapshot_item(self):
+        images.update_post_photo(self.post.pk)
+        response = self.client.get(reverse('post', kwargs={'slug': self.post.slug}))
+        self.assertContains(response, 'sizes="100px"', count=2)
+
+    def test_backfill_command(self):
+        out = StringIO()
+        call_command('generate_photo_variants', stdout=out)
+        self.assertIn('Обработано фото: 1', out.getvalue())
+        call_command('generate_photo_variants', stdout=out)
+        self.assertIn('Обработано фото: 0', out.getvalue())
@@ -0,0 +1,98 @@
+import re
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog_app import metrics
+from blog_app.metrics import PROCESS_KEY, Registry, render
+from blog_app.models import *
+
+
+def parse(text):
+    """Значения метрик из текстового формата Prometheus: 'имя{метки}' -> число"""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            series, value = line.rsplit(' ', 1)
+            values[series] = float(value)
+    return values
+
+
+@override_settings(BLOG_METRICS_TOKEN='secret')
+class MetricsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='test_user', password='test_password')
+        category = Categories.objects.create(title='Test category', slug='test-category')
+        cls.post = Posts.objects.create(title='Test post', slug='test-post', author=user, category=category,
+                                        is_published=True)
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(metrics, '_registry', Registry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_metrics(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEquals(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return parse(response.content.decode())
+
+    def test_request_metrics(self):
+        self.client.get(reverse('home'))
+        self.client.get(reverse('home'))
+        self.client.get(self.post.get_absolute_url())
+        values = self.get_metrics()
+        self.assertEquals(values['blog_http_requests_total{view="home",method="GET",status="200"}'], 2)
+        self.assertEquals(values['blog_http_request_duration_seconds_count{view="home"}'], 2)
+        self.assertEquals(values['blog_http_request_duration_seconds_bucket{view="home",le="+Inf"}'], 2)
+        self.assertEquals(values['blog_http_response_size_bytes_count{view="post"}'], 1)
+        self.assertGreater(values['blog_http_response_size_bytes_sum{view="post"}'], 0)
+        self.assertGreater(values['blog_db_queries_total{view="home"}'], 0)
+        self.assertGreater(values['blog_db_query_duration_seconds_total{view="post"}'], 0)
+        self.assertEquals(values['blog_template_render_seconds_count{template="blog_app/index.html"}'], 1)
+        self.assertEquals(values['blog_template_render_seconds_count{template="blog_app/sidebar_tpl.html"}'], 1)
+        self.assertEquals(values['blog_cache_requests_total{cache="page",result="miss"}'], 2)
+        self.assertEquals(values['blog_cache_requests_total{cache="page",result="hit"}'], 1)
+
+    def test_processes_aggregated(self):
+        other = Registry(token='other-host:1')
+        other.inc('blog_http_requests_total', (('view', 'home'), ('method', 'GET'), ('status', '200')), 5)
+        other.publish()
+        self.client.get(reverse('home'))
+        values = self.get_metrics()
+        self.assertEquals(values['blog_http_requests_total{view="home",method="GET",status="200"}'], 6)
+        cache.delete(PROCESS_KEY.format(other.token))
+        values = self.get_metrics()
+        self.assertEquals(values['blog_http_requests_total{view="home",method="GET",status="200"}'], 1)
+        self.assertNotIn(other.token, cache.get(metrics.PROCESSES_KEY))
+
+    def test_access_restricted(self):
+        url = reverse('metrics')
+        self.assertEquals(self.client.get(url).status_code, 404)  # с локального адреса, как за прокси
+        self.assertEquals(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        self.assertEquals(self.client.get(url, HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        with override_settings(BLOG_METRICS_TOKEN=None):
+            self.assertEquals(self.client.get(url, HTTP_AUTHORIZATION='Bearer None').status_code, 404)
+        with override_settings(BLOG_METRICS_ALLOWED_IPS=('192.0.2.1',)):
+            self.assertEquals(self.client.get(url, HTTP_AUTHORIZATION='Bearer secret').status_code, 404)
+            response = self.client.get(url, REMOTE_ADDR='192.0.2.1', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEquals(response.status_code, 200)
+
+    def test_render_histogram(self):
+        registry = Registry(token='test')
+        for value in (0.003, 0.02, 0.02, 20):
+            registry.observe('blog_http_request_duration_seconds', (('view', 'a"b'),), value)
+        text = render(registry.snapshot())
+        self.assertIn('# TYPE blog_http_request_duration_seconds histogram', text)
+        values = parse(text)
+        self.assertEquals(values['blog_http_request_duration_seconds_bucket{view="a\\"b",le="0.005"}'], 1)
+        self.assertEquals(values['blog_http_request_duration_seconds_bucket{view="a\\"b",le="0.025"}'], 3)
+        self.assertEquals(values['blog_http_request_duration_seconds_bucket{view="a\\"b",le="10"}'], 3)
+        self.assertEquals(values['blog_http_request_duration_seconds_bucket{view="a\\"b",le="+Inf"}'], 4)
+        self.assertAlmostEqual(values['blog_http_request_duration_seconds_sum{view="a\\"b"}'], 20.043)
+        self.assertEquals(len(re.findall(r'_bucket\{', text)), 12)
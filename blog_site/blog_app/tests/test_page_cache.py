@@ -0,0 +1,95 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+
+from blog_app.counters import get_live_views
+from blog_app.models import *
+from blog_app.page_cache import get_page_key
+
+
+@override_settings(BLOG_VIEWS_BUFFER='cache')  # просмотры в кеше, как с memcached/redis
+class PageCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        cls.post = Posts.objects.create(
+            title='Test post', slug='test-post', author=cls.user, content='Test content',
+            category=cls.category, is_published=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_list_page_cached(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home'))
+        self.assertEquals(response.status_code, 200)
+        self.assertContains(response, 'Test post')
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_tracking_params_ignored(self):
+        self.client.get(reverse('home'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('home') + '?utm_source=x')
+        self.assertContains(response, 'Test post')
+
+    def test_page_key(self):
+        factory = RequestFactory()
+        key = get_page_key(factory.get('/', {'after': '1', 's': 'a'}), ('Posts',))
+        self.assertEquals(get_page_key(factory.get('/?s=a&utm_source=x&after=1'), ('Posts',)), key)
+        self.assertNotEquals(get_page_key(factory.get('/', {'after': '2', 's': 'a'}), ('Posts',)), key)
+        self.assertNotEquals(get_page_key(factory.get('/feed/', {'after': '1', 's': 'a'}), ('Posts',)), key)
+
+    def test_not_modified(self):
+        response = self.client.get(reverse('home'))
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEquals(response.status_code, 304)
+
+    def test_purged_on_publish(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        Posts.objects.create(title='New post', slug='new-post', author=self.user, category=self.category,
+                             is_published=True)
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 200)
+        self.assertContains(response, 'New post')
+
+    def test_purged_on_comment(self):
+        self.assertContains(self.client.get(reverse('home')), 'Комментарии: 0')
+        Comments.objects.create(post=self.post, content='Test comment', author=self.user)
+        self.assertContains(self.client.get(reverse('home')), 'Комментарии: 1')
+
+    def test_not_purged_by_draft(self):
+        self.client.get(reverse('home'))
+        Posts.objects.create(title='Draft', slug='draft', author=self.user, category=self.category)
+        with self.assertNumQueries(0):
+            self.client.get(reverse('home'))
+
+    def test_post_page_counts_views_on_hit(self):
+        url = reverse('post', kwargs={'slug': self.post.slug})
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, '<span class="views-count">2</span>')
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEquals(response.status_code, 304)
+        self.assertEquals(get_live_views(self.post), 3)
+
+    def test_post_page_purged_on_edit(self):
+        url = reverse('post', kwargs={'slug': self.post.slug})
+        self.client.get(url)
+        post = Posts.objects.get(pk=self.post.pk)
+        post.content = 'Edited content'
+        post.save()
+        self.assertContains(self.client.get(url), 'Edited content')
+
+    def test_authenticated_not_cached(self):
+        self.client.login(username='test_user', password='test_password')
+        self.client.get(reverse('home'))
+        response = self.client.get(reverse('home'))
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEquals(response.context['title'], 'Главная')
@@ -0,0 +1,97 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from blog_app.models import *
+from blog_app.pagination import CachedCountPaginator, KeysetPaginator
+
+
+class BasePaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        for num in range(7):
+            Posts.objects.create(
+                title=f'Test post {num}',
+                slug=f'test-post-{num}',
+                author=cls.user,
+                category=cls.category,
+                is_published=True,
+            )
+        cls.ordered_ids = list(Posts.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def setUp(self):
+        cache.clear()
+
+
+class KeysetPaginatorTest(BasePaginationTest):
+
+    def test_forward_and_backward(self):
+        paginator = KeysetPaginator(Posts.objects.all(), 3)
+        first = paginator.page()
+        self.assertEquals([p.pk for p in first], self.ordered_ids[:3])
+        self.assertFalse(first.has_previous())
+
+        second = paginator.page(after=first.next_cursor)
+        self.assertEquals([p.pk for p in second], self.ordered_ids[3:6])
+
+        last = paginator.page(after=second.next_cursor)
+        self.assertEquals([p.pk for p in last], self.ordered_ids[6:])
+        self.assertFalse(last.has_next())
+
+        back = paginator.page(before=last.previous_cursor)
+        self.assertEquals([p.pk for p in back], self.ordered_ids[3:6])
+        self.assertTrue(back.has_previous())
+
+    def test_same_created_at(self):
+        Posts.objects.update(created_at=Posts.objects.first().created_at)
+        paginator = KeysetPaginator(Posts.objects.all(), 4)
+        first = paginator.page()
+        second = paginator.page(after=first.next_cursor)
+        self.assertEquals([p.pk for p in first] + [p.pk for p in second], sorted(self.ordered_ids, reverse=True))
+
+    def test_view_cursor_mode(self):
+        response = self.client.get(reverse('home'))
+        cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(reverse('home') + f'?after={cursor}')
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals([p.pk for p in response.context['posts']], self.ordered_ids[4:])
+        self.assertTrue(response.context['is_paginated'])
+
+    @override_settings(BLOG_PAGINATION_MAX_NUMBERED=1, BLOG_PAGE_CACHE_ENABLED=False)
+    def test_view_links_use_cursors(self):
+        page = self.client.get(reverse('home')).context['page_obj']
+        self.assertEquals(list(page.window), [1])
+        self.assertIsNone(page.previous_cursor)
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, f'?after={page.next_cursor}')
+        self.assertNotContains(response, '?page=2')
+        page = self.client.get(reverse('home'), {'page': 2}).context['page_obj']
+        response = self.client.get(reverse('home') + f'?before={page.previous_cursor}')
+        self.assertEquals([p.pk for p in response.context['posts']], self.ordered_ids[:4])
+
+    def test_view_bad_cursor(self):
+        response = self.client.get(reverse('home') + '?after=broken')
+        self.assertEquals(response.status_code, 404)
+
+
+class CachedCountPaginatorTest(BasePaginationTest):
+
+    def test_count_is_cached(self):
+        self.assertEquals(CachedCountPaginator(Posts.objects.all(), 3, count_key='all').count, 7)
+        with self.assertNumQueries(0):
+            self.assertEquals(CachedCountPaginator(Posts.objects.all(), 3, count_key='all').count, 7)
+
+    def test_count_invalidated_on_publish(self):
+        CachedCountPaginator(Posts.objects.filter(is_published=True), 3, count_key='published').count
+        post = Posts.objects.first()
+        post.is_published = False
+        post.save()
+        paginator = CachedCountPaginator(Posts.objects.filter(is_published=True), 3, count_key='published')
+        self.assertEquals(paginator.count, 6)
+
+    def test_page_window(self):
+        page = CachedCountPaginator(Posts.objects.all(), 1).page(5)
+        self.assertEquals(list(page.window), [3, 4, 5, 6, 7])
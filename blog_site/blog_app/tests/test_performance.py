@@ -0,0 +1,158 @@
+"""
+Бюджеты SQL-запросов и времени ответа для всех страниц блога на наборе данных реалистичного размера.
+
+Бюджеты задаются таблицей BUDGETS. При превышении бюджета запросов тест выводит SQL каждого запроса
+вместе со стеком вызовов в коде проекта и строкой шаблона, из которой запрос был выполнен,
+поэтому N+1 в шаблоне или шаблонном теге сразу видно в выводе теста.
+Бюджет времени умножается на переменную окружения BLOG_PERF_TIME_FACTOR (для медленных CI).
+"""
+import os
+import time
+import traceback
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from blog_app.denormalized import recount
+from blog_app.models import *
+from blog_app.rendering import render_comment, render_post
+from blog_app.search import rebuild_index
+
+POSTS = 300
+CATEGORIES = 8
+TAGS = 30
+TAGS_PER_POST = 3
+COMMENTS = 1500
+COMMENTS_ON_POST = 300  # комментарии самого обсуждаемого поста (страница post)
+
+# name - имя теста, url - функция (data) -> URL, login - запрос от авторизованного пользователя,
+# cold - запросов при пустом кеше, warm - при повторном запросе, ms - время ответа с пустым кешем
+Budget = namedtuple('Budget', 'name url login cold warm ms')
+
+BUDGETS = [
+    Budget('home', lambda d: reverse('home'), False, cold=5, warm=0, ms=300),
+    Budget('home_page_3', lambda d: reverse('home') + '?page=3', False, cold=4, warm=0, ms=300),
+    Budget('home_login', lambda d: reverse('home'), True, cold=6, warm=3, ms=300),
+    Budget('category', lambda d: reverse('category', kwargs={'slug': 'category-0'}), False, cold=6, warm=0, ms=300),
+    Budget('tag', lambda d: reverse('tag', kwargs={'slug': 'tag-0'}), False, cold=6, warm=0, ms=300),
+    Budget('post', lambda d: d['hot_post'].get_absolute_url(), False, cold=10, warm=1, ms=300),
+    Budget('post_login', lambda d: d['hot_post'].get_absolute_url(), True, cold=12, warm=6, ms=300),
+    Budget('post_comments', lambda d: reverse('post_comments', kwargs={'slug': d['hot_post'].slug}),
+           False, cold=1, warm=0, ms=100),
+    Budget('search', lambda d: reverse('search') + '?s=performance+content', False, cold=6, warm=5, ms=500),
+    Budget('add_post', lambda d: reverse('add_post'), True, cold=4, warm=3, ms=300),
+    Budget('registration', lambda d: reverse('reg'), False, cold=1, warm=0, ms=300),
+    Budget('login', lambda d: reverse('login'), False, cold=1, warm=0, ms=300),
+    Budget('feed_rss', lambda d: reverse('feed_rss'), False, cold=1, warm=0, ms=300),
+    Budget('category_feed', lambda d: reverse('category_feed_atom', kwargs={'slug': 'category-0'}),
+           False, cold=2, warm=0, ms=300),
+    Budget('sitemap', lambda d: reverse('sitemap'), False, cold=3, warm=0, ms=300),
+    Budget('sitemap_posts', lambda d: reverse('sitemap_section', kwargs={'section': 'posts'}),
+           False, cold=2, warm=0, ms=500),
+]
+
+
+def build_dataset():
+    """Набор данных через bulk_create (без сигналов), счетчики и поисковый индекс строятся отдельно"""
+    user = User.objects.create_user(username='perf_user', password='perf_password')
+    # bulk_create не заполняет pk на SQLite, поэтому объекты перечитываются
+    Categories.objects.bulk_create(
+        Categories(title=f'Category {num}', slug=f'category-{num}') for num in range(CATEGORIES)
+    )
+    Tags.objects.bulk_create(Tags(title=f'Tag {num}', slug=f'tag-{num}') for num in range(TAGS))
+    categories = list(Categories.objects.order_by('pk'))
+    tags = list(Tags.objects.order_by('pk'))
+    posts = []
+    for num in range(POSTS):
+        post = Posts(
+            title=f'Performance post {num}', slug=f'performance-post-{num}', author=user,
+            content=f'<p>Performance content {num}. ' + 'Lorem ipsum dolor sit amet. ' * 60 + '</p>',
+            category=categories[num % CATEGORIES], is_published=num % 10 != 0, on_main=num < 3, views=num,
+        )
+        render_post(post)
+        posts.append(post)
+    Posts.objects.bulk_create(posts)
+    posts = list(Posts.objects.order_by('pk').only('pk'))
+    Posts.tags.through.objects.bulk_create(
+        Posts.tags.through(posts_id=post.pk, tags_id=tags[(post.pk + shift) % TAGS].pk)
+        for post in posts for shift in range(TAGS_PER_POST)
+    )
+    hot_post = posts[1]
+    comments = []
+    for num in range(COMMENTS):
+        post = hot_post if num < COMMENTS_ON_POST else posts[num % POSTS]
+        comment = Comments(post_id=post.pk, content=f'<p>Comment {num}</p>', author=user)
+        render_comment(comment)
+        comments.append(comment)
+    Comments.objects.bulk_create(comments)
+    recount()
+    rebuild_index()
+    return {'user': user, 'hot_post': Posts.objects.get(pk=hot_post.pk)}
+
+
+class QueryRecorder:
+    """Запись выполненных запросов со стеком вызовов в коде проекта и строкой шаблона"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append((sql % tuple(map(repr, params)) if params else sql, self.where()))
+        return execute(sql, params, many, context)
+
+    @staticmethod
+    def where():
+        lines = []
+        for frame, lineno in traceback.walk_stack(None):
+            filename = frame.f_code.co_filename
+            node = frame.f_locals.get('self')
+            if frame.f_code.co_name == 'render_annotated' and getattr(node, 'token', None):
+                origin, token = node.origin.template_name, node.token
+                lines.append(f'    шаблон {origin}, строка {token.lineno}: {{% {token.contents} %}}')
+            elif filename.startswith(str(settings.BASE_DIR)) and '/tests/' not in filename:
+                lines.append(f'    {os.path.relpath(filename, settings.BASE_DIR)}:{lineno} {frame.f_code.co_name}')
+        return '\n'.join(reversed(lines))
+
+    def report(self):
+        return '\n'.join(f'{num}. {sql}\n{where}' for num, (sql, where) in enumerate(self.queries, 1))
+
+
+@override_settings(BLOG_VIEWS_BUFFER='cache')  # просмотры в кеше, как с memcached/redis
+class QueryBudgetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = build_dataset()
+
+    def request(self, budget):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.client.get(budget.url(self.data))
+        elapsed = (time.perf_counter() - start) * 1000
+        self.assertEquals(response.status_code, 200, budget.name)
+        return recorder, elapsed
+
+    def check_queries(self, budget, stage, recorder, limit):
+        if len(recorder.queries) > limit:
+            self.fail(f'{budget.name} ({stage}): {len(recorder.queries)} запросов при бюджете {limit}\n'
+                      f'{recorder.report()}')
+
+    def test_budgets(self):
+        time_factor = float(os.environ.get('BLOG_PERF_TIME_FACTOR', 1))
+        for budget in BUDGETS:
+            with self.subTest(budget.name):
+                cache.clear()
+                self.client.logout()
+                if budget.login:
+                    self.client.login(username='perf_user', password='perf_password')
+                recorder, elapsed = self.request(budget)
+                self.check_queries(budget, 'пустой кеш', recorder, budget.cold)
+                self.assertLessEqual(elapsed, budget.ms * time_factor,
+                                     f'{budget.name}: {elapsed:.0f} мс при бюджете {budget.ms} мс')
+                recorder, _ = self.request(budget)
+                self.check_queries(budget, 'повторный запрос', recorder, budget.warm)
@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from blog_app.models import *
+from blog_app.related import build_related, get_related_posts, rank
+
+
+class RankTest(TestCase):
+
+    def test_cosine_with_category_boost_and_fill(self):
+        norms = {2: 2.0, 3: 1.0, 4: 1.0}
+        categories = {2: 1, 3: 2, 4: 1}
+        pairs = rank(1, 1, {2: 1.0, 3: 0.5}, 1.0, norms, categories, [1, 4, 5], 3, 0.1)
+        self.assertEquals(pairs, [(2, 0.6), (3, 0.5), (4, 0.1)])
+        self.assertEquals(rank(1, 1, {2: 1.0, 3: 0.5}, 1.0, norms, categories, [4], 1, 0.1), [(2, 0.6)])
+
+
+@override_settings(BLOG_RELATED_COUNT=2, BLOG_PAGE_CACHE_ENABLED=False, BLOG_VIEWS_BUFFER='cache')
+class RelatedPostsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.python = Categories.objects.create(title='Python', slug='python')
+        cls.other = Categories.objects.create(title='Other', slug='other')
+        cls.tags = {slug: Tags.objects.create(title=slug, slug=slug) for slug in ('django', 'orm', 'web', 'misc')}
+        cls.posts = {}
+        for slug, category, tags in (('a', cls.python, 'django orm web'), ('b', cls.other, 'django orm'),
+                                     ('c', cls.python, 'web'), ('d', cls.other, 'misc'), ('e', cls.python, '')):
+            post = Posts.objects.create(title=f'Post {slug}', slug=slug, author=cls.user, category=category,
+                                        is_published=True)
+            post.tags.set([cls.tags[tag] for tag in tags.split()])
+            cls.posts[slug] = post
+
+    def setUp(self):
+        cache.clear()
+
+    def related(self, slug):
+        return [post.slug for post in get_related_posts(RelatedPost.objects.filter(post__slug=slug))]
+
+    def test_build(self):
+        out = StringIO()
+        call_command('build_related_posts', chunk_size=2, stdout=out)
+        self.assertIn('5', out.getvalue())
+        self.assertEquals(self.related('a'), ['b', 'c'])
+        self.assertEquals(self.related('b'), ['a', 'd'])
+        self.assertEquals(self.related('e'), ['c', 'a'])  # без тегов - последние посты категории
+        self.assertEquals(self.related('d'), ['b'])
+        self.assertEquals(RelatedPost.objects.count(), 9)
+
+    def test_incremental_matches_build(self):
+        build_related()
+        built = {slug: self.related(slug) for slug in self.posts}
+        RelatedPost.objects.all().delete()
+        for post in Posts.objects.all():
+            post.tags.add(self.tags['misc'])
+            post.tags.remove(self.tags['misc'])
+        self.assertEquals({slug: self.related(slug) for slug in self.posts}, built)
+
+    def test_updated_on_changes(self):
+        build_related()
+        post = self.posts['d']
+        post.tags.add(self.tags['django'], self.tags['orm'])
+        self.assertEquals(self.related('d'), ['b', 'a'])
+        post.is_published = False
+        post.save()
+        self.assertFalse(RelatedPost.objects.filter(post=post).exists())
+        self.assertFalse(RelatedPost.objects.filter(related=post).exists())
+        self.tags['web'].posts.add(self.posts['b'])
+        self.assertEquals(self.related('b'), ['a', 'c'])
+
+    def test_neighbours_updated(self):
+        build_related()
+        built = {slug: self.related(slug) for slug in self.posts}
+        post = Posts.objects.create(title='Post f', slug='f', author=self.user, category=self.python,
+                                    is_published=True)
+        post.tags.set([self.tags['django'], self.tags['orm'], self.tags['web']])
+        self.assertEquals(self.related('a')[0], 'f')
+        self.assertIn('f', self.related('b'))
+        post.tags.clear()
+        self.assertNotIn('f', self.related('b'))
+        self.assertEquals(self.related('b'), built['b'])
+
+    def test_post_page(self):
+        build_related()
+        with self.assertNumQueries(10):
+            response = self.client.get(reverse('post', kwargs={'slug': 'a'}))
+        self.assertContains(response, 'Похожие посты')
+        self.assertEquals([post.slug for post in response.context['related_posts']], ['b', 'c'])
+        response = self.client.get(reverse('post', kwargs={'slug': 'e'}))
+        self.assertEquals(len(response.context['related_posts']), 2)
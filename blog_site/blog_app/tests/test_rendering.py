@@ -0,0 +1,71 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from blog_app.caching import get_versions
+from blog_app.cards import card_key, render_cards
+from blog_app.models import *
+from blog_app.rendering import sanitize_html
+
+
+class SanitizeHtmlTest(TestCase):
+
+    def test_allowed_markup_kept(self):
+        html = '<p style="text-align:center">Text <strong>bold</strong> <a href="/post/x/">link</a></p>'
+        self.assertEquals(sanitize_html(html), html)
+
+    def test_scripts_removed(self):
+        self.assertEquals(sanitize_html('<p>Hi<script>alert(1)</script></p>'), '<p>Hi</p>')
+
+    def test_unsafe_attributes_removed(self):
+        html = '<a href="javascript:alert(1)" onclick="alert(1)">x</a><img src="a.jpg" onerror="alert(1)">'
+        self.assertEquals(sanitize_html(html), '<a>x</a><img src="a.jpg">')
+
+    def test_unknown_tags_and_unclosed_tags(self):
+        self.assertEquals(sanitize_html('<form><b>bold <i>text</form>'), '<b>bold <i>text</i></b>')
+
+    def test_text_escaped(self):
+        self.assertEquals(sanitize_html('1 &lt; 2 & 3'), '1 &lt; 2 &amp; 3')
+
+
+class RenderOnSaveTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        cls.post = Posts.objects.create(
+            title='Test post', slug='test-post', author=cls.user, category=cls.category,
+            content='<p>' + 'word ' * 450 + '<script>x</script></p>', is_published=True,
+        )
+
+    def test_post_fields(self):
+        self.assertNotIn('script', self.post.content_html)
+        self.assertEquals(self.post.word_count, 450)
+        self.assertEquals(self.post.reading_time, 3)
+        self.assertTrue(self.post.excerpt.startswith('<p>word word'))
+        self.assertTrue(self.post.excerpt.endswith('…</p>'))
+        self.assertEquals(len(self.post.excerpt_long.split()), 100)
+
+    def test_comment_html(self):
+        comment = Comments.objects.create(post=self.post, author=self.user, content='<img src=x onerror=alert(1)>')
+        self.assertEquals(comment.content_html, '<img src="x">')
+
+    def test_render_posts_command(self):
+        Posts.objects.update(content_html='', excerpt='', word_count=0)
+        call_command('render_posts', stdout=StringIO())
+        post = Posts.objects.get(pk=self.post.pk)
+        self.assertEquals(post.word_count, 450)
+        self.assertEquals(post.updated_at, self.post.updated_at)
+
+    def test_render_posts_command_purges_cache(self):
+        deps = ('Posts', 'Posts(is_published)', 'Comments', 'Post:test-post')
+        versions = get_versions(*deps).split('.')
+        render_cards([self.post])
+        call_command('render_posts', stdout=StringIO())
+        self.assertIsNone(cache.get(card_key(self.post)))
+        for old, new in zip(versions, get_versions(*deps).split('.')):
+            self.assertNotEquals(old, new)
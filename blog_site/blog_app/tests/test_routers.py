@@ -0,0 +1,167 @@
+import random
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from blog_app import routers
+from blog_app.async_views import gather_data
+from blog_app.models import *
+from blog_app.routers import STICKY_COOKIE, ReplicaSelector, ReplicaStickinessMiddleware, use_primary
+
+REPLICAS = {'replica_ok': 1, 'replica_down': 1}
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+def fail(alias):
+    raise DatabaseError(alias)
+
+
+class ReplicasMixin:
+    """Реплики - отдельные соединения SQLite: доступная в памяти и недоступная (файл в несуществующем каталоге)"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # добавляются после проверки запросов тестов к БД, иначе запросы к ним запрещены в SimpleTestCase
+        connections.databases['replica_ok'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+        connections.databases['replica_down'] = {'ENGINE': 'django.db.backends.sqlite3',
+                                                 'NAME': '/nonexistent/replica.sqlite3'}
+
+    @classmethod
+    def tearDownClass(cls):
+        for alias in REPLICAS:
+            connections[alias].close()
+            del connections.databases[alias]
+        super().tearDownClass()
+
+
+@override_settings(BLOG_DB_HEALTH_INTERVAL=5, BLOG_DB_REPLICA_RETRY=30)
+class ReplicaSelectorTest(ReplicasMixin, SimpleTestCase):
+
+    def test_weighted_choice(self):
+        selector = ReplicaSelector(check=lambda alias: None, rng=random.Random(0))
+        choices = [selector.choose({'a': 3, 'b': 1}) for _ in range(4000)]
+        self.assertAlmostEqual(choices.count('a') / choices.count('b'), 3, delta=0.5)
+
+    def test_unavailable_replica_excluded_until_retry(self):
+        clock = Clock()
+        checks = []
+        selector = ReplicaSelector(check=lambda alias: checks.append(alias) or alias == 'b' and fail(alias),
+                                   clock=clock)
+        self.assertEquals({selector.choose({'a': 1, 'b': 100}) for _ in range(20)}, {'a'})
+        self.assertEquals(checks, ['b', 'a'])  # повторные проверки не чаще интервала
+        self.assertIsNone(selector.choose({'b': 1}))
+        clock.now = 31
+        self.assertEquals(selector.choose({'b': 1}), None)
+        self.assertEquals(checks.count('b'), 2)
+        self.assertEquals(selector.choose({'a': 1}), 'a')
+        self.assertEquals(checks.count('a'), 2)
+
+    def test_real_connections(self):
+        selector = ReplicaSelector()
+        self.assertEquals(selector.choose({'replica_ok': 1, 'replica_down': 1000}), 'replica_ok')
+        self.assertIn('replica_down', selector.down)
+
+
+@override_settings(BLOG_DB_REPLICAS=REPLICAS)
+class ReplicaRouterTest(ReplicasMixin, SimpleTestCase):
+    """Выбор БД проверяется без запросов к таблицам (QuerySet.db)"""
+
+    def setUp(self):
+        patcher = mock.patch.object(routers, 'selector', ReplicaSelector())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def handle(self, view, cookies=None):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        result = {}
+        response = ReplicaStickinessMiddleware(lambda request: view(result) or HttpResponse())(request)
+        return response, result
+
+    def test_reads_go_to_replica_in_request(self):
+        def view(result):
+            result['db'] = {Posts.objects.all().db for _ in range(10)}
+        response, result = self.handle(view)
+        self.assertEquals(result['db'], {'replica_ok'})
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_primary_outside_request(self):
+        self.assertEquals(Posts.objects.all().db, 'default')
+        self.assertEquals(router.db_for_write(Posts), 'default')
+
+    def test_read_your_writes(self):
+        def view(result):
+            result['before'] = Posts.objects.all().db
+            with use_primary():
+                result['block'] = Posts.objects.all().db
+            result['write'] = router.db_for_write(Comments)
+            result['after'] = Posts.objects.all().db
+        response, result = self.handle(view)
+        self.assertEquals(result, {'before': 'replica_ok', 'block': 'default', 'write': 'default',
+                                   'after': 'default'})
+        self.assertEquals(response.cookies[STICKY_COOKIE]['max-age'], 15)
+        _, result = self.handle(lambda result: result.update(db=Posts.objects.all().db), {STICKY_COOKIE: '1'})
+        self.assertEquals(result['db'], 'default')
+
+    def test_state_shared_with_async_fetchers(self):
+        def fetch():
+            router.db_for_write(Posts)
+            return Posts.objects.all().db
+
+        def view(result):
+            result.update(async_to_sync(gather_data)({'replica': lambda: Posts.objects.all().db}))
+            result.update(async_to_sync(gather_data)({'write': fetch}))
+            result['after'] = Posts.objects.all().db
+        response, result = self.handle(view)
+        self.assertEquals(result, {'replica': 'replica_ok', 'write': 'default', 'after': 'default'})
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_all_replicas_down(self):
+        with override_settings(BLOG_DB_REPLICAS={'replica_down': 1}):
+            _, result = self.handle(lambda result: result.update(db=Posts.objects.all().db))
+        self.assertEquals(result['db'], 'default')
+
+    def test_no_migrations_on_replicas(self):
+        self.assertFalse(router.allow_migrate('replica_ok', 'blog_app'))
+        self.assertTrue(router.allow_migrate('default', 'blog_app'))
+
+
+@override_settings(BLOG_DB_REPLICAS=REPLICAS)
+class StickinessViewsTest(TestCase):
+    """Внутри транзакции теста чтение идет в основную БД, проверяется cookie после записи в представлениях"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        category = Categories.objects.create(title='Test category', slug='test-category')
+        cls.post = Posts.objects.create(title='Test post', slug='test-post', author=cls.user, category=category,
+                                        is_published=True)
+
+    def test_comment_sets_cookie(self):
+        self.client.login(username='test_user', password='test_password')
+        response = self.client.get(self.post.get_absolute_url())
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+        response = self.client.post(self.post.get_absolute_url(), {'content': 'Test comment'})
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_registration_sets_cookie(self):
+        response = self.client.post(reverse('reg'), {
+            'username': 'new_user', 'email': 'new@example.com',
+            'password1': 'Str0ng-passw0rd', 'password2': 'Str0ng-passw0rd',
+        })
+        self.assertTrue(User.objects.filter(username='new_user').exists())
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
@@ -0,0 +1,147 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from blog_app.models import *
+from blog_app.search import search
+from blog_app.search.backends import InvertedIndexBackend
+from blog_app.search.text import html_to_text, make_snippet, normalize_query, tokenize
+
+
+class SearchTextTest(TestCase):
+
+    def test_html_to_text(self):
+        self.assertEquals(html_to_text('<p>Привет,&nbsp;<b>мир</b></p>\n<p>!</p>'), 'Привет, мир !')
+
+    def test_tokenize(self):
+        self.assertEquals(tokenize('Ёжик в Тумане, Django 3.1'), ['ежик', 'в', 'тумане', 'django', '3', '1'])
+
+    def test_make_snippet(self):
+        snippet = make_snippet('Learn <Django> quickly', ['django'])
+        self.assertEquals(snippet, 'Learn &lt;<mark>Django</mark>&gt; quickly')
+
+    def test_normalize_query(self):
+        self.assertEquals(normalize_query('  Django\tTIPS django '), 'django tips')
+        self.assertEquals(normalize_query('tips for the Ｄｊａｎｇｏ'), 'django tips')
+        self.assertEquals(normalize_query('Ёжик в тумане'), 'ежик тумане')
+        self.assertEquals(normalize_query('the'), 'the')
+        self.assertEquals(normalize_query(''), '')
+
+
+class InvertedIndexBackendTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.backend = InvertedIndexBackend()
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        cls.tag = Tags.objects.create(title='Python', slug='python')
+        cls.post_title = Posts.objects.create(
+            title='Django tips', slug='django-tips', author=cls.user, category=cls.category,
+            content='<p>Some useful tips</p>', is_published=True,
+        )
+        cls.post_content = Posts.objects.create(
+            title='Web frameworks', slug='web-frameworks', author=cls.user, category=cls.category,
+            content='<p>Flask, Pyramid and <b>Django</b></p>', is_published=True,
+        )
+        cls.post_draft = Posts.objects.create(
+            title='Django draft', slug='django-draft', author=cls.user, category=cls.category,
+            content='Draft', is_published=False,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def search_ids(self, query):
+        return [post_id for post_id, _ in self.backend.search(query)]
+
+    def test_title_ranked_higher(self):
+        self.assertEquals(self.search_ids('django'), [self.post_title.pk, self.post_content.pk])
+        self.assertEquals([post_id for post_id, _ in self.backend.search('django', 1)], [self.post_title.pk])
+
+    def test_html_is_stripped(self):
+        self.assertEquals(self.search_ids('b'), [])
+
+    def test_unpublished_not_indexed(self):
+        self.assertNotIn(self.post_draft.pk, self.search_ids('draft'))
+        self.post_draft.is_published = True
+        self.post_draft.save()
+        self.assertEquals(self.search_ids('draft'), [self.post_draft.pk])
+
+    def test_tags_indexed(self):
+        self.assertEquals(self.search_ids('python'), [])
+        self.post_content.tags.add(self.tag)
+        self.assertEquals(self.search_ids('python'), [self.post_content.pk])
+        self.tag.posts.clear()
+        self.assertEquals(self.search_ids('python'), [])
+
+    def test_delete_removes_from_index(self):
+        post = Posts.objects.create(
+            title='Removed post', slug='removed-post', author=self.user, category=self.category,
+            is_published=True,
+        )
+        self.assertEquals(self.search_ids('removed'), [post.pk])
+        post.delete()
+        self.assertEquals(self.search_ids('removed'), [])
+
+    def test_search_results_page(self):
+        results = search('django')
+        self.assertEquals(len(results), 2)
+        page = results[0:1]
+        self.assertEquals(page, [self.post_title])
+        self.assertEquals(page[0].snippet, '<mark>Django</mark> tips. Some useful tips')
+
+    def test_rebuild_command(self):
+        SearchDocument.objects.all().delete()
+        self.assertEquals(self.search_ids('django'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEquals(self.search_ids('django'), [self.post_title.pk, self.post_content.pk])
+
+
+class SearchResultsCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        for num in range(5):
+            Posts.objects.create(title=f'Django post {num}', slug=f'django-post-{num}', author=cls.user,
+                                 category=cls.category, content='Django ' * num, is_published=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_share_cached_ids(self):
+        results = search('Django')
+        self.assertEquals(len(results), 5)
+        first_page = results[0:2]
+        with self.assertNumQueries(2):  # посты среза одним in_bulk и их сниппеты
+            results = search('  the DJANGO ')
+            self.assertEquals(len(results), 5)
+            self.assertEquals(results[0:2], first_page)
+        with self.assertNumQueries(2):
+            self.assertEquals(len(search('django')[4:6]), 1)
+
+    def test_invalidated_by_index_changes(self):
+        self.assertEquals(len(search('django')), 5)
+        post = Posts.objects.get(slug='django-post-0')
+        post.title = 'Flask post'
+        post.save()
+        self.assertEquals(len(search('django')), 4)
+        Posts.objects.get(slug='django-post-1').delete()
+        self.assertEquals(len(search('django')), 3)
+
+    @override_settings(BLOG_SEARCH_MAX_RESULTS=3)
+    def test_results_limited(self):
+        self.assertEquals(len(search('django')), 3)
+
+    def test_search_pages(self):
+        response = self.client.get(reverse('search'), {'s': 'Django'})
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.context['paginator'].count, 5)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('search'), {'s': 'django', 'page': 2})
+        self.assertEquals(len(response.context['posts']), 1)
@@ -0,0 +1,49 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from blog_app import seeding
+from blog_app.models import *
+
+
+class SeedBlogTest(TestCase):
+
+    def test_seed_counts_and_counters(self):
+        created = seeding.seed(users=3, categories=2, tags=5, posts=30, comments=100, batch_size=7)
+        self.assertEquals(created['posts'], 30)
+        self.assertEquals(User.objects.count(), 3)
+        self.assertEquals(Posts.objects.count(), 30)
+        self.assertEquals(Comments.objects.count(), 100)
+        self.assertEquals(Posts.objects.aggregate(total=Sum('comments_count'))['total'], 100)
+        published = Posts.objects.filter(is_published=True).count()
+        self.assertEquals(Categories.objects.aggregate(total=Sum('posts_count'))['total'], published)
+        post = Posts.objects.order_by('pk').first()
+        self.assertTrue(post.content_html and post.excerpt)
+        self.assertLess(post.created_at, timezone.now())
+        # новые объекты после генерации получают pk без конфликтов
+        Categories.objects.create(title='New category', slug='new-category')
+
+    def test_seed_is_deterministic(self):
+        seeding.seed(users=2, categories=2, tags=3, posts=10, comments=0, batch_size=4)
+        first = list(Posts.objects.order_by('pk').values_list('title', 'views'))
+        seeding.seed(users=2, categories=2, tags=3, posts=10, comments=0, batch_size=4)
+        second = list(Posts.objects.order_by('pk').values_list('title', 'views'))[10:]
+        self.assertEquals(first, second)
+
+    def test_process_pool_gives_same_result(self):
+        options = {
+            'user_ids': [1], 'category_ids': [1], 'tag_ids': [1, 2, 3], 'first_post_pk': 1, 'posts': 6,
+            'tags_per_post': 2, 'published_ratio': 0.5, 'start': timezone.now(), 'span': 3600,
+        }
+        tasks = [(0, index, 1 + index * 2, 2, options) for index in range(3)]
+        self.assertEquals(list(seeding._run(seeding.generate_posts, tasks, 2)),
+                          list(seeding._run(seeding.generate_posts, tasks, 0)))
+
+    def test_command(self):
+        out = StringIO()
+        call_command('seed_blog', users=2, categories=1, tags=2, posts=5, comments=10, index=True, stdout=out)
+        self.assertIn('posts: 5', out.getvalue())
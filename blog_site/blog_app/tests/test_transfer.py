@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from blog_app.models import *
+from blog_app.transfer import export_blog, import_blog
+
+
+class TransferTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        cls.tag = Tags.objects.create(title='Test tag', slug='test-tag')
+        cls.post = Posts.objects.create(title='Test post', slug='test-post', author=cls.user, content='<p>Text</p>',
+                                        category=cls.category, is_published=True, views=5)
+        cls.post.tags.add(cls.tag)
+        Comments.objects.create(post=cls.post, content='Test comment', author=cls.user)
+
+    def export(self):
+        out = StringIO()
+        export_blog(out, chunk_size=1)
+        return out.getvalue().splitlines(keepends=True)
+
+    def test_export_records(self):
+        records = [json.loads(line) for line in self.export()]
+        self.assertEquals([r['type'] for r in records], ['category', 'tag', 'post', 'post_tag', 'comment'])
+        post = records[2]
+        self.assertEquals((post['author'], post['category'], post['views']), ('test_user', 'test-category', 5))
+        self.assertIsNone(post['photo'])
+        self.assertEquals(records[3], {'type': 'post_tag', 'post': 'test-post', 'tag': 'test-tag'})
+
+    def test_round_trip(self):
+        lines = self.export()
+        created_at = self.post.created_at
+        Comments.objects.all().delete()
+        Posts.objects.all().delete()
+        Tags.objects.all().delete()
+        Categories.objects.all().delete()
+        User.objects.all().delete()
+        counts, skipped = import_blog(lines, batch_size=2)
+        self.assertEquals(counts, {'category': 1, 'tag': 1, 'post': 1, 'post_tag': 1, 'comment': 1})
+        self.assertEquals(skipped, 0)
+        post = Posts.objects.get(slug='test-post')
+        self.assertEquals(post.created_at, created_at)
+        self.assertEquals(post.content_html, '<p>Text</p>')
+        self.assertEquals(post.author.username, 'test_user')
+        self.assertEquals(list(post.tags.values_list('slug', flat=True)), ['test-tag'])
+        self.assertEquals(post.comments_count, 1)
+        self.assertEquals(Categories.objects.get().posts_count, 1)
+
+    def test_upsert_by_slug(self):
+        lines = self.export()
+        Posts.objects.filter(pk=self.post.pk).update(title='Changed')
+        import_blog(lines, index=False)
+        import_blog(lines, index=False)
+        self.assertEquals(Posts.objects.count(), 1)
+        self.assertEquals(Posts.objects.get().title, 'Test post')
+        self.assertEquals(Comments.objects.count(), 1)
+
+    def test_resume_from_checkpoint(self):
+        lines = self.export()
+        Posts.objects.filter(pk=self.post.pk).update(title='Changed')
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, 'import.checkpoint')
+            with open(checkpoint, 'w') as file:
+                json.dump({'line': 3}, file)
+            counts, _ = import_blog(lines, checkpoint=checkpoint, index=False)
+            self.assertFalse(os.path.exists(checkpoint))
+        self.assertEquals(counts, {'post_tag': 1, 'comment': 1})
+        self.assertEquals(Posts.objects.get().title, 'Changed')
+
+    def test_commands(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'blog.jsonl')
+            out = StringIO()
+            call_command('export_blog', path, stdout=out)
+            self.assertIn('post: 1', out.getvalue())
+            call_command('import_blog', path, no_index=True, stdout=out)
+            self.assertIn('Импортировано: category: 1', out.getvalue())
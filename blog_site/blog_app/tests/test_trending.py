@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from blog_app import trending
+from blog_app.counters import flush_views, record_view
+from blog_app.models import *
+from blog_app.templatetags.sidebar import get_sidebar_data
+from blog_app.trending import add_views, bucket_start, decayed, get_top, get_trending_ids
+
+NOW = datetime(2026, 10, 18, 12, 30, tzinfo=timezone.utc)
+
+
+class ScoreTest(TestCase):
+
+    @override_settings(BLOG_TRENDING_HALF_LIFE=24)
+    def test_decay(self):
+        score = add_views(0, 10, NOW)
+        self.assertAlmostEqual(decayed(score, NOW), 10)
+        self.assertAlmostEqual(decayed(score, NOW + timedelta(days=2)), 2.5)
+        score = add_views(score, 5, NOW + timedelta(days=1))
+        self.assertAlmostEqual(decayed(score, NOW + timedelta(days=1)), 10)
+        # давние просмотры уступают свежим
+        self.assertLess(add_views(0, 100, NOW - timedelta(days=10)), add_views(0, 1, NOW))
+
+    def test_bucket_start(self):
+        self.assertEquals(bucket_start(NOW), datetime(2026, 10, 18, 12, tzinfo=timezone.utc))
+        with override_settings(BLOG_TRENDING_BUCKET=60 * 60 * 24):
+            self.assertEquals(bucket_start(NOW), datetime(2026, 10, 18, tzinfo=timezone.utc))
+
+
+@override_settings(BLOG_TRENDING_TOP_SIZE=2)
+class TrendingTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test_user', password='test_password')
+        cls.category = Categories.objects.create(title='Test category', slug='test-category')
+        cls.posts = [Posts.objects.create(title=f'Test post {num}', slug=f'test-post-{num}', author=cls.user,
+                                          category=cls.category, is_published=True, views=1000 * num)
+                     for num in range(3)]
+
+    def setUp(self):
+        cache.clear()
+
+    def view(self, post, count, moment=NOW):
+        for _ in range(count):
+            record_view(post.pk)
+        with mock.patch('blog_app.counters.timezone.now', return_value=moment):
+            flush_views()
+
+    def test_buckets_and_scores(self):
+        self.view(self.posts[0], 3)
+        self.view(self.posts[0], 2, NOW + timedelta(minutes=10))
+        self.view(self.posts[0], 1, NOW + timedelta(hours=1))
+        buckets = PostViews.objects.filter(post=self.posts[0]).order_by('start')
+        self.assertEquals([(bucket.start.hour, bucket.views) for bucket in buckets], [(12, 5), (13, 1)])
+        post = Posts.objects.get(pk=self.posts[0].pk)
+        self.assertAlmostEqual(decayed(post.trending_score, NOW), 6, delta=0.1)
+        self.assertEquals(Posts.objects.get(pk=self.posts[1].pk).trending_score, 0)
+
+    def test_top_updated_incrementally(self):
+        self.view(self.posts[0], 5)
+        self.assertEquals(get_trending_ids(), [self.posts[0].pk])
+        self.view(self.posts[1], 2, NOW + timedelta(days=3))  # половина веса первых просмотров уже затухла
+        self.view(self.posts[2], 1, NOW + timedelta(days=3))
+        with self.assertNumQueries(0):
+            self.assertEquals(get_trending_ids(), [self.posts[0].pk, self.posts[1].pk])
+        self.assertEquals(get_top(), trending.build_top())
+        self.view(self.posts[2], 3, NOW + timedelta(days=3))
+        self.assertEquals(get_trending_ids(), [self.posts[2].pk, self.posts[0].pk])
+        self.posts[2].is_published = False
+        self.posts[2].save()
+        self.assertEquals(get_trending_ids(), [self.posts[0].pk, self.posts[1].pk])
+
+    def test_sidebar(self):
+        self.assertEquals([post['title'] for post in get_sidebar_data(3)['popular']],
+                          ['Test post 2', 'Test post 1', 'Test post 0'])
+        self.view(self.posts[0], 1)
+        call_command('refresh_sidebar', stdout=StringIO())
+        self.assertEquals([post['title'] for post in get_sidebar_data(3)['popular']], ['Test post 0'])
+
+    def test_rebuild_command(self):
+        self.view(self.posts[0], 4, timezone.now() - timedelta(days=40))
+        self.view(self.posts[1], 2, timezone.now() - timedelta(days=1))
+        self.view(self.posts[1], 2, timezone.now())
+        expected = Posts.objects.get(pk=self.posts[1].pk).trending_score
+        Posts.objects.update(trending_score=0)
+        out = StringIO()
+        call_command('rebuild_trending', stdout=out)
+        self.assertIn('1', out.getvalue())
+        self.assertFalse(PostViews.objects.filter(post=self.posts[0]).exists())
+        self.assertEquals(Posts.objects.get(pk=self.posts[0].pk).trending_score, 0)
+        self.assertAlmostEqual(Posts.objects.get(pk=self.posts[1].pk).trending_score, expected, delta=0.1)
+        self.assertEquals(get_trending_ids(), [self.posts[1].pk])
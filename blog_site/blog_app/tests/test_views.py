@@ -1,7 +1,9 @@
 from django.contrib.auth.models import User
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
 
 from blog_app.models import *
+from blog_app.templatetags.sidebar import get_sidebar_data
 
 
 class BaseViewTest(TestCase):
@@ -31,6 +33,9 @@ class BaseViewTest(TestCase):
         )
         cls.search_field = 'Test'
 
+    def setUp(self):
+        cache.clear()
+
 
 class HomeListViewTest(BaseViewTest):
 
@@ -131,6 +136,7 @@ class PostsByTagListViewTest(BaseViewTest):
         self.assertEquals(response.context['title'], 'Тег: Test tag 1')
 
 
+@override_settings(BLOG_VIEWS_BUFFER='cache')  # просмотры в кеше, как с memcached/redis
 class GetPostDetailViewTest(BaseViewTest):
 
     def test_view_url(self):
@@ -153,6 +159,28 @@ class GetPostDetailViewTest(BaseViewTest):
         self.assertTrue(response.context['form'])
         self.assertTrue(self.comment in response.context['comments'])
 
+    def test_view_counter_is_buffered(self):
+        self.client.get(reverse('post', kwargs={'slug': self.post.slug}))
+        response = self.client.get(reverse('post', kwargs={'slug': self.post.slug}))
+        self.assertContains(response, '<span class="views-count">2</span>')
+        self.post.refresh_from_db()
+        self.assertEquals(self.post.views, 0)
+
+    @override_settings(BLOG_PAGE_CACHE_ENABLED=False)
+    def test_view_query_count_is_constant(self):
+        url = reverse('post', kwargs={'slug': self.post.slug})
+        self.client.get(url)
+        with self.assertNumQueries(4):
+            self.client.get(url)
+        for num in range(5):
+            self.post.tags.add(Tags.objects.create(title=f'Extra tag {num}', slug=f'extra-tag-{num}'))
+            Comments.objects.create(post=self.post, content=f'Extra comment {num}', author=self.user)
+        self.client.get(url)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertContains(response, 'Extra tag 4')
+        self.assertContains(response, 'Extra comment 4')
+
     def test_view_post_method(self):
         self.client.login(username='test_user', password='test_password')
         response_1 = self.client.post(reverse('post', kwargs={'slug': self.post.slug}),
@@ -267,3 +295,18 @@ class AddPostFunctionViewTest(BaseViewTest):
         self.assertEquals(response.context['title'], 'Добавление записи')
         self.assertTrue(response.context['form'])
 
+
+class SidebarTemplateTagTest(BaseViewTest):
+
+    def test_sidebar_is_cached(self):
+        self.client.get(reverse('post', kwargs={'slug': self.post.slug}))
+        with self.assertNumQueries(0):
+            get_sidebar_data(5)
+
+    def test_sidebar_invalidated_on_post_change(self):
+        self.assertEquals(len(get_sidebar_data(5)['recent']), 5)
+        self.post.is_published = False
+        self.post.save()
+        recent = get_sidebar_data(5)['recent']
+        self.assertEquals(len(recent), 4)
+        self.assertNotIn(self.post.get_absolute_url(), [p['url'] for p in recent])
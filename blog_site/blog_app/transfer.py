@@ -0,0 +1,263 @@
+"""
+Потоковый экспорт и импорт контента блога в формате JSON Lines (одна запись - одна строка).
+
+Записи идут по порядку зависимостей: category, tag, post, post_tag (связи постов с тегами), comment.
+Связи задаются естественными ключами (slug, username), поэтому файл переносится между окружениями с разными pk.
+Фото постов не встраиваются в файл: передается путь в хранилище и (по желанию) sha1 содержимого.
+
+Экспорт читает БД через .iterator(chunk_size), импорт обрабатывает файл пачками, поэтому расход памяти
+не зависит от объема данных. Импорт обновляет существующие объекты по slug (upsert), комментарии с тем же
+постом, автором и датой создания не дублируются. После каждой пачки номер обработанной строки
+сохраняется в файл контрольной точки, и прерванный импорт продолжается с нее.
+Используется командами "manage.py export_blog" и "manage.py import_blog".
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from blog_app import caching
+from blog_app.denormalized import recount
+from blog_app.models import Categories, Comments, Posts, Tags
+from blog_app.rendering import render_comment, render_post
+from blog_app.search import rebuild_index
+from blog_app.seeding import explicit_dates
+
+PostTags = Posts.tags.through
+POST_FIELDS = ('title', 'content', 'views', 'is_published', 'on_main', 'created_at', 'updated_at')
+RENDERED_FIELDS = ('content_html', 'excerpt', 'excerpt_long', 'word_count', 'reading_time')
+
+
+class JSONEncoder(DjangoJSONEncoder):
+    """Даты с микросекундами: DjangoJSONEncoder округляет их до миллисекунд, и комментарии дублировались бы"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def file_sha1(storage, name):
+    """sha1 содержимого файла в хранилище (читается частями)"""
+    digest = hashlib.sha1()
+    with storage.open(name, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def export_records(chunk_size=2000, photo_hashes=False):
+    """Записи для экспорта (словари) в порядке зависимостей"""
+    for category in Categories.objects.order_by('pk').values('slug', 'title').iterator(chunk_size=chunk_size):
+        yield {'type': 'category', **category}
+    for tag in Tags.objects.order_by('pk').values('slug', 'title').iterator(chunk_size=chunk_size):
+        yield {'type': 'tag', **tag}
+    storage = Posts._meta.get_field('photo').storage
+    posts = Posts.objects.order_by('pk').values('slug', 'author__username', 'category__slug', 'photo', *POST_FIELDS)
+    for post in posts.iterator(chunk_size=chunk_size):
+        photo = post.pop('photo')
+        if photo:
+            sha1 = file_sha1(storage, photo) if photo_hashes and storage.exists(photo) else None
+            photo = {'name': photo, 'sha1': sha1}
+        yield {
+            'type': 'post', 'slug': post.pop('slug'), 'author': post.pop('author__username'),
+            'category': post.pop('category__slug'), 'photo': photo or None, **post,
+        }
+    links = PostTags.objects.order_by('pk').values_list('posts__slug', 'tags__slug')
+    for post_slug, tag_slug in links.iterator(chunk_size=chunk_size):
+        yield {'type': 'post_tag', 'post': post_slug, 'tag': tag_slug}
+    comments = Comments.objects.order_by('pk').values('post__slug', 'author__username', 'content', 'created_at')
+    for comment in comments.iterator(chunk_size=chunk_size):
+        yield {
+            'type': 'comment', 'post': comment['post__slug'], 'author': comment['author__username'],
+            'content': comment['content'], 'created_at': comment['created_at'],
+        }
+
+
+def export_blog(out, chunk_size=2000, photo_hashes=False):
+    """Запись контента блога в текстовый поток out, возвращает кол-во записей по типам"""
+    counts = {}
+    for record in export_records(chunk_size, photo_hashes):
+        out.write(json.dumps(record, cls=JSONEncoder, ensure_ascii=False) + '\n')
+        counts[record['type']] = counts.get(record['type'], 0) + 1
+    return counts
+
+
+class Importer:
+    """Импорт записей пачками по batch_size с контрольными точками"""
+
+    def __init__(self, batch_size=1000, checkpoint=None, media_from=None):
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.media_from = media_from
+        self.storage = Posts._meta.get_field('photo').storage
+        self.counts = {}
+        self.skipped = 0
+
+    def read_checkpoint(self):
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            with open(self.checkpoint) as file:
+                return json.load(file)['line']
+        return 0
+
+    def write_checkpoint(self, line):
+        if self.checkpoint:
+            with open(self.checkpoint + '.tmp', 'w') as file:
+                json.dump({'line': line}, file)
+            os.replace(self.checkpoint + '.tmp', self.checkpoint)
+
+    def run(self, lines):
+        """Импорт строк JSONL из итерируемого lines, возвращает кол-во импортированных записей по типам"""
+        start = self.read_checkpoint()
+        batch, batch_type, line_number = [], None, 0
+        with explicit_dates(Posts, Comments):
+            for line_number, line in enumerate(lines, 1):
+                if line_number <= start or not line.strip():
+                    continue
+                record = json.loads(line)
+                if batch and (record['type'] != batch_type or len(batch) >= self.batch_size):
+                    self.flush(batch_type, batch, line_number - 1)
+                    batch = []
+                batch_type = record['type']
+                batch.append(record)
+            if batch:
+                self.flush(batch_type, batch, line_number)
+        return self.counts
+
+    def flush(self, record_type, records, line_number):
+        handler = getattr(self, f'import_{record_type}', None)
+        if handler is None:
+            raise ValueError(f'Неизвестный тип записи "{record_type}" (строка {line_number})')
+        with transaction.atomic():
+            handler(records)
+        self.counts[record_type] = self.counts.get(record_type, 0) + len(records)
+        self.write_checkpoint(line_number)
+
+    @staticmethod
+    def _ids(model, field, values):
+        return dict(model.objects.filter(**{f'{field}__in': set(values)}).values_list(field, 'pk'))
+
+    def _users(self, usernames):
+        """pk пользователей по username, отсутствующие создаются без возможности входа по паролю"""
+        users = self._ids(User, 'username', usernames)
+        missing = set(usernames) - set(users)
+        if missing:
+            User.objects.bulk_create([User(username=username, password=make_password(None)) for username in missing])
+            users.update(self._ids(User, 'username', missing))
+        return users
+
+    def _upsert(self, model, records, fields):
+        existing = model.objects.in_bulk([record['slug'] for record in records], field_name='slug')
+        new = []
+        for record in records:
+            obj = existing.get(record['slug'])
+            if obj is None:
+                obj = model(slug=record['slug'])
+                new.append(obj)
+            for field in fields:
+                setattr(obj, field, record[field])
+        model.objects.bulk_create(new)
+        model.objects.bulk_update(existing.values(), fields)
+
+    def import_category(self, records):
+        self._upsert(Categories, records, ['title'])
+
+    def import_tag(self, records):
+        self._upsert(Tags, records, ['title'])
+
+    def _photo(self, photo):
+        """Путь фото в хранилище: файл копируется из media_from, если его еще нет в хранилище"""
+        if not photo:
+            return ''
+        name = photo['name']
+        if not self.storage.exists(name) and self.media_from:
+            path = os.path.join(self.media_from, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as file:
+                    name = self.storage.save(name, File(file))
+        if photo.get('sha1') and self.storage.exists(name) and file_sha1(self.storage, name) != photo['sha1']:
+            self.skipped += 1
+            return ''
+        return name
+
+    def import_post(self, records):
+        categories = self._ids(Categories, 'slug', [record['category'] for record in records])
+        users = self._users([record['author'] for record in records])
+        existing = Posts.objects.in_bulk([record['slug'] for record in records], field_name='slug')
+        new, changed = [], []
+        for record in records:
+            if record['category'] not in categories:
+                self.skipped += 1
+                continue
+            post = existing.get(record['slug'])
+            if post is None:
+                post = Posts(slug=record['slug'])
+                new.append(post)
+            else:
+                changed.append(post)
+            for field in POST_FIELDS:
+                setattr(post, field, record[field])
+            post.created_at = parse_datetime(record['created_at'])
+            post.updated_at = parse_datetime(record['updated_at'])
+            post.author_id = users[record['author']]
+            post.category_id = categories[record['category']]
+            photo = self._photo(record['photo'])
+            if photo != post.photo.name:
+                post.photo, post.photo_variants, post.photo_placeholder = photo, {}, ''
+            render_post(post)
+        Posts.objects.bulk_create(new)
+        Posts.objects.bulk_update(changed, [
+            *POST_FIELDS, *RENDERED_FIELDS, 'author', 'category', 'photo', 'photo_variants', 'photo_placeholder',
+        ])
+
+    def import_post_tag(self, records):
+        posts = self._ids(Posts, 'slug', [record['post'] for record in records])
+        tags = self._ids(Tags, 'slug', [record['tag'] for record in records])
+        links = [PostTags(posts_id=posts[record['post']], tags_id=tags[record['tag']])
+                 for record in records if record['post'] in posts and record['tag'] in tags]
+        self.skipped += len(records) - len(links)
+        PostTags.objects.bulk_create(links, ignore_conflicts=True)
+
+    def import_comment(self, records):
+        posts = self._ids(Posts, 'slug', [record['post'] for record in records])
+        users = self._users([record['author'] for record in records])
+        existing = set(Comments.objects.filter(
+            post_id__in=posts.values(), created_at__in={parse_datetime(record['created_at']) for record in records}
+        ).values_list('post_id', 'author_id', 'created_at'))
+        new = []
+        for record in records:
+            if record['post'] not in posts:
+                self.skipped += 1
+                continue
+            comment = Comments(post_id=posts[record['post']], author_id=users[record['author']],
+                               content=record['content'], created_at=parse_datetime(record['created_at']))
+            key = (comment.post_id, comment.author_id, comment.created_at)
+            if key in existing:
+                continue
+            existing.add(key)
+            render_comment(comment)
+            new.append(comment)
+        Comments.objects.bulk_create(new)
+
+
+def import_blog(lines, batch_size=1000, checkpoint=None, media_from=None, index=True):
+    """
+    Импорт контента блога из строк JSONL. bulk_create не вызывает сигналы,
+    поэтому после импорта пересчитываются счетчики, поисковый индекс и версии кеша.
+    """
+    importer = Importer(batch_size=batch_size, checkpoint=checkpoint, media_from=media_from)
+    counts = importer.run(lines)
+    recount()
+    if index:
+        rebuild_index()
+    caching.bump('Posts', 'Posts(is_published)', 'Categories', 'Tags', 'Comments')
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return counts, importer.skipped
@@ -0,0 +1,146 @@
+"""
+Популярные сейчас посты: просмотры с экспоненциальным затуханием.
+
+При сбросе просмотров (blog_app.counters.flush_views) прирост каждого поста записывается в его период
+(PostViews, BLOG_TRENDING_BUCKET секунд) и добавляется к рейтингу поста Posts.trending_score
+(тем же UPDATE, что и просмотры).
+Вес просмотра растет вдвое каждые BLOG_TRENDING_HALF_LIFE часов от фиксированной даты EPOCH
+(прямое затухание), поэтому старые рейтинги не нужно пересчитывать: порядок постов по рейтингу не зависит
+от текущего времени, а просмотр недельной давности весит в 2 ** (168 / HALF_LIFE) раз меньше нового.
+Рейтинг хранится как log2 суммы весов, чтобы не переполняться, 0 - просмотров не было.
+
+Первые BLOG_TRENDING_TOP_SIZE постов по рейтингу хранятся в кеше и дополняются новыми рейтингами
+при каждом сбросе просмотров: рейтинги остальных постов не менялись, поэтому список остается точным.
+При изменении набора опубликованных постов список строится заново по индексу posts_pub_trending_idx.
+Рейтинги можно пересчитать по периодам (например, после изменения BLOG_TRENDING_HALF_LIFE),
+а старые периоды удалить командой "manage.py rebuild_trending".
+"""
+import heapq
+import math
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from blog_app.caching import acquire_lock, get_timeout, make_key
+from blog_app.metrics import record_cache
+from blog_app.models import Posts, PostViews
+
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+TRENDING_DEPS = ('Posts(is_published)',)
+TOP_LOCK_KEY = 'blog:trending:lock'
+
+
+def get_half_life():
+    return getattr(settings, 'BLOG_TRENDING_HALF_LIFE', 72)
+
+
+def get_bucket_size():
+    return getattr(settings, 'BLOG_TRENDING_BUCKET', 60 * 60)
+
+
+def get_top_size():
+    return getattr(settings, 'BLOG_TRENDING_TOP_SIZE', 50)
+
+
+def _age(moment):
+    """Время от EPOCH в периодах полураспада"""
+    return (moment - EPOCH).total_seconds() / 3600 / get_half_life()
+
+
+def add_views(score, views, moment):
+    """Рейтинг score (log2 суммы весов) после views просмотров в момент moment"""
+    value = math.log2(views) + _age(moment)
+    if not score:
+        return value
+    high, low = max(score, value), min(score, value)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def decayed(score, moment=None):
+    """Рейтинг в просмотрах на момент moment: сумма просмотров с весами, затухающими со временем"""
+    if not score:
+        return 0.0
+    return 2 ** (score - _age(moment or timezone.now()))
+
+
+def bucket_start(moment):
+    size = get_bucket_size()
+    return EPOCH + timedelta(seconds=(moment - EPOCH).total_seconds() // size * size)
+
+
+def record_bucket(pk, views, moment):
+    """Учет сброшенных просмотров поста в его периоде (в транзакции сброса, рейтинг обновляет сброс)"""
+    start = bucket_start(moment)
+    bucket = PostViews.objects.filter(post=pk, start=start)
+    if not bucket.update(views=F('views') + views):
+        try:
+            with transaction.atomic():
+                PostViews.objects.create(post_id=pk, start=start, views=views)
+        except IntegrityError:
+            # период уже создан параллельным сбросом
+            bucket.update(views=F('views') + views)
+
+
+def build_top():
+    """Первые посты по рейтингу из БД: список пар (pk, рейтинг)"""
+    posts = Posts.objects.filter(is_published=True, trending_score__gt=0).order_by('-trending_score', '-pk')
+    return list(posts.values_list('pk', 'trending_score')[:get_top_size()])
+
+
+def get_top():
+    """Первые посты по рейтингу (список пар (pk, рейтинг) по убыванию рейтинга) из кеша"""
+    key = make_key('trending', TRENDING_DEPS)
+    top = cache.get(key)
+    record_cache('trending', top is not None)
+    if top is None:
+        top = build_top()
+        cache.set(key, top, get_timeout())
+    return top
+
+
+def update_top(scores):
+    """Дополнение списка в кеше новыми рейтингами постов scores ({pk: рейтинг}) после сброса просмотров"""
+    key = make_key('trending', TRENDING_DEPS)
+    if not acquire_lock(cache, TOP_LOCK_KEY):
+        cache.delete(key)  # список будет построен по БД, где новые рейтинги уже сохранены
+        return
+    try:
+        top = cache.get(key)
+        if top is None:
+            return
+        published = Posts.objects.filter(pk__in=list(scores), is_published=True).values_list('pk', flat=True)
+        merged = dict(top)
+        merged.update((pk, scores[pk]) for pk in published)
+        top = heapq.nlargest(get_top_size(), merged.items(), key=lambda item: (item[1], item[0]))
+        cache.set(key, top, get_timeout())
+    finally:
+        cache.delete(TOP_LOCK_KEY)
+
+
+def get_trending_ids(limit=None):
+    """pk популярных сейчас постов (чтение из кеша)"""
+    return [pk for pk, _ in get_top()[:limit]]
+
+
+def rebuild_scores(keep_days=None, chunk_size=1000):
+    """
+    Пересчет рейтингов всех постов по сохраненным периодам и удаление периодов старше keep_days дней
+    (по умолчанию BLOG_TRENDING_KEEP_DAYS), возвращает кол-во постов с просмотрами
+    """
+    keep_days = keep_days or getattr(settings, 'BLOG_TRENDING_KEEP_DAYS', 30)
+    PostViews.objects.filter(start__lt=timezone.now() - timedelta(days=keep_days)).delete()
+    middle = timedelta(seconds=get_bucket_size() / 2)
+    scores = {}
+    buckets = PostViews.objects.filter(views__gt=0).order_by('post', 'start')
+    for pk, start, views in buckets.values_list('post', 'start', 'views').iterator():
+        scores[pk] = add_views(scores.get(pk, 0), views, start + middle)
+    with transaction.atomic():
+        Posts.objects.exclude(trending_score=0).update(trending_score=0)
+        posts = [Posts(pk=pk, trending_score=score) for pk, score in scores.items()]
+        Posts.objects.bulk_update(posts, ['trending_score'], batch_size=chunk_size)
+    cache.set(make_key('trending', TRENDING_DEPS), build_top(), get_timeout())
+    return len(scores)
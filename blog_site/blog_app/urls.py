@@ -1,15 +1,44 @@
+from django.conf import settings
+from django.contrib.sitemaps import views as sitemap_views
 from django.urls import path
 
+from .autocomplete import autocomplete
+from .feeds import *
+from .metrics import metrics_view
+from .page_cache import cache_page_view
+from .sitemaps import SITEMAP_DEPS, SITEMAPS
 from .views import *
 
+if getattr(settings, 'BLOG_ASYNC_VIEWS', False):
+    # асинхронные варианты страниц для запуска через ASGI (blog_app.async_views)
+    from .async_views import AsyncGetPost as GetPost, AsyncHome as Home, AsyncPostsByCategory as PostsByCategory
+    from .async_views import AsyncPostsByTag as PostsByTag, AsyncSearch as Search
+
+site_feed = cache_page_view(('Posts(is_published)',))
+category_feed = cache_page_view(('Posts(is_published)', 'Categories'))
+tag_feed = cache_page_view(('Posts(is_published)', 'Tags'))
+sitemap = cache_page_view(SITEMAP_DEPS)
+
 urlpatterns = [
     path('', Home.as_view(), name='home'),
     path('category/<str:slug>/', PostsByCategory.as_view(), name='category'),
     path('post/<str:slug>/', GetPost.as_view(), name='post'),
+    path('post/<str:slug>/comments/', PostComments.as_view(), name='post_comments'),
     path('tag/<str:slug>/', PostsByTag.as_view(), name='tag'),
     path('search/', Search.as_view(), name='search'),
+    path('search/autocomplete/', autocomplete, name='autocomplete'),
     path('registration/', registration, name='reg'),
     path('login/', user_login, name='login'),
     path('logout/', user_logout, name='logout'),
     path('add_post/', add_post, name='add_post'),
+    path('feed/rss/', site_feed(LatestPostsFeed()), name='feed_rss'),
+    path('feed/atom/', site_feed(LatestPostsAtomFeed()), name='feed_atom'),
+    path('category/<str:slug>/feed/rss/', category_feed(CategoryPostsFeed()), name='category_feed_rss'),
+    path('category/<str:slug>/feed/atom/', category_feed(CategoryPostsAtomFeed()), name='category_feed_atom'),
+    path('tag/<str:slug>/feed/rss/', tag_feed(TagPostsFeed()), name='tag_feed_rss'),
+    path('tag/<str:slug>/feed/atom/', tag_feed(TagPostsAtomFeed()), name='tag_feed_atom'),
+    path('sitemap.xml', sitemap(sitemap_views.index),
+         {'sitemaps': SITEMAPS, 'sitemap_url_name': 'sitemap_section'}, name='sitemap'),
+    path('sitemap-<section>.xml', sitemap(sitemap_views.sitemap), {'sitemaps': SITEMAPS}, name='sitemap_section'),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -1,16 +1,37 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout
-from django.db.models import F, Q
-from django.shortcuts import render, redirect
-from django.views.generic import ListView, DetailView
+from django.db.models import Max, Prefetch
+from django.shortcuts import get_object_or_404, render, redirect
+from django.views.generic import ListView, DetailView, View
 from slugify import slugify
 
 from .forms import *
 
+from blog_app.counters import get_live_views, get_pending, record_view
 from blog_app.models import *
+from blog_app.page_cache import PageCacheMixin, replace_views
+from blog_app.pagination import KeysetPaginationMixin, KeysetPaginator
+from blog_app.related import RELATED_DEPS, get_related_posts
+from blog_app.search import search
 
 
-class Home(ListView):
+def get_comments_page(comments, after=None):
+    """Страница комментариев (новые сверху) с курсорной пагинацией по (created_at, id)"""
+    per_page = getattr(settings, 'BLOG_COMMENTS_PER_PAGE', 20)
+    return KeysetPaginator(comments.select_related('author').defer('content'), per_page).page(after=after)
+
+
+class PostsListPageCacheMixin(PageCacheMixin):
+    """Кеширование страниц списков постов для анонимных пользователей"""
+    # карточки выводят кол-во комментариев поста
+    page_cache_deps = PageCacheMixin.page_cache_deps + ('Comments',)
+
+    def get_last_modified(self):
+        return self.get_queryset().aggregate(last_modified=Max('updated_at'))['last_modified']
+
+
+class Home(PostsListPageCacheMixin, KeysetPaginationMixin, ListView):
     """
     Представление-класс для главной страницы.
     Передает только опубликованные и незакрепленные посты, а также название страницы.
@@ -25,10 +46,12 @@ class Home(ListView):
         return context
 
     def get_queryset(self):
-        return Posts.objects.filter(is_published=True, on_main=False).select_related('author')
+        return Posts.objects.filter(
+            is_published=True, on_main=False
+        ).select_related('author').defer(*POSTS_LIST_DEFERRED).order_by('-created_at', '-pk')
 
 
-class PostsByCategory(ListView):
+class PostsByCategory(PostsListPageCacheMixin, KeysetPaginationMixin, ListView):
     """
     Представление-класс для просмотра постов определенной категории.
     Передает опубликованные посты из данной категории,
@@ -39,16 +62,21 @@ class PostsByCategory(ListView):
     paginate_by = 4
     allow_empty = False
 
+    def get_title(self):
+        return Categories.objects.get(slug=self.kwargs['slug']).title
+
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['title'] = Categories.objects.get(slug=self.kwargs['slug']).title
+        context['title'] = self.get_title()
         return context
 
     def get_queryset(self):
-        return Posts.objects.filter(is_published=True, category__slug=self.kwargs['slug']).select_related('author')
+        return Posts.objects.filter(
+            is_published=True, category__slug=self.kwargs['slug']
+        ).select_related('author').defer(*POSTS_LIST_DEFERRED).order_by('-created_at', '-pk')
 
 
-class PostsByTag(ListView):
+class PostsByTag(PostsListPageCacheMixin, KeysetPaginationMixin, ListView):
     """
     Представление-класс для просмотра постов, связанных с определенным тегом.
     Передает опубликованные посты с данным тегом, а также название страницы, как название тега.
@@ -58,31 +86,77 @@ class PostsByTag(ListView):
     paginate_by = 4
     allow_empty = False
 
+    def get_title(self):
+        return 'Тег: ' + Tags.objects.get(slug=self.kwargs['slug']).title
+
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['title'] = 'Тег: ' + Tags.objects.get(slug=self.kwargs['slug']).title
+        context['title'] = self.get_title()
         return context
 
     def get_queryset(self):
-        return Posts.objects.filter(is_published=True, tags__slug=self.kwargs['slug']).select_related('author')
+        return Posts.objects.filter(
+            is_published=True, tags__slug=self.kwargs['slug']
+        ).select_related('author').defer(*POSTS_LIST_DEFERRED).order_by('-created_at', '-pk')
 
 
-class GetPost(DetailView):
-    """Представление-класс для просмотра конкретного поста."""
+class GetPost(PageCacheMixin, DetailView):
+    """
+    Представление-класс для просмотра конкретного поста.
+    Для анонимных пользователей страница кешируется, при попадании в кеш
+    просмотр все равно учитывается, а в страницу подставляется актуальное кол-во просмотров.
+    """
     model = Posts
     template_name = 'blog_app/single.html'
     context_object_name = 'post_item'
 
+    def get_page_cache_deps(self):
+        return self.page_cache_deps + RELATED_DEPS + (f'Post:{self.kwargs["slug"]}',)
+
+    def get_queryset(self):
+        """
+        Пост с категорией (JOIN) и тегами (один запрос prefetch_related):
+        вместе с первой страницей комментариев с авторами и похожими постами страница строится за 4 запроса,
+        независимо от кол-ва тегов и комментариев
+        """
+        return Posts.objects.select_related('category').prefetch_related(
+            Prefetch('tags', queryset=Tags.objects.only('title', 'slug'))
+        ).defer('content', 'excerpt', 'excerpt_long')
+
+    def get_last_modified(self):
+        return self.object.updated_at
+
+    def get_page_cache_extra(self):
+        return {'pk': self.object.pk}
+
+    def page_cache_hit(self, entry):
+        pk = entry['extra']['pk']
+        record_view(pk)
+        views = Posts.objects.filter(pk=pk).values_list('views', flat=True).first() or 0
+        return replace_views(entry['content'], views + get_pending(pk))
+
     def get_context_data(self, **kwargs):
-        """Метод добавления формы и комментариев к контексту, а также увеличения кол-ва просмотров."""
+        """
+        Метод добавления формы и первой страницы комментариев к контексту, а также учета просмотра.
+        Просмотр копится в кеше и сбрасывается в БД пачкой (см. blog_app.counters),
+        а на странице выводится сумма сохраненных и несброшенных просмотров.
+        Следующие страницы комментариев подгружаются представлением PostComments.
+        """
         context = super().get_context_data(**kwargs)
-        self.object.views = F('views') + 1
-        self.object.save()
-        self.object.refresh_from_db()
+        record_view(self.object.pk)
+        self.object.views = get_live_views(self.object)
         context['form'] = AddCommentForm()
-        context['comments'] = Comments.objects.filter(post=self.object.pk).select_related('author')
+        context['comments_page'] = self.get_comments_page()
+        context['comments'] = context['comments_page'].object_list
+        context['related_posts'] = self.get_related_posts()
         return context
 
+    def get_comments_page(self):
+        return get_comments_page(Comments.objects.filter(post=self.object.pk))
+
+    def get_related_posts(self):
+        return get_related_posts(RelatedPost.objects.filter(post=self.object.pk))
+
     def post(self, request, *args, **kwargs):
         """
         Метод для обработки формы комментариев.
@@ -92,7 +166,7 @@ class GetPost(DetailView):
         if form.is_valid():
             new_comment = form.save(commit=False)
             new_comment.author = request.user
-            new_comment.post = self.get_object()
+            new_comment.post = get_object_or_404(Posts.objects.only('pk', 'slug'), slug=self.kwargs['slug'])
             new_comment.save()
             messages.success(request, 'Ваш комментарий успешно добавлен!')
             return redirect('post', self.kwargs['slug'])
@@ -102,10 +176,30 @@ class GetPost(DetailView):
         return render(request, self.template_name, context)
 
 
-class Search(ListView):
+class PostComments(PageCacheMixin, View):
+    """
+    Представление-класс для подгрузки следующей страницы комментариев к посту (фрагмент HTML).
+    Курсор страницы передается в параметре after, фрагмент кешируется до изменения комментариев поста.
+    """
+    page_cache_deps = ()
+
+    def get_page_cache_deps(self):
+        return (f'Post:{self.kwargs["slug"]}',)
+
+    def get_last_modified(self):
+        return None
+
+    def get(self, request, slug):
+        comments = Comments.objects.filter(post__slug=slug)
+        context = {'comments_page': get_comments_page(comments, after=request.GET.get('after')), 'post_slug': slug}
+        return render(request, 'inc/_comments_page.html', context)
+
+
+class Search(KeysetPaginationMixin, ListView):
     """
     Представление-класс для просмотра постов которые ищет пользователь.
-    Передает опубликованные посты, у которых в названии или контенте содержится введенная пользователем строка.
+    Передает опубликованные посты, найденные поисковым бэкендом (blog_app.search)
+    по названию, тегам и тексту поста, в порядке релевантности и со сниппетами.
     Также передает саму введенную строку и название страницы.
     """
     template_name = 'blog_app/search.html'
@@ -113,11 +207,11 @@ class Search(ListView):
     paginate_by = 4
 
     def get_queryset(self):
-        return Posts.objects.filter(
-            Q(is_published=True) &
-            (Q(title__icontains=self.request.GET.get("s")) |
-             Q(content__icontains=self.request.GET.get("s")))
-        ).select_related('author')
+        return search(self.request.GET.get('s', ''))
+
+    def get_count_cache_key(self):
+        """Кол-во результатов поиска известно после ранжирования, кешировать его не нужно"""
+        return None
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.sitemaps',
     'debug_toolbar',
     'ckeditor',
     'ckeditor_uploader',
@@ -44,7 +45,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'blog_app.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'blog_app.routers.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -91,6 +94,10 @@ DATABASES = {
     }
 }
 
+# Чтение с реплик (blog_app.routers): реплики добавляются в DATABASES (в тестах - с 'TEST': {'MIRROR': 'default'})
+# и перечисляются в BLOG_DB_REPLICAS с весами, например {'replica1': 2, 'replica2': 1}
+DATABASE_ROUTERS = ['blog_app.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -202,4 +209,96 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
         'LOCATION': os.path.join(BASE_DIR, 'django_cache'),
     }
-}
\ No newline at end of file
+}
+
+# Буферизированный счетчик просмотров (blog_app.counters): просмотры копятся в кеше BLOG_VIEWS_CACHE,
+# если его бэкенд атомарный (memcached, redis), иначе в таблице БД; BLOG_VIEWS_BUFFER = 'cache' / 'db' - явный выбор
+BLOG_VIEWS_CACHE = 'default'
+BLOG_VIEWS_BUFFER = 'auto'
+# с буфером в БД просмотры поста копятся в BLOG_VIEWS_DB_SHARDS строках, чтобы не ждать блокировки одной строки
+BLOG_VIEWS_DB_SHARDS = 8
+BLOG_VIEWS_FLUSH_INTERVAL = 60
+BLOG_VIEWS_FLUSH_LOCK_TIMEOUT = 60 * 10
+BLOG_VIEWS_FLUSH_IN_BACKGROUND = False  # либо запускать "manage.py flush_views --loop"
+
+# Полнотекстовый поиск (blog_app.search), по умолчанию бэкенд выбирается по типу БД
+BLOG_SEARCH_BACKEND = None
+BLOG_SEARCH_PG_CONFIG = 'russian'
+BLOG_SEARCH_MAX_RESULTS = 1000  # сколько результатов запроса кешируется и показывается
+
+# Снимок сайдбара (blog_app.snapshots): сколько постов хранить в списках последних и популярных
+BLOG_SIDEBAR_SIZE = 10
+
+# TTL данных, кешируемых с инвалидацией по версиям зависимостей (blog_app.caching)
+BLOG_DEPENDENT_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Кеширование страниц целиком для анонимных пользователей (blog_app.page_cache)
+BLOG_PAGE_CACHE_ENABLED = True
+
+# Списки постов: номера страниц выводятся до BLOG_PAGINATION_MAX_NUMBERED, дальше - переходы по курсорам
+BLOG_PAGINATION_MAX_NUMBERED = 10
+
+# Кол-во комментариев на странице поста и в каждой подгружаемой странице
+BLOG_COMMENTS_PER_PAGE = 20
+
+# RSS/Atom ленты (blog_app.feeds) и карта сайта (blog_app.sitemaps)
+BLOG_FEED_SIZE = 20
+BLOG_SITEMAP_CHUNK = 5000
+
+# Уменьшенные копии фото постов (blog_app.images): создаются в фоновом потоке после сохранения поста
+BLOG_IMAGES_ASYNC = True
+BLOG_IMAGES_WORKERS = 1
+BLOG_IMAGES_WIDTHS = (50, 100, 200, 300, 600, 800, 1200, 1600)
+BLOG_IMAGES_FORMATS = ('webp', 'jpeg')
+
+# Асинхронные варианты страниц (blog_app.async_views) для запуска через ASGI: независимые данные страницы
+# загружаются одновременно в пуле потоков, у каждого потока пула свое соединение с БД
+BLOG_ASYNC_VIEWS = False
+BLOG_ASYNC_WORKERS = 8
+
+# Реплики БД (blog_app.routers): псевдоним -> вес, пусто - все запросы идут в основную БД.
+# После записи клиент читает основную БД BLOG_DB_STICKY_SECONDS секунд, доступность реплик проверяется
+# раз в BLOG_DB_HEALTH_INTERVAL секунд, недоступная (или отстающая на BLOG_DB_REPLICA_MAX_LAG секунд) реплика
+# исключается на BLOG_DB_REPLICA_RETRY секунд
+BLOG_DB_REPLICAS = {}
+BLOG_DB_STICKY_SECONDS = 15
+BLOG_DB_HEALTH_INTERVAL = 5
+BLOG_DB_REPLICA_RETRY = 30
+BLOG_DB_REPLICA_MAX_LAG = None
+
+# Метрики для Prometheus (blog_app.metrics): страница /metrics доступна только с токеном BLOG_METRICS_TOKEN
+# (заголовок "Authorization: Bearer <токен>", без токена страница отключена) и, если заданы,
+# только с адресов BLOG_METRICS_ALLOWED_IPS; процессы раз в BLOG_METRICS_PUBLISH_INTERVAL секунд
+# записывают свои метрики в кеш BLOG_METRICS_CACHE
+BLOG_METRICS_ENABLED = True
+BLOG_METRICS_TOKEN = None
+BLOG_METRICS_ALLOWED_IPS = None
+BLOG_METRICS_CACHE = 'default'
+BLOG_METRICS_PUBLISH_INTERVAL = 15
+BLOG_METRICS_PROCESS_TTL = 60 * 60 * 24
+
+# Автодополнение строки поиска (blog_app.autocomplete): индекс в памяти процесса строится заново
+# раз в BLOG_AUTOCOMPLETE_REFRESH секунд, в него попадают BLOG_AUTOCOMPLETE_MAX_POSTS самых просматриваемых постов,
+# изменения в других процессах проверяются раз в BLOG_AUTOCOMPLETE_CHECK секунд
+BLOG_AUTOCOMPLETE_MAX_POSTS = 50000
+BLOG_AUTOCOMPLETE_REFRESH = 600
+BLOG_AUTOCOMPLETE_CHECK = 5
+BLOG_AUTOCOMPLETE_MIN_CHARS = 2
+BLOG_AUTOCOMPLETE_LIMIT = 8
+
+# Похожие посты (blog_app.related): BLOG_RELATED_COUNT постов по общим тегам с прибавкой за общую категорию,
+# теги популярнее BLOG_RELATED_MAX_TAG_POSTS постов не используются для поиска кандидатов
+BLOG_RELATED_COUNT = 5
+BLOG_RELATED_CATEGORY_BOOST = 0.1
+BLOG_RELATED_MAX_TAG_POSTS = 5000
+
+# Популярные сейчас посты (blog_app.trending): просмотры копятся по периодам BLOG_TRENDING_BUCKET секунд,
+# их вес уменьшается вдвое за BLOG_TRENDING_HALF_LIFE часов, в кеше хранятся BLOG_TRENDING_TOP_SIZE первых постов
+BLOG_TRENDING_HALF_LIFE = 72
+BLOG_TRENDING_BUCKET = 60 * 60
+BLOG_TRENDING_KEEP_DAYS = 30
+BLOG_TRENDING_TOP_SIZE = 50
+
+# Админка (blog_app.admin): списки постов и комментариев таблиц больше BLOG_ADMIN_ESTIMATED_COUNT_THRESHOLD строк
+# показывают примерное кол-во строк по статистике БД вместо COUNT(*)
+BLOG_ADMIN_ESTIMATED_COUNT_THRESHOLD = 10000